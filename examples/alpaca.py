@@ -8,11 +8,15 @@ from py_portfolio_index import (
 
 ideal_port = INDEXES["esgv"]
 
-ideal_port.exclude(STOCK_LISTS["oil_sector"]).exclude(STOCK_LISTS["vice"]).exclude(
-    STOCK_LISTS["cruises"]
+ideal_port = (
+    ideal_port.pipeline()
+    .exclude(STOCK_LISTS["oil_sector"])
+    .exclude(STOCK_LISTS["vice"])
+    .exclude(STOCK_LISTS["cruises"])
+    .reweight(STOCK_LISTS["renewable"], weight=2.0, min_weight=0.001)
+    .reweight(STOCK_LISTS["semiconductor"], weight=2.0, min_weight=0.001)
+    .collect()
 )
-ideal_port.reweight(STOCK_LISTS["renewable"], weight=2.0, min_weight=0.001)
-ideal_port.reweight(STOCK_LISTS["semiconductor"], weight=2.0, min_weight=0.001)
 
 provider = AlpacaProvider()
 
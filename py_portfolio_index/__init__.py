@@ -4,8 +4,11 @@ from py_portfolio_index.enums import PurchaseStrategy, RoundingStrategy
 from py_portfolio_index.operators import (
     compare_portfolios,
     generate_order_plan,
+    generate_order_plan_vectorized,
     generate_composite_order_plan,
     purchase_composite_order_plan,
+    generate_composite_order_plan_async,
+    purchase_composite_order_plan_async,
 )
 from py_portfolio_index.portfolio_providers.robinhood import RobinhoodProvider
 from py_portfolio_index.portfolio_providers.alpaca_v2 import (
@@ -33,8 +36,11 @@ __all__ = [
     "Logger",
     "compare_portfolios",
     "generate_order_plan",
+    "generate_order_plan_vectorized",
     "generate_composite_order_plan",
     "purchase_composite_order_plan",
+    "generate_composite_order_plan_async",
+    "purchase_composite_order_plan_async",
     "PaperAlpacaProvider",
     "AlpacaProvider",
     "WebullProvider",
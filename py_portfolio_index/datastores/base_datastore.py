@@ -1,5 +1,5 @@
 from py_portfolio_index.enums import ObjectKey, ProviderType
-from datetime import datetime
+from datetime import date, datetime
 from trilogy import Environment, Dialects, Executor
 from pathlib import Path
 from trilogy.dialect.config import DuckDBConfig
@@ -79,14 +79,27 @@ class BaseDatastore:
             max({query}) as end;
         """
         if provider_type:
+            # provider names are capitalized; ProviderType values are not
             base_query = (
-                f"WHERE dividend.provider.name='{provider_type.value}' " + base_query
+                f"WHERE lower(dividend.provider.name)='{provider_type.value}' "
+                + base_query
             )
         results = list(self.query(base_query).fetchall())
         if not results:
             return None, None
         return results[0][0], results[0][1]
 
+    def get_dividend_external_ids(
+        self, provider_type: ProviderType, since: date | None = None
+    ) -> set[str]:
+        """External ids of stored dividends for a provider, paid on or after
+        since when given"""
+        where = f"lower(dividend.provider.name)='{provider_type.value}'"
+        if since:
+            where += f" and dividend.date >= '{since.isoformat()}'::date"
+        results = self.query(f"WHERE {where} SELECT dividend.external_id;").fetchall()
+        return {row[0] for row in results if row[0] is not None}
+
     def persist_dividend_data(self, data: list[DividendResult]):
         raise NotImplementedError
 
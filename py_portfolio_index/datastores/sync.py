@@ -0,0 +1,45 @@
+from datetime import date, datetime, time
+
+from py_portfolio_index.constants import Logger
+from py_portfolio_index.datastores.base_datastore import BaseDatastore
+from py_portfolio_index.enums import ObjectKey
+from py_portfolio_index.models import DividendResult
+from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+
+
+def sync_dividends(
+    provider: BaseProvider, datastore: BaseDatastore, full: bool = False
+) -> list[DividendResult]:
+    """Persist the dividends a provider has paid since the last sync.
+
+    The latest stored dividend date is pushed down into the provider's
+    query, re-reading that day in case it was partly synced; dividends
+    already stored are skipped by external_id. When the provider lists the
+    most recently posted dividends first, pagination stops at the first
+    one already stored. full ignores what is stored. Returns the new
+    dividends."""
+    watermark: date | None = None
+    if not full:
+        _, watermark = datastore.get_watermarks(ObjectKey.DIVIDENDS, provider.PROVIDER)
+    if isinstance(watermark, datetime):
+        watermark = watermark.date()
+    start = datetime.combine(watermark, time.min) if watermark else None
+    known = (
+        datastore.get_dividend_external_ids(provider.PROVIDER, since=watermark)
+        if watermark
+        else set()
+    )
+    new: list[DividendResult] = []
+    for dividend in provider.iter_dividend_details(start=start):
+        if dividend.external_id in known:
+            if provider.DIVIDENDS_NEWEST_FIRST:
+                # anything after this was posted earlier, so already stored
+                break
+            continue
+        new.append(dividend)
+    if new:
+        datastore.persist_dividend_data(new)
+    Logger.info(
+        f"Synced {len(new)} new dividends from {provider.PROVIDER.value} since {watermark}"
+    )
+    return new
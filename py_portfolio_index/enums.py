@@ -29,6 +29,15 @@ class ObjectKey(Enum):
     DIVIDENDS_DETAIL = 6
 
 
+class EndpointClass(Enum):
+    """Groups of broker endpoints that share a rate limit"""
+
+    QUOTES = "quotes"
+    ORDERS = "orders"
+    # account and reference reads
+    ACCOUNT = "account"
+
+
 class ProviderClass(Enum):
     PAPER = [
         ProviderType.ALPACA_PAPER,
@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from py_portfolio_index.models import LoginResponse
+    from py_portfolio_index.models import LoginResponse, OrderResult
 
 
 class PriceFetchError(Exception):
@@ -28,3 +28,31 @@ class OrderError(Exception):
     def __init__(self, message, *args):
         super().__init__(message, *args)
         self.message = message
+
+
+class RateLimitError(OrderError):
+    """A call would have had to wait for the rate limiter, and the provider
+    is set to raise instead"""
+
+    def __init__(self, message, wait_time: float, *args):
+        super().__init__(message, *args)
+        self.wait_time = wait_time
+
+
+class OrderPlanError(OrderError):
+    """An order plan stopped at a failed order. results holds the outcome
+    of every order that was attempted."""
+
+    def __init__(self, message, results: list["OrderResult"], *args):
+        super().__init__(message, *args)
+        self.results = results
+
+
+class TransientError(Exception):
+    """The broker turned a call away without acting on it, so it is safe to
+    retry, after retry_after seconds when the broker said how long"""
+
+    def __init__(self, message, retry_after: float | None = None, *args):
+        super().__init__(message, *args)
+        self.message = message
+        self.retry_after = retry_after
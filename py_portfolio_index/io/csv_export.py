@@ -1,86 +1,100 @@
 import csv
 from io import StringIO
-from typing import List
+from typing import Iterable, TextIO
 
 from py_portfolio_index.models import Transaction
 
+CSV_FIELDNAMES = [
+    "date",
+    "symbol",
+    "quantity",
+    "activityType",
+    "unitPrice",
+    "currency",
+    "fee",
+]
+
 
 def transactions_to_csv(
-    transactions: List[Transaction], include_fee: bool = True
+    transactions: Iterable[Transaction], include_fee: bool = True
 ) -> str:
     """
-    Convert a list of Transaction objects to CSV format.
+    Convert Transaction objects to CSV format.
 
     Args:
-        transactions: List of Transaction objects to convert
+        transactions: Transactions to convert; any iterable, such as a
+            provider's iter_transactions(), is consumed as it is read
         include_fee: Whether to include fee column (defaults to 0 if not available on Transaction)
 
     Returns:
         CSV formatted string with header and transaction data
     """
-    if not transactions:
-        return "date,symbol,quantity,activityType,unitPrice,currency,fee\n"
-
-    # Create StringIO buffer for CSV writing
     output = StringIO()
+    write_transactions_csv(transactions, output, include_fee=include_fee)
+
+    # Get CSV string and clean up
+    csv_content = output.getvalue()
+    output.close()
+
+    return csv_content
+
+
+def write_transactions_csv(
+    transactions: Iterable[Transaction], file: TextIO, include_fee: bool = True
+) -> int:
+    """
+    Write Transaction objects to an open text file as CSV, one row at a
+    time, so a streamed history never has to fit in memory.
 
-    # Define CSV headers to match your example
-    fieldnames = [
-        "date",
-        "symbol",
-        "quantity",
-        "activityType",
-        "unitPrice",
-        "currency",
-        "fee",
-    ]
-    writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator="\n")
+    Returns:
+        The number of transactions written
+    """
+    writer = csv.DictWriter(file, fieldnames=CSV_FIELDNAMES, lineterminator="\n")
 
     # Write header
     writer.writeheader()
 
     # Write transaction rows
+    written = 0
     for transaction in transactions:
-        # Convert date to ISO format with time (defaulting to start of day)
-        date_str = f"{transaction.date.isoformat()}T00:00:00.000Z"
-
-        # Map your OrderType to activityType string
-        activity_type = map_transaction_type_to_activity(transaction.type)
-
-        # Extract unit price value (assuming Money has a value attribute)
-        unit_price = (
-            float(transaction.unitPrice.value)
-            if hasattr(transaction.unitPrice, "value")
-            else float(transaction.unitPrice)
-        )
-
-        # Get currency (assuming Currency enum has string values)
-        currency_str = str(transaction.currency.name)
-
-        # Get fee (default to 0 if not available on Transaction model)
-        fee = getattr(transaction, "fee", 0)
-        if hasattr(fee, "value"):
-            fee = float(fee.value)
-        else:
-            fee = float(fee) if fee is not None else 0.0
-
-        row = {
-            "date": date_str,
-            "symbol": transaction.ticker,
-            "quantity": float(transaction.qty),
-            "activityType": activity_type,
-            "unitPrice": unit_price,
-            "currency": currency_str,
-            "fee": fee,
-        }
-
-        writer.writerow(row)
-
-    # Get CSV string and clean up
-    csv_content = output.getvalue()
-    output.close()
-
-    return csv_content
+        writer.writerow(transaction_to_row(transaction))
+        written += 1
+    return written
+
+
+def transaction_to_row(transaction: Transaction) -> dict:
+    # Convert date to ISO format with time (defaulting to start of day)
+    date_str = f"{transaction.date.isoformat()}T00:00:00.000Z"
+
+    # Map your OrderType to activityType string
+    activity_type = map_transaction_type_to_activity(transaction.type)
+
+    # Extract unit price value (assuming Money has a value attribute)
+    unit_price = (
+        float(transaction.unitPrice.value)
+        if hasattr(transaction.unitPrice, "value")
+        else float(transaction.unitPrice)
+    )
+
+    # Get currency (assuming Currency enum has string values)
+    currency_str = str(transaction.currency.name)
+
+    # Get fee (default to 0 if not available on Transaction model)
+    fee = getattr(transaction, "fee", 0)
+    if hasattr(fee, "value"):
+        fee = float(fee.value)
+    else:
+        fee = float(fee) if fee is not None else 0.0
+
+    return {
+        "date": date_str,
+        "symbol": transaction.ticker,
+        "quantity": float(transaction.qty),
+        "activityType": activity_type,
+        "unitPrice": unit_price,
+        "currency": currency_str,
+        "fee": fee,
+    }
 
 
 def map_transaction_type_to_activity(transaction_type) -> str:
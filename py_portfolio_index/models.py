@@ -1,5 +1,10 @@
+from array import array
 from datetime import date
+from math import fsum
 from typing import (
+    Any,
+    Dict,
+    Iterable,
     List,
     Optional,
     Set,
@@ -9,7 +14,18 @@ from typing import (
     runtime_checkable,
     Protocol,
 )
-from pydantic import BaseModel, Field, field_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    GetCoreSchemaHandler,
+    GetJsonSchemaHandler,
+    PrivateAttr,
+    SerializationInfo,
+    computed_field,
+    field_validator,
+)
+from pydantic_core import core_schema
 from py_portfolio_index.enums import Currency, ProviderType, OrderType
 from py_portfolio_index.constants import Logger
 from py_portfolio_index.exceptions import PriceFetchError
@@ -25,7 +41,12 @@ if TYPE_CHECKING:
 class ProviderProtocol(Protocol):
     PROVIDER: ProviderType = ProviderType.DUMMY
 
-    def handle_order_element(self, element: "OrderElement") -> bool:
+    def handle_order_element(
+        self,
+        element: "OrderElement",
+        dry_run: bool = False,
+        price: Optional[Decimal] = None,
+    ) -> Decimal:
         pass
 
     def get_unsettled_instruments(self) -> Set[str]:
@@ -34,7 +55,7 @@ class ProviderProtocol(Protocol):
 
 class PortfolioProtocol(Protocol):
     @property
-    def holdings(self) -> Collection["IdealPortfolioElement"]:
+    def holdings(self) -> Collection["RealPortfolioElement"]:
         pass
 
     @property
@@ -45,29 +66,87 @@ class PortfolioProtocol(Protocol):
         pass
 
 
-class Money(BaseModel):
-    value: Union[Decimal, int, float, "Money"]
-    currency: Currency = Currency.USD
+class Money:
+    """A Decimal amount in a currency.
+
+    A plain __slots__ class rather than a pydantic model: the constructor
+    coerces its input once and arithmetic builds results directly, without
+    re-running validation. It can still be used as a pydantic field type and
+    serializes to the same {"value": ..., "currency": ...} shape."""
+
+    __slots__ = ("value", "currency")
+
+    value: Decimal
+    currency: Currency
+
+    def __init__(
+        self,
+        value: Union[Decimal, int, float, str, "Money"],
+        currency: Currency = Currency.USD,
+    ):
+        self.value = self.coerce_to_decimal(value)
+        self.currency = Currency(currency)
+
+    @classmethod
+    def _from_decimal(cls, value: Decimal, currency: Currency) -> "Money":
+        # trusted fast path for arithmetic results
+        output = object.__new__(cls)
+        output.value = value
+        output.currency = currency
+        return output
 
     @property
     def decimal(self) -> Decimal:
-        return self.value  # type: ignore
+        return self.value
 
     @property
     def is_zero(self):
         return self.value == Decimal(0)
 
-    @field_validator("value", mode="before")
-    def coerce_to_decimal(cls, v) -> Decimal:
-        if isinstance(v, (int, float)):
+    @staticmethod
+    def coerce_to_decimal(v) -> Decimal:
+        if isinstance(v, Decimal):
+            return v
+        elif isinstance(v, (int, float)):
             return Decimal(v)
         elif isinstance(v, Money):
             # TODO convert this
             return v.decimal
-        elif isinstance(v, Decimal):
-            return v
         return Decimal(v)
 
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source_type: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                cls._serialize, info_arg=True
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(
+        cls, schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler
+    ) -> dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "value": {"type": "string"},
+                "currency": {"enum": [c.value for c in Currency]},
+            },
+            "required": ["value"],
+        }
+
+    @classmethod
+    def _validate(cls, value: Any) -> "Money":
+        return cls.parse(value)
+
+    def _serialize(self, info: SerializationInfo) -> dict[str, Any]:
+        if info.mode_is_json():
+            return {"value": str(self.value), "currency": self.currency.value}
+        return {"value": self.value, "currency": self.currency}
+
     def __str__(self):
         return f"{self.currency.value}{self.value}"
 
@@ -81,6 +160,9 @@ class Money(BaseModel):
         currency = Config.default_currency
         if isinstance(val, Money):
             return val
+        elif isinstance(val, dict):
+            # serialized form
+            return Money(value=val["value"], currency=val.get("currency", currency))
         elif isinstance(val, (Decimal, float, int)):
             return Money(value=Decimal(val), currency=currency)
         elif isinstance(val, str):
@@ -126,19 +208,19 @@ class Money(BaseModel):
             return self.__add__(other)
 
     def __add__(self, other) -> "Money":
-        return Money(value=self.value + self._cmp_helper(other), currency=self.currency)
+        return Money._from_decimal(self.value + self._cmp_helper(other), self.currency)
 
     def __sub__(self, other) -> "Money":
-        return Money(value=self.value - self._cmp_helper(other), currency=self.currency)
+        return Money._from_decimal(self.value - self._cmp_helper(other), self.currency)
 
     def __mul__(self, other) -> "Money":
-        return Money(value=self.value * self._cmp_helper(other), currency=self.currency)
+        return Money._from_decimal(self.value * self._cmp_helper(other), self.currency)
 
     def __div__(self, other):
-        return Money(value=self.value / self._cmp_helper(other), currency=self.currency)
+        return Money._from_decimal(self.value / self._cmp_helper(other), self.currency)
 
     def __truediv__(self, other):
-        return Money(value=self.value / self._cmp_helper(other), currency=self.currency)
+        return Money._from_decimal(self.value / self._cmp_helper(other), self.currency)
 
     def __float__(self):
         return float(self.value)
@@ -147,10 +229,13 @@ class Money(BaseModel):
         return int(self.value)
 
     def __abs__(self):
-        return Money(value=abs(self.value), currency=self.currency)
+        return Money._from_decimal(abs(self.value), self.currency)
 
     def __round__(self, n=None):
-        return Money(value=Decimal(round(self.value, n)), currency=self.currency)
+        return Money._from_decimal(Decimal(round(self.value, n)), self.currency)
+
+    def __reduce__(self):
+        return (Money._from_decimal, (self.value, self.currency))
 
 
 class ProfitModel(BaseModel):
@@ -182,47 +267,138 @@ class ReweightResponse:
     ratio: Decimal
 
 
+def _float_to_decimal(value: float) -> Decimal:
+    # shortest round-trip repr, so 0.0123 stays 0.0123
+    return Decimal(repr(value))
+
+
 class IdealPortfolio(BaseModel):
-    holdings: List[IdealPortfolioElement]
+    """Target weights for a portfolio.
+
+    Stored column-wise: a ticker list, a float64 weight array and a
+    ticker -> row index. `holdings` is a view materialized on demand,
+    sorted by weight descending; mutate through the portfolio methods
+    rather than through the view elements."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    initial_holdings: List[IdealPortfolioElement] = Field(
+        default_factory=list, alias="holdings", exclude=True, repr=False
+    )
     source_date: Optional[date] = Field(default_factory=date.today)
 
+    _tickers: List[str] = PrivateAttr(default_factory=list)
+    _weights: array = PrivateAttr(default_factory=lambda: array("d"))
+    _rows: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _order: Optional[List[int]] = PrivateAttr(default=None)
+    _view: Optional[List[IdealPortfolioElement]] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._load(self.initial_holdings)
+        # the columns are the source of truth from here on
+        self.initial_holdings = []
+
+    def _load(self, holdings: Iterable[IdealPortfolioElement]) -> None:
+        self._tickers = []
+        self._weights = array("d")
+        self._rows = {}
+        for item in holdings:
+            row = self._rows.get(item.ticker)
+            if row is not None:
+                self._weights[row] += float(item.weight)
+                continue
+            self._append(item.ticker, float(item.weight))
+        self._invalidate()
+
+    def _append(self, ticker: str, weight: float) -> None:
+        self._rows[ticker] = len(self._tickers)
+        self._tickers.append(ticker)
+        self._weights.append(weight)
+
+    def _invalidate(self) -> None:
+        self._order = None
+        self._view = None
+
+    def _sorted_rows(self) -> List[int]:
+        if self._order is None:
+            weights = self._weights
+            self._order = sorted(
+                range(len(weights)), key=weights.__getitem__, reverse=True
+            )
+        return self._order
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def holdings(self) -> List[IdealPortfolioElement]:
+        if self._view is None:
+            self._view = [
+                IdealPortfolioElement.model_construct(
+                    ticker=self._tickers[row],
+                    weight=_float_to_decimal(self._weights[row]),
+                )
+                for row in self._sorted_rows()
+            ]
+        return self._view
+
+    @holdings.setter
+    def holdings(self, holdings: List[IdealPortfolioElement]) -> None:
+        self._load(holdings)
+
+    def columns(self) -> tuple[List[str], array]:
+        """Tickers and float64 weights in the same order as `holdings`."""
+        order = self._sorted_rows()
+        return [self._tickers[row] for row in order], array(
+            "d", (self._weights[row] for row in order)
+        )
+
+    def get_weight(self, ticker: str) -> Optional[Decimal]:
+        row = self._rows.get(ticker)
+        if row is None:
+            return None
+        return _float_to_decimal(self._weights[row])
+
+    def set_weight(self, ticker: str, weight: Union[Decimal, float]) -> None:
+        """Set the weight of a ticker without renormalizing."""
+        row = self._rows.get(ticker)
+        if row is None:
+            raise ValueError(f"Stock {ticker} not in portfolio")
+        self._weights[row] = float(weight)
+        self._invalidate()
+
     def normalize(self):
         """Ensure component weights go to 100"""
         self._reweight_portfolio()
 
     def add_stock(self, ticker: str, weight: Decimal, rebalance: bool = True):
-        new = IdealPortfolioElement(ticker=ticker, weight=weight)
-        if any([item.ticker == ticker for item in self.holdings]):
+        if ticker in self._rows:
             raise ValueError(f"Stock {ticker} already in portfolio")
-        self.holdings.append(new)
+        self._append(ticker, float(weight))
+        self._invalidate()
         if rebalance:
             self._reweight_portfolio()
         return self
 
     def contains(self, ticker: str) -> bool:
-        return ticker in [item.ticker for item in self.holdings]
+        return ticker in self._rows
 
     def _reweight_portfolio(self) -> None:
-        weights: Decimal = Decimal(sum([item.weight for item in self.holdings]))
-
-        scaling_factor = Decimal(1) / weights
-        for item in self.holdings:
-            item.weight = item.weight * scaling_factor
-        self.holdings = sorted(self.holdings, key=lambda x: x.weight, reverse=True)
+        scaling_factor = 1.0 / fsum(self._weights)
+        self._weights = array("d", (item * scaling_factor for item in self._weights))
+        self._invalidate()
 
     def exclude(self, exclusion_list: List[str]):
-        reweighted = []
-        excluded = Decimal(0.0)
-        for ticker in exclusion_list:
-            for item in self.holdings:
-                if item.ticker == ticker:
-                    reweighted.append(ticker)
-                    excluded += item.weight
-                    item.weight = Decimal(0.0)
-
-        self.holdings = [
-            item for item in self.holdings if item.ticker not in exclusion_list
+        excluded_tickers = set(exclusion_list)
+        keep = [
+            row
+            for row, ticker in enumerate(self._tickers)
+            if ticker not in excluded_tickers
         ]
+        reweighted = [ticker for ticker in self._tickers if ticker in excluded_tickers]
+        excluded = fsum(self._weights) - fsum(self._weights[row] for row in keep)
+
+        self._tickers = [self._tickers[row] for row in keep]
+        self._weights = array("d", (self._weights[row] for row in keep))
+        self._rows = {ticker: row for row, ticker in enumerate(self._tickers)}
         self._reweight_portfolio()
         Logger.info(
             f"Set the following stocks to weight 0 {reweighted}. Total value excluded {excluded}."
@@ -235,24 +411,19 @@ class IdealPortfolio(BaseModel):
         weight: Union[Decimal, float],
         min_weight: Union[Decimal, float] = Decimal(0.005),
     ):
-        cweight = Decimal(weight)
-        cmin_weight = Decimal(min_weight)
+        cweight = float(weight)
+        cmin_weight = float(min_weight)
         reweighted = []
-        total_value = Decimal(0)
+        total_value = 0.0
         for ticker in ticker_list:
-            found = False
-            for item in self.holdings:
-                if item.ticker == ticker:
-                    total_value += item.weight * cweight
-                    item.weight = item.weight * cweight
-                    reweighted.append(ticker)
-                    found = True
-            if not found:
-                reweighted.append(ticker)
+            row = self._rows.get(ticker)
+            reweighted.append(ticker)
+            if row is not None:
+                self._weights[row] *= cweight
+                total_value += self._weights[row]
+            else:
                 total_value += cmin_weight
-                self.holdings.append(
-                    IdealPortfolioElement(ticker=ticker, weight=cmin_weight)
-                )
+                self._append(ticker, cmin_weight)
 
         self._reweight_portfolio()
         Logger.info(
@@ -260,6 +431,71 @@ class IdealPortfolio(BaseModel):
         )
         return self
 
+    def pipeline(self) -> "IdealPortfolioPipeline":
+        """Start a lazy chain of exclude/reweight steps, applied
+        together on collect()."""
+        return IdealPortfolioPipeline(self)
+
+    def _apply_steps(self, steps: List["PipelineStep"]) -> "IdealPortfolio":
+        if not steps:
+            return self
+        weights = self._weights
+        total = fsum(weights)
+        factors: Dict[int, float] = {}
+        dropped: Set[int] = set()
+        added: Dict[str, float] = {}
+        excluded_tickers: Set[str] = set()
+        reweighted: List[str] = []
+        for idx, step in enumerate(steps):
+            if step.weight is None:
+                for ticker in set(step.tickers):
+                    if ticker in added:
+                        total -= added.pop(ticker)
+                        excluded_tickers.add(ticker)
+                        continue
+                    row = self._rows.get(ticker)
+                    if row is not None and row not in dropped:
+                        total -= weights[row] * factors.get(row, 1.0)
+                        dropped.add(row)
+                        excluded_tickers.add(ticker)
+                continue
+            # chained calls renormalize after every step, so a new ticker's
+            # min weight is relative to the running total, not to 1
+            base = total if idx else 1.0
+            for ticker in step.tickers:
+                reweighted.append(ticker)
+                if ticker in added:
+                    total += added[ticker] * (step.weight - 1)
+                    added[ticker] *= step.weight
+                    continue
+                row = self._rows.get(ticker)
+                if row is not None and row not in dropped:
+                    factor = factors.get(row, 1.0)
+                    total += weights[row] * factor * (step.weight - 1)
+                    factors[row] = factor * step.weight
+                else:
+                    added[ticker] = step.min_weight * base
+                    total += added[ticker]
+
+        tickers: List[str] = []
+        new_weights = array("d")
+        for row, ticker in enumerate(self._tickers):
+            if row in dropped:
+                continue
+            tickers.append(ticker)
+            new_weights.append(weights[row] * factors.get(row, 1.0))
+        for ticker, weight in added.items():
+            tickers.append(ticker)
+            new_weights.append(weight)
+        self._tickers = tickers
+        self._weights = new_weights
+        self._rows = {ticker: row for row, ticker in enumerate(tickers)}
+        self._reweight_portfolio()
+        Logger.info(
+            f"Applied {len(steps)} steps. Excluded {sorted(excluded_tickers)}, reweighted {reweighted}."
+        )
+        return self
+
     def reweight_to_present(
         self, provider: "BaseProvider"
     ) -> dict[str, ReweightResponse]:
@@ -267,56 +503,53 @@ class IdealPortfolio(BaseModel):
             Logger.info("Already reweighted to present")
             return {}
         output = {}
-        imaginary_base = Decimal(1_000_000)
-        values = {}
-        valid_assets = [
-            item for item in self.holdings if item.ticker in provider.valid_assets
-        ]
+        imaginary_base = 1_000_000.0
+        valid_assets = provider.valid_assets
+        tickers = [ticker for ticker in self._tickers if ticker in valid_assets]
         if provider.SUPPORTS_BATCH_HISTORY:
-            tickers = [item.ticker for item in valid_assets]
             historic_prices = provider.get_instrument_prices(tickers, self.source_date)
             today_prices = provider.get_instrument_prices(tickers, None)
         else:
             historic_prices = {}
             today_prices = {}
-            for item in valid_assets:
+            for ticker in tickers:
                 try:
-                    historic_prices[item.ticker] = provider.get_instrument_price(
-                        item.ticker, self.source_date
-                    )
-                    today_prices[item.ticker] = provider.get_instrument_price(
-                        item.ticker
+                    historic_prices[ticker] = provider.get_instrument_price(
+                        ticker, self.source_date
                     )
+                    today_prices[ticker] = provider.get_instrument_price(ticker)
                 except PriceFetchError:
-                    historic_prices[item.ticker] = None
-                    today_prices[item.ticker] = None
-        for item in self.holdings:
-            source_price = historic_prices.get(item.ticker, None)
-            today_price = today_prices.get(item.ticker, None)
+                    historic_prices[ticker] = None
+                    today_prices[ticker] = None
+        values = array("d")
+        for ticker, weight in zip(self._tickers, self._weights):
+            source_price = historic_prices.get(ticker, None)
+            today_price = today_prices.get(ticker, None)
             if not source_price or not today_price:
                 # if we couldn't get a historical price
                 # keep the value the same
-                values[item.ticker] = imaginary_base * item.weight
+                values.append(imaginary_base * weight)
                 continue
-            source_shares = imaginary_base * item.weight / source_price
-            stock_value_today = today_price * source_shares
-            values[item.ticker] = stock_value_today
-        today_value = Decimal(sum(values.values()))
-
-        for item in self.holdings:
-            new_weight = values[item.ticker] / today_value
-            if item.weight > 0:
-                ratio = round(((new_weight - item.weight) / item.weight) * 100, 2)
+            source_shares = imaginary_base * weight / float(source_price)
+            values.append(float(today_price) * source_shares)
+        today_value = fsum(values)
+
+        new_weights = array("d", (value / today_value for value in values))
+        for ticker, weight, new_weight in zip(
+            self._tickers, self._weights, new_weights
+        ):
+            if weight > 0:
+                ratio = round(((new_weight - weight) / weight) * 100, 2)
             else:
-                ratio = Decimal(0.0)
-            output[item.ticker] = ReweightResponse(
-                original=item.weight,
-                new=new_weight,
-                original_price=historic_prices.get(item.ticker),
-                new_price=today_prices.get(item.ticker),
-                ratio=ratio,
+                ratio = 0.0
+            output[ticker] = ReweightResponse(
+                original=_float_to_decimal(weight),
+                new=_float_to_decimal(new_weight),
+                original_price=historic_prices.get(ticker),
+                new_price=today_prices.get(ticker),
+                ratio=_float_to_decimal(ratio),
             )
-            item.weight = new_weight
+        self._weights = new_weights
         # change our source date to today
         # so we don't reweight again
         self.source_date = date.today()
@@ -324,6 +557,50 @@ class IdealPortfolio(BaseModel):
         return output
 
 
+@dataclass
+class PipelineStep:
+    tickers: List[str]
+    # None marks an exclusion
+    weight: Optional[float] = None
+    min_weight: float = 0.0
+
+
+class IdealPortfolioPipeline:
+    """Records exclude/reweight calls against an IdealPortfolio and applies
+    them in one pass on collect(): exclusions are merged, reweights are
+    folded into a single multiplier per ticker, and the portfolio is
+    normalized once at the end. The result matches chaining the same
+    calls on the portfolio directly."""
+
+    def __init__(self, portfolio: IdealPortfolio):
+        self.portfolio = portfolio
+        self.steps: List[PipelineStep] = []
+
+    def exclude(self, exclusion_list: List[str]) -> "IdealPortfolioPipeline":
+        self.steps.append(PipelineStep(tickers=list(exclusion_list)))
+        return self
+
+    def reweight(
+        self,
+        ticker_list: List[str],
+        weight: Union[Decimal, float],
+        min_weight: Union[Decimal, float] = Decimal(0.005),
+    ) -> "IdealPortfolioPipeline":
+        self.steps.append(
+            PipelineStep(
+                tickers=list(ticker_list),
+                weight=float(weight),
+                min_weight=float(min_weight),
+            )
+        )
+        return self
+
+    def collect(self) -> IdealPortfolio:
+        output = self.portfolio._apply_steps(self.steps)
+        self.steps = []
+        return output
+
+
 class RealPortfolioElement(IdealPortfolioElement):
     ticker: str
     units: Decimal
@@ -359,19 +636,53 @@ class RealPortfolio(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
+    # maintained by add_holding; rebuilt lazily if holdings is swapped out
+    _holding_index: Optional[Dict[str, RealPortfolioElement]] = PrivateAttr(
+        default=None
+    )
+    _holdings_value: Optional[Decimal] = PrivateAttr(default=None)
+    _index_key: tuple = PrivateAttr(default=())
+
+    def invalidate_cache(self):
+        """Drop the cached ticker index and value total.
+
+        Call this after mutating holdings in place other than through
+        add_holding, such as editing an element's value directly."""
+        self._holding_index = None
+        self._holdings_value = None
+
+    def _cache_stale(self) -> bool:
+        return self._index_key != (id(self.holdings), len(self.holdings))
+
     @property
-    def _index(self):
-        return {val.ticker: val for val in self.holdings}
+    def _index(self) -> Dict[str, RealPortfolioElement]:
+        if self._holding_index is None or self._cache_stale():
+            self._holding_index = {val.ticker: val for val in self.holdings}
+            self._holdings_value = None
+            self._index_key = (id(self.holdings), len(self.holdings))
+        return self._holding_index
 
     def get_holding(self, ticker: str) -> RealPortfolioElement | None:
         return self._index.get(ticker)
 
+    @property
+    def holdings_value(self) -> Money:
+        # resets the cached total if holdings was swapped out
+        self._index
+        if self._holdings_value is None:
+            # summed over holdings, not the index, so that duplicate
+            # tickers each count
+            self._holdings_value = sum(
+                (item.value.value for item in self.holdings), Decimal(0)
+            )
+        return Money(value=self._holdings_value)
+
     @property
     def value(self) -> Money:
-        values: List[Money] = [item.value for item in self.holdings]
+        total = self.holdings_value
         if self.cash:
-            values += [self.cash]
-        return Money(value=sum(values))
+            total += self.cash
+        return total
 
     def _reweight_portfolio(self):
         value = self.value
@@ -381,21 +692,25 @@ class RealPortfolio(BaseModel):
             item.weight = Decimal(item.value.value / value.value)
 
     def add_holding(self, holding: RealPortfolioElement, reweight: bool = True):
-        existing = self._index.get(holding.ticker)
+        index = self._index
+        existing = index.get(holding.ticker)
         if existing:
             existing = existing + holding
         if not existing:
-            self.holdings.append(
-                RealPortfolioElement(
-                    ticker=holding.ticker,
-                    weight=holding.weight,
-                    units=holding.units,
-                    value=holding.value,
-                    unsettled=False,
-                    dividends=holding.dividends,
-                    appreciation=holding.appreciation,
-                )
+            element = RealPortfolioElement(
+                ticker=holding.ticker,
+                weight=holding.weight,
+                units=holding.units,
+                value=holding.value,
+                unsettled=False,
+                dividends=holding.dividends,
+                appreciation=holding.appreciation,
             )
+            self.holdings.append(element)
+            index[element.ticker] = element
+            self._index_key = (id(self.holdings), len(self.holdings))
+        if self._holdings_value is not None:
+            self._holdings_value += holding.value.value
         if reweight:
             self._reweight_portfolio()
 
@@ -415,20 +730,61 @@ class RealPortfolio(BaseModel):
             new = self.provider.get_holdings()
             self.holdings = new.holdings
             self.cash = new.cash
+            self.invalidate_cache()
             self._reweight_portfolio()
         else:
             raise ValueError("Cannot refresh real portfolio with no provider")
 
 
+_EMPTY_CONTRIBUTION = (Decimal(0), Money(value=0), Money(value=0), Money(value=0))
+
+
 class CompositePortfolio:
     """Provides a view on children portfolios, to enable planning
     across multiple providers"""
 
-    def __init__(self, portfolios: List[RealPortfolio]):
+    def __init__(
+        self,
+        portfolios: List[RealPortfolio],
+        unsettled_instruments: Optional[Dict[ProviderType, Set[str]]] = None,
+    ):
         self.portfolios: List[RealPortfolio] = portfolios
+        # prefetched by from_providers; None means ask each provider
+        self.unsettled_instruments = unsettled_instruments
+        self.timings: Dict[ProviderType, Dict[str, float]] = {}
         self._internal_base = RealPortfolio(holdings=[])
+        # per child: ticker -> (units, value, dividends, appreciation) last applied
+        self._contributions: Dict[int, Dict[str, tuple]] = {}
+        # ticker -> number of children currently holding it
+        self._refcounts: Dict[str, int] = {}
         self.rebuild_cache()
 
+    @classmethod
+    def from_providers(
+        cls, providers: List["BaseProvider"], max_workers: Optional[int] = None
+    ) -> "CompositePortfolio":
+        """Fetch holdings (including cash) and unsettled instruments from
+        every provider concurrently. Per-provider wall times in seconds are
+        kept on the result's timings attribute."""
+        from py_portfolio_index.portfolio_providers.common import fan_out
+
+        calls: Dict[tuple, Any] = {}
+        for provider in providers:
+            calls[(provider.PROVIDER, "holdings")] = provider.get_holdings
+            calls[(provider.PROVIDER, "unsettled")] = provider.get_unsettled_instruments
+        results, timings = fan_out(calls, max_workers=max_workers)
+        output = cls(
+            [results[(provider.PROVIDER, "holdings")] for provider in providers],
+            unsettled_instruments={
+                provider.PROVIDER: results[(provider.PROVIDER, "unsettled")]
+                for provider in providers
+            },
+        )
+        for (provider_type, call), elapsed in timings.items():
+            output.timings.setdefault(provider_type, {})[call] = elapsed
+        Logger.info(f"Fetched composite portfolio, timings {output.timings}")
+        return output
+
     @property
     def cash(self) -> Money:
         return Money(
@@ -436,10 +792,84 @@ class CompositePortfolio:
         )
 
     def rebuild_cache(self):
-        new = RealPortfolio(holdings=[])
+        self._internal_base = RealPortfolio(holdings=[])
+        self._contributions = {}
+        self._refcounts = {}
         for item in self.portfolios:
-            new += item
-        self._internal_base = new
+            self._apply_portfolio(item)
+        self._internal_base._reweight_portfolio()
+
+    @staticmethod
+    def _snapshot(portfolio: RealPortfolio) -> Dict[str, tuple]:
+        output: Dict[str, tuple] = {}
+        for item in portfolio.holdings:
+            values = (item.units, item.value, item.dividends, item.appreciation)
+            prior = output.get(item.ticker)
+            if prior:
+                values = tuple(a + b for a, b in zip(prior, values))
+            output[item.ticker] = values
+        return output
+
+    def _apply_portfolio(self, portfolio: RealPortfolio):
+        """Fold the difference between a child's current holdings and what
+        was last recorded for it into the aggregate"""
+        old = self._contributions.get(id(portfolio), {})
+        new = self._snapshot(portfolio)
+        base = self._internal_base
+        emptied = set()
+        for ticker in new.keys() | old.keys():
+            new_values = new.get(ticker, _EMPTY_CONTRIBUTION)
+            old_values = old.get(ticker, _EMPTY_CONTRIBUTION)
+            if new_values == old_values:
+                continue
+            if ticker not in old:
+                self._refcounts[ticker] = self._refcounts.get(ticker, 0) + 1
+            elif ticker not in new:
+                self._refcounts[ticker] -= 1
+                if not self._refcounts[ticker]:
+                    del self._refcounts[ticker]
+                    emptied.add(ticker)
+            units, value, dividends, appreciation = (
+                a - b for a, b in zip(new_values, old_values)
+            )
+            base.add_holding(
+                RealPortfolioElement(
+                    ticker=ticker,
+                    units=units,
+                    value=value,
+                    dividends=dividends,
+                    appreciation=appreciation,
+                ),
+                reweight=False,
+            )
+        if emptied:
+            base.holdings = [
+                item for item in base.holdings if item.ticker not in emptied
+            ]
+        self._contributions[id(portfolio)] = new
+
+    def add_portfolio(self, portfolio: RealPortfolio):
+        self.portfolios.append(portfolio)
+        self._apply_portfolio(portfolio)
+        self._internal_base._reweight_portfolio()
+
+    def update_portfolio(self, portfolio: RealPortfolio):
+        """Re-aggregate one child after its holdings changed, touching only
+        the tickers that moved"""
+        if not any(port is portfolio for port in self.portfolios):
+            raise ValueError("Portfolio is not part of this composite")
+        self._apply_portfolio(portfolio)
+        self._internal_base._reweight_portfolio()
+
+    def refresh_provider(self, provider: "ProviderType") -> RealPortfolio:
+        port = self.get_provider_portfolio(provider)
+        port.refresh()
+        if self.unsettled_instruments is not None and port.provider:
+            self.unsettled_instruments[provider] = (
+                port.provider.get_unsettled_instruments()
+            )
+        self.update_portfolio(port)
+        return port
 
     @property
     def internal_base(self):
@@ -486,18 +916,17 @@ class OrderElement(BaseModel):
             raise ValueError("Cannot add different tickers")
         if self.order_type != other.order_type:
             raise ValueError("Cannot add different order types")
+        # keep attribution when both sides agree on it
+        shared = dict(
+            ticker=self.ticker,
+            order_type=self.order_type,
+            price=self.price if self.price == other.price else None,
+            provider=self.provider if self.provider == other.provider else None,
+        )
         if self.value and other.value:
-            return OrderElement(
-                ticker=self.ticker,
-                order_type=self.order_type,
-                value=self.value + other.value,
-            )
+            return OrderElement(value=self.value + other.value, qty=None, **shared)
         elif self.qty and other.qty:
-            return OrderElement(
-                ticker=self.ticker,
-                order_type=self.order_type,
-                qty=self.qty + other.qty,
-            )
+            return OrderElement(qty=self.qty + other.qty, value=None, **shared)
         else:
             raise ValueError("Cannot add value and qty based orders")
 
@@ -519,32 +948,50 @@ class OrderPlan(BaseModel):
             output.add(y.ticker)
         return output
 
+    _index_cache: Dict[str, tuple] = PrivateAttr(default_factory=dict)
+
+    def _ticker_index(self, attr: str) -> Dict[str, int]:
+        orders: List[OrderElement] = getattr(self, attr)
+        key = (id(orders), len(orders))
+        cached = self._index_cache.get(attr)
+        if cached and cached[0] == key:
+            return cached[1]
+        index: Dict[str, int] = {}
+        for idx, item in enumerate(orders):
+            index.setdefault(item.ticker, idx)
+        self._index_cache[attr] = (key, index)
+        return index
+
+    def _merge(self, attr: str, incoming: List[OrderElement]):
+        orders: List[OrderElement] = getattr(self, attr)
+        index = self._ticker_index(attr)
+        for item in incoming:
+            idx = index.get(item.ticker)
+            if idx is None:
+                index[item.ticker] = len(orders)
+                orders.append(item)
+            else:
+                orders[idx] = orders[idx] + item
+        self._index_cache[attr] = ((id(orders), len(orders)), index)
+
     def __add__(self, other: "OrderPlan"):
         if other == 0:
             return self
         if not isinstance(other, OrderPlan):
             raise ValueError(f"Cannot add {type(other)} to OrderPlan")
-        for x in other.to_buy:
-            found = False
-            for y in self.to_buy:
-                if x.ticker == y.ticker:
-                    x = x + y
-                    found = True
-                    break
-            if not found:
-                self.to_buy.append(x)
-
-        for sx in other.to_sell:
-            found = False
-            for sy in self.to_sell:
-                if sx.ticker == sy.ticker:
-                    sx = sx + sy
-                    found = True
-                    break
-            if not found:
-                self.to_sell.append(sx)
+        self._merge("to_buy", other.to_buy)
+        self._merge("to_sell", other.to_sell)
         return self
 
+    @classmethod
+    def merge_many(cls, plans: Iterable["OrderPlan"]) -> "OrderPlan":
+        """Combine many plans into a new one, summing orders per ticker.
+        The inputs are left untouched."""
+        output = cls(to_buy=[], to_sell=[])
+        for plan in plans:
+            output += plan
+        return output
+
 
 """date,symbol,quantity,activityType,unitPrice,currency,fee
 2024-03-01T15:02:36.329Z,MSFT,1,DIVIDEND,57.5,USD,0
@@ -562,6 +1009,15 @@ class OrderPlan(BaseModel):
 2023-03-11T14:55:30.863Z,$CASH-USD,100000,DEPOSIT,1,USD,0"""
 
 
+class OrderResult(BaseModel):
+    """Outcome of submitting one element of an order plan"""
+
+    element: OrderElement
+    success: bool
+    units: Optional[Decimal] = None
+    error: Optional[str] = None
+
+
 class Transaction(BaseModel):
     date: date
     ticker: str
@@ -1,5 +1,19 @@
+from array import array
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Optional, Dict, Union, Mapping, List, Callable
+from typing import (
+    Any,
+    Optional,
+    Dict,
+    Union,
+    Mapping,
+    List,
+    Callable,
+    Sequence,
+    Set,
+    cast,
+)
 from decimal import Decimal
 from math import floor, ceil
 from collections import defaultdict
@@ -7,6 +21,14 @@ from py_portfolio_index.common import print_per
 from py_portfolio_index.constants import Logger
 from py_portfolio_index.enums import PurchaseStrategy, RoundingStrategy
 from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+from py_portfolio_index.portfolio_providers.async_provider import (
+    AsyncBaseProvider,
+    as_async_provider,
+)
+from py_portfolio_index.portfolio_providers.common import (
+    accepts_fail_on_missing,
+    fan_out,
+)
 from py_portfolio_index.exceptions import PriceFetchError
 from py_portfolio_index.models import (
     Money,
@@ -270,6 +292,40 @@ def gen_diff_and_scaling(
     return scaling_factor, diff_output
 
 
+def fetch_prices(
+    price_fetcher: Callable, tickers: List[str]
+) -> tuple[Dict[str, Any], set[str]]:
+    """Get prices in one round trip, returning them with the set of tickers
+    that had none. Fetchers without a fail_on_missing option that raise
+    PriceFetchError get a single retry without the failed tickers."""
+    if accepts_fail_on_missing(price_fetcher):
+        prices = price_fetcher(tickers, fail_on_missing=False)
+    else:
+        try:
+            prices = price_fetcher(tickers)
+        except PriceFetchError as e:
+            failed = set(e.tickers)
+            prices = price_fetcher([t for t in tickers if t not in failed])
+    missing = {ticker for ticker in tickers if prices.get(ticker) is None}
+    return prices, missing
+
+
+def redistribute_missing_weight(
+    output: Dict[str, ComparisonResult], missing: set[str]
+) -> Money:
+    """Drop tickers from a comparison and spread their model weight
+    proportionally over the rest. Returns the value held in the dropped
+    tickers."""
+    dropped = [output.pop(ticker) for ticker in missing if ticker in output]
+    removed = sum((item.model for item in dropped), Decimal(0))
+    remaining = sum((item.model for item in output.values()), Decimal(0))
+    if removed and remaining:
+        factor = (remaining + removed) / remaining
+        for item in output.values():
+            item.model = item.model * factor
+    return sum((item.actual for item in dropped), Money(value=0))
+
+
 def generate_order_plan(
     real: PortfolioProtocol,
     ideal: IdealPortfolio,
@@ -335,37 +391,20 @@ def generate_order_plan(
         f"Total portfolio % delta {print_per(diff)}. Overweight {print_per(selling)}, underweight {print_per(buying)}, have {purchase_power}"
     )
 
+    prices, price_missing = fetch_prices(price_fetcher, [*output.keys()])
+    if price_missing:
+        Logger.info(
+            f"Was unable to fetch prices for {price_missing} tickers, adding to skipped."
+        )
+        if not skip_invalid:
+            raise PriceFetchError(sorted(price_missing), "No price available")
+        currently_held -= redistribute_missing_weight(output, price_missing)
+
     scaling_factor, diff_output = gen_diff_and_scaling(
         buy_order, output, safe_purchase_power, target_value, currently_held
     )
     to_purchase: list[OrderElement] = []
     to_sell: list[OrderElement] = []
-    price_missing: set[str] = set()
-    try:
-        prices = price_fetcher([*diff_output.keys()])
-    except PriceFetchError as e:
-        for x in e.tickers:
-            price_missing.add(x)
-        Logger.info(
-            f"Was unable to fetch prices for {price_missing} tickers, adding to skipped."
-        )
-        if not skip_invalid:
-            raise e
-        return generate_order_plan(
-            real=real,
-            ideal=ideal,
-            price_fetcher=price_fetcher,
-            buy_order=buy_order,
-            target_size=target_size,
-            purchase_power=purchase_power,
-            min_order_value=min_order_value,
-            skip_tickers=(
-                skip_tickers.union(price_missing) if skip_tickers else price_missing
-            ),
-            fractional_shares=fractional_shares,
-            provider=provider,
-            existing_orders=current_orders,
-        )
 
     for key, diffvalue in diff_output.items():
         sell_order = generate_sell_order(
@@ -379,7 +418,7 @@ def generate_order_plan(
             to_sell.append(sell_order)
 
     for key, diffvalue in diff_output.items():
-        buy_order = generate_buy_order(
+        buy_element = generate_buy_order(
             min_order_value=min_order_value,
             scaling_factor=scaling_factor,
             purchase_power=safe_purchase_power,
@@ -391,21 +430,287 @@ def generate_order_plan(
             provider=provider,
             fractional_shares=fractional_shares,
         )
-        if buy_order:
-            if buy_order.value:
-                safe_purchase_power = safe_purchase_power - buy_order.value
-            elif buy_order.qty:
+        if buy_element:
+            if buy_element.value:
+                safe_purchase_power = safe_purchase_power - buy_element.value
+            elif buy_element.qty:
                 safe_purchase_power = safe_purchase_power - (
-                    prices[key] * buy_order.qty
+                    prices[key] * buy_element.qty
                 )
-            Logger.debug(f"{safe_purchase_power} left - order is {buy_order}")
-            to_purchase.append(buy_order)
+            Logger.debug(f"{safe_purchase_power} left - order is {buy_element}")
+            to_purchase.append(buy_element)
         if safe_purchase_power <= 0:
             break
 
     return OrderPlan(to_buy=to_purchase, to_sell=to_sell)
 
 
+def _buy_order_amounts(
+    need,
+    prices,
+    min_order_value: float,
+    scaling_factor: float,
+    peanut_butter: bool,
+    fractional_shares: bool,
+):
+    """Array form of the sizing in generate_buy_order.
+    Returns the quantity (0 for value orders), value and spend per row."""
+    import numpy as np
+
+    target = need
+    if peanut_butter:
+        target = np.maximum(target * scaling_factor, 1.0)
+    target = np.maximum(target, min_order_value)
+    if fractional_shares:
+        return np.zeros(len(target), dtype=np.int64), target, target
+    with np.errstate(divide="ignore", invalid="ignore"):
+        qty = np.where(prices > 0, np.floor(target / prices), 0).astype(np.int64)
+    spend = prices * qty
+    return qty, spend, spend
+
+
+def generate_order_plan_vectorized(
+    real: PortfolioProtocol,
+    ideal: IdealPortfolio,
+    price_fetcher: Callable,
+    buy_order=PurchaseStrategy.LARGEST_DIFF_FIRST,
+    target_size: Optional[Money | float | int] = None,
+    purchase_power: Optional[Money | float | int] = None,
+    min_order_value: Money = MIN_ORDER_MONEY,
+    skip_tickers: Optional[set[str]] = None,
+    fractional_shares: bool = True,
+    provider: ProviderType | None = None,
+    existing_orders: List[OrderElement] | None = None,
+    skip_invalid: bool = True,
+    include_sell_orders: bool = False,
+) -> OrderPlan:
+    """Array-backed equivalent of generate_order_plan.
+
+    Weights, holdings, pending orders and prices are loaded into float64
+    arrays once, so diffs, ordering, PEANUT_BUTTER scaling and the
+    purchase power cutoff are computed in bulk rather than per ticker.
+    Requires numpy."""
+    import numpy as np
+
+    target_value: Money = Money(value=target_size) if target_size else real.value
+    target = float(target_value)
+    power = float(Money(value=purchase_power or target_value))
+    current_orders = existing_orders or []
+
+    tickers, weights = ideal.columns()
+    if skip_tickers:
+        keep = [idx for idx, ticker in enumerate(tickers) if ticker not in skip_tickers]
+        tickers = [tickers[idx] for idx in keep]
+        weights = array("d", (weights[idx] for idx in keep))
+
+    held: dict[str, float] = {item.ticker: float(item.value) for item in real.holdings}
+    pending: dict[str, float] = defaultdict(float)
+    for current_order in current_orders:
+        pending[current_order.ticker] += float(current_order.inferred_value)
+
+    model = np.frombuffer(weights, dtype=np.float64)
+    actual = np.array(
+        [held.get(ticker, 0.0) + pending.get(ticker, 0.0) for ticker in tickers],
+        dtype=np.float64,
+    )
+    comparison = np.where(actual == 0, 0.0, actual / target)
+    currently_held = float(actual.sum())
+    diff = model - comparison
+    abs_diff = np.abs(diff)
+
+    total_delta = Decimal(float(np.round(abs_diff, 4).sum()))
+    selling = Decimal(float(abs_diff[diff < 0].sum()))
+    buying = Decimal(float(abs_diff[diff > 0].sum()))
+    Logger.info(
+        f"Total portfolio % delta {print_per(total_delta)}. Overweight {print_per(selling)}, underweight {print_per(buying)}, have {purchase_power}"
+    )
+
+    prices, price_missing = fetch_prices(price_fetcher, tickers)
+    if price_missing:
+        Logger.info(
+            f"Was unable to fetch prices for {price_missing} tickers, adding to skipped."
+        )
+        if not skip_invalid:
+            raise PriceFetchError(sorted(price_missing), "No price available")
+        keep_mask = np.array([ticker not in price_missing for ticker in tickers])
+        tickers = [ticker for ticker in tickers if ticker not in price_missing]
+        dropped_weight = float(model[~keep_mask].sum())
+        model = model[keep_mask]
+        kept_weight = float(model.sum())
+        if dropped_weight and kept_weight:
+            model = model * ((kept_weight + dropped_weight) / kept_weight)
+        actual = actual[keep_mask]
+        comparison = comparison[keep_mask]
+        currently_held = float(actual.sum())
+        diff = model - comparison
+        abs_diff = np.abs(diff)
+
+    scaling_factor = 1.0
+    if buy_order == PurchaseStrategy.LARGEST_DIFF_FIRST:
+        order = np.argsort(-abs_diff, kind="stable")
+    elif buy_order == PurchaseStrategy.CHEAPEST_FIRST:
+        order = np.argsort(abs_diff, kind="stable")
+    elif buy_order == PurchaseStrategy.PEANUT_BUTTER:
+        scaling_factor = power / (target - currently_held)
+        order = np.argsort(abs_diff, kind="stable")
+    else:
+        raise ValueError("Invalid purchase strategy")
+
+    ordered = [tickers[idx] for idx in order]
+    model = model[order]
+    comparison = comparison[order]
+    diff = diff[order]
+    price = np.array(
+        [float(prices.get(ticker) or 0.0) for ticker in ordered], dtype=np.float64
+    )
+    has_diff = np.round(diff, 4) != 0
+
+    to_sell: list[OrderElement] = []
+    if include_sell_orders:
+        sell_target = target * comparison - target * model
+        sellable = has_diff & (diff < 0) & (price > 0)
+        for row in np.flatnonzero(sellable):
+            to_sell.append(
+                OrderElement(
+                    ticker=ordered[row],
+                    value=Money(value=max(float(sell_target[row]), MIN_ORDER_SIZE)),
+                    order_type=OrderType.SELL,
+                    qty=int(floor(sell_target[row] / price[row])),
+                    provider=provider,
+                )
+            )
+
+    # size every underweight ticker as if purchase power never ran out
+    need = target * model - target * comparison
+    peanut_butter = buy_order == PurchaseStrategy.PEANUT_BUTTER
+    qty, value, spend = _buy_order_amounts(
+        need,
+        price,
+        float(min_order_value),
+        scaling_factor,
+        peanut_butter,
+        fractional_shares,
+    )
+    eligible = has_diff & (diff > 0) & (price > 0)
+    if not fractional_shares:
+        eligible &= qty > 0
+    spend = np.where(eligible, spend, 0.0)
+    # purchase power left before each row is considered
+    remaining = power - (np.cumsum(spend) - spend)
+    # the first row that would be capped by (or finds no) purchase power
+    # ends the bulk prefix; anything after it is sized one at a time
+    stop = np.flatnonzero((remaining <= 0) | (eligible & (need > remaining)))
+    cutoff = int(stop[0]) if len(stop) else len(ordered)
+
+    accepted: list[tuple[int, int, float]] = [
+        (int(row), int(qty[row]), float(value[row]))
+        for row in np.flatnonzero(eligible[:cutoff])
+    ]
+    left = float(remaining[cutoff]) if cutoff < len(ordered) else 0.0
+    for idx in range(cutoff, len(ordered)):
+        if left <= 0:
+            break
+        if eligible[idx]:
+            capped = np.array([min(float(need[idx]), left)])
+            row_qty, row_value, row_spend = _buy_order_amounts(
+                capped,
+                price[idx : idx + 1],
+                float(min_order_value),
+                scaling_factor,
+                peanut_butter,
+                fractional_shares,
+            )
+            if fractional_shares or row_qty[0] > 0:
+                accepted.append((idx, int(row_qty[0]), float(row_value[0])))
+                left -= float(row_spend[0])
+
+    to_purchase: list[OrderElement] = []
+    for idx, row_qty, row_value in accepted:
+        ticker = ordered[idx]
+        to_purchase.append(
+            OrderElement(
+                ticker=ticker,
+                value=Money(value=row_value) if fractional_shares else None,
+                qty=None if fractional_shares else row_qty,
+                price=Money(value=prices[ticker]),
+                order_type=OrderType.BUY,
+                provider=provider,
+            )
+        )
+    return OrderPlan(to_buy=to_purchase, to_sell=to_sell)
+
+
+def fastest_quote_provider(
+    providers: List[BaseProvider], probe: List[str]
+) -> BaseProvider:
+    """Request the same small batch of quotes from every candidate at once
+    and return the first provider to answer without error"""
+    if len(providers) == 1:
+        return providers[0]
+    executor = ThreadPoolExecutor(max_workers=len(providers))
+    futures = {
+        executor.submit(provider.get_instrument_prices, probe): provider
+        for provider in providers
+    }
+    try:
+        for future in as_completed(futures):
+            if future.exception() is None:
+                winner = futures[future]
+                Logger.info(f"Using {winner.PROVIDER} as shared quote source")
+                return winner
+            Logger.info(
+                f"Quote probe against {futures[future].PROVIDER} failed: {future.exception()}"
+            )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    raise PriceFetchError(probe, "No provider was able to return quotes")
+
+
+def prefetch_prices(
+    provider: BaseProvider,
+    tickers: List[str],
+    batch_size: int = 200,
+    max_workers: int = 8,
+) -> Dict[str, Optional[Decimal]]:
+    """Fetch quotes for tickers in concurrent batches. Tickers without a
+    price come back as None; batches that fail outright are left out so
+    callers can retry those tickers individually."""
+    batches = [
+        tickers[idx : idx + batch_size] for idx in range(0, len(tickers), batch_size)
+    ]
+    prices: Dict[str, Optional[Decimal]] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                provider.get_instrument_prices, batch, fail_on_missing=False
+            )
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            try:
+                prices.update(future.result())
+            except PriceFetchError as e:
+                Logger.info(f"Prefetch batch failed for {len(e.tickers)} tickers")
+    return prices
+
+
+def shared_price_fetcher(
+    prices: Dict[str, Optional[Decimal]], fallback: Callable
+) -> Callable:
+    """Build a price_fetcher that answers from prefetched quotes and only
+    calls fallback for tickers that were not prefetched"""
+
+    def fetch(
+        tickers: List[str], fail_on_missing: bool = True
+    ) -> Dict[str, Optional[Decimal]]:
+        missing = [ticker for ticker in tickers if ticker not in prices]
+        if missing:
+            prices.update(fallback(missing, fail_on_missing=fail_on_missing))
+        return {ticker: prices.get(ticker) for ticker in tickers}
+
+    return fetch
+
+
 def generate_composite_order_plan(
     composite: CompositePortfolio,
     ideal: IdealPortfolio,
@@ -415,7 +720,25 @@ def generate_composite_order_plan(
     safety_threshold: Decimal = Decimal(0.95),
     target_order_size: Optional[Money] = None,
     include_sell_orders: bool = False,
+    vectorized: bool = False,
+    shared_quotes: bool = False,
+    quote_providers: Optional[List[BaseProvider]] = None,
+    own_quote_providers: Optional[Set[ProviderType]] = None,
+    unsettled_instruments: Optional[Mapping[ProviderType, Set[str]]] = None,
+    prefetched_prices: Optional[
+        Mapping[ProviderType, Dict[str, Optional[Decimal]]]
+    ] = None,
 ) -> Mapping[ProviderType, OrderPlan]:
+    """Plan orders for each provider in the composite in turn.
+
+    With shared_quotes, prices for the ideal portfolio are fetched once,
+    from whichever of quote_providers (default: the composite's providers)
+    answers fastest, and reused for every plan. Providers listed in
+    own_quote_providers keep fetching their own quotes, for brokers whose
+    order sizing needs their own prices.
+
+    unsettled_instruments and prefetched_prices, keyed by provider type,
+    are used in place of asking the providers where given."""
     provider_to_portfolio_map = {
         x.provider: x for x in composite.portfolios if x.provider
     }
@@ -440,13 +763,31 @@ def generate_composite_order_plan(
     output: defaultdict[ProviderType, OrderPlan] = defaultdict(
         lambda: OrderPlan(to_buy=[], to_sell=[])
     )
+    unsettled = unsettled_instruments or composite.unsettled_instruments
+    if unsettled is None:
+        unsettled, _ = fan_out(
+            {x.PROVIDER: x.get_unsettled_instruments for x in providers}
+        )
     skip_tickers: set[str] = set()
     for provider in providers:
-        skip_tickers = skip_tickers.union(provider.get_unsettled_instruments())
+        skip_tickers = skip_tickers.union(unsettled.get(provider.PROVIDER, set()))
 
     purchase_order = sorted(
-        providers, key=lambda x: (x.SUPPORTS_FRACTIONAL_SHARES, x.cash)
+        providers,
+        key=lambda x: (
+            x.SUPPORTS_FRACTIONAL_SHARES,
+            provider_to_portfolio_map[x].cash,
+        ),
     )
+    own_quote_providers = own_quote_providers or set()
+    shared_prices: Dict[str, Optional[Decimal]] = {}
+    quote_source: Optional[BaseProvider] = None
+    if shared_quotes and providers:
+        tickers = [t for t in ideal.columns()[0] if t not in skip_tickers]
+        quote_source = fastest_quote_provider(
+            quote_providers or providers, tickers[:10]
+        )
+        shared_prices = prefetch_prices(quote_source, tickers)
     orders: list[OrderElement] = []
     for provider in purchase_order:
         provider_purchase_power: Money = purchase_power_money.get(
@@ -467,7 +808,19 @@ def generate_composite_order_plan(
         local_max_spend = port.cash * safety_threshold
         local_purchase_power = min(provider_purchase_power, local_max_spend)
 
-        purchase_plan: OrderPlan = generate_order_plan(
+        planner = generate_order_plan_vectorized if vectorized else generate_order_plan
+        if prefetched_prices and provider.PROVIDER in prefetched_prices:
+            price_fetcher = shared_price_fetcher(
+                dict(prefetched_prices[provider.PROVIDER]),
+                provider.get_instrument_prices,
+            )
+        elif quote_source and provider.PROVIDER not in own_quote_providers:
+            price_fetcher = shared_price_fetcher(
+                shared_prices, quote_source.get_instrument_prices
+            )
+        else:
+            price_fetcher = provider.get_instrument_prices
+        purchase_plan: OrderPlan = planner(
             ideal=ideal,
             real=composite,
             buy_order=purchase_order_maps[provider.PROVIDER],
@@ -477,7 +830,7 @@ def generate_composite_order_plan(
             min_order_value=min_order_value,
             skip_tickers=skip_tickers,
             fractional_shares=provider.SUPPORTS_FRACTIONAL_SHARES,
-            price_fetcher=provider.get_instrument_prices,
+            price_fetcher=price_fetcher,
             provider=provider.PROVIDER,
             existing_orders=orders,
             include_sell_orders=include_sell_orders,
@@ -500,3 +853,117 @@ def purchase_composite_order_plan(
         else:
             Logger.info(f"Provider {provider.PROVIDER} has no orders to execute")
     return True
+
+
+async def generate_composite_order_plan_async(
+    composite: CompositePortfolio,
+    ideal: IdealPortfolio,
+    purchase_order_maps: Mapping[ProviderType, PurchaseStrategy] | PurchaseStrategy,
+    target_size: Optional[Money | float | int],
+    min_order_value: Money = MIN_ORDER_MONEY,
+    safety_threshold: Decimal = Decimal(0.95),
+    target_order_size: Optional[Money] = None,
+    include_sell_orders: bool = False,
+    vectorized: bool = False,
+    providers: Optional[Sequence[AsyncBaseProvider]] = None,
+) -> Mapping[ProviderType, OrderPlan]:
+    """generate_composite_order_plan for event loops.
+
+    Unsettled instruments and quotes for the ideal portfolio are awaited
+    from every provider at once, so the network time is that of the
+    slowest broker; planning then runs on the prefetched data. providers
+    defaults to as_async() of each provider in the composite."""
+    owned: List[AsyncBaseProvider] = []
+    if providers is None:
+        providers = owned = [
+            as_async_provider(cast(BaseProvider, x.provider))
+            for x in composite.portfolios
+            if x.provider
+        ]
+    try:
+        unsettled, prices = await _prefetch_plan_inputs(composite, ideal, providers)
+    finally:
+        await _aclose_all(owned)
+    return generate_composite_order_plan(
+        composite,
+        ideal,
+        purchase_order_maps,
+        target_size,
+        min_order_value=min_order_value,
+        safety_threshold=safety_threshold,
+        target_order_size=target_order_size,
+        include_sell_orders=include_sell_orders,
+        vectorized=vectorized,
+        unsettled_instruments=unsettled,
+        prefetched_prices=prices,
+    )
+
+
+async def _aclose_all(providers: Sequence[AsyncBaseProvider]) -> None:
+    """Close async wrappers this module opened; the caller's own are left
+    open"""
+    await asyncio.gather(*[x.aclose() for x in providers])
+
+
+async def _prefetch_plan_inputs(
+    composite: CompositePortfolio,
+    ideal: IdealPortfolio,
+    providers: Sequence[AsyncBaseProvider],
+) -> tuple[
+    Dict[ProviderType, Set[str]], Dict[ProviderType, Dict[str, Optional[Decimal]]]
+]:
+    tickers = list(ideal.columns()[0])
+    unsettled = composite.unsettled_instruments
+    if unsettled is None:
+        unsettled = dict(
+            zip(
+                [x.PROVIDER for x in providers],
+                await asyncio.gather(
+                    *[x.get_unsettled_instruments() for x in providers]
+                ),
+            )
+        )
+    skip_tickers = set().union(*unsettled.values())
+    wanted = [t for t in tickers if t not in skip_tickers]
+    prices = dict(
+        zip(
+            [x.PROVIDER for x in providers],
+            await asyncio.gather(
+                *[
+                    x.get_instrument_prices(wanted, fail_on_missing=False)
+                    for x in providers
+                ]
+            ),
+        )
+    )
+    return unsettled, prices
+
+
+async def purchase_composite_order_plan_async(
+    orders: Mapping[ProviderType, OrderPlan],
+    providers: Sequence[BaseProvider | AsyncBaseProvider],
+    include_sell_orders: bool = False,
+):
+    """Execute each provider's plan, with every provider submitting at
+    once. Within one provider, up to its MAX_CONCURRENT_ORDERS orders are
+    in flight at a time."""
+    calls = []
+    owned: List[AsyncBaseProvider] = []
+    try:
+        for provider in providers:
+            if provider.PROVIDER in orders:
+                async_provider = as_async_provider(provider)
+                if async_provider is not provider:
+                    owned.append(async_provider)
+                calls.append(
+                    async_provider.purchase_order_plan(
+                        orders[provider.PROVIDER],
+                        include_sell_orders=include_sell_orders,
+                    )
+                )
+            else:
+                Logger.info(f"Provider {provider.PROVIDER} has no orders to execute")
+        await asyncio.gather(*calls)
+    finally:
+        await _aclose_all(owned)
+    return True
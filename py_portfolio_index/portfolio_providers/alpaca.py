@@ -3,7 +3,6 @@ from .base_portfolio import BaseProvider
 from decimal import Decimal
 from typing import Optional
 from datetime import date, datetime, timezone, timedelta
-from functools import lru_cache
 from py_portfolio_index.models import Money
 from os import environ
 
@@ -36,9 +35,8 @@ class AlpacaProviderLegacy(BaseProvider):
         )
         BaseProvider.__init__(self)
 
-    @lru_cache(maxsize=None)
     def _get_instrument_price(
-        self, ticker: str, at_day: Optional[date] = None
+        self, ticker: str, at_day: Optional[date] = None, fail_on_missing: bool = True
     ) -> Optional[Decimal]:
         from alpaca_trade_api.rest import TimeFrame, TimeFrameUnit
 
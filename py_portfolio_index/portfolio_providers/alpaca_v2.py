@@ -4,25 +4,60 @@ from py_portfolio_index.models import (
     Money,
     ProfitModel,
 )
+from py_portfolio_index.constants import Logger
 from py_portfolio_index.exceptions import ConfigurationError, OrderError
 from py_portfolio_index.portfolio_providers.base_portfolio import (
     BaseProvider,
-    CachedValue,
     ObjectKey,
 )
+from py_portfolio_index.portfolio_providers.async_provider import AsyncBaseProvider
 from decimal import Decimal
-from typing import Optional, Dict, List, Set, DefaultDict, cast
+from typing import (
+    Any,
+    Callable,
+    Optional,
+    Dict,
+    Iterator,
+    List,
+    Set,
+    DefaultDict,
+    cast,
+)
 from datetime import date, datetime, timezone, timedelta
 from py_portfolio_index.common import divide_into_batches
-from py_portfolio_index.enums import Currency, ProviderType, OrderType
+from py_portfolio_index.enums import (
+    Currency,
+    EndpointClass,
+    ProviderType,
+    OrderType,
+)
 from py_portfolio_index.models import DividendResult, Transaction
 from os import environ
-from py_portfolio_index.portfolio_providers.common import PriceCache
+from py_portfolio_index.portfolio_providers.common import PriceCache, RateLimit
 from collections import defaultdict
-import requests
+import asyncio
 import json
 
 MAX_OPEN_ORDER_SIZE = 500
+DATA_BASE = "https://data.alpaca.markets"
+
+
+def price_window(at_day: Optional[date] = None) -> tuple[datetime, datetime]:
+    """Range of daily bars to search for the price at at_day, or for the
+    latest price"""
+    if at_day:
+        today = datetime.now(tz=timezone.utc)
+        start = min(
+            datetime(at_day.year, at_day.month, at_day.day, tzinfo=timezone.utc),
+            today - timedelta(days=7),
+        )
+        end = min(
+            datetime.now(tz=timezone.utc) - timedelta(minutes=30),
+            start + timedelta(days=7),
+        )
+        return start, end
+    default = datetime.now(tz=timezone.utc) - timedelta(hours=1)
+    return default - timedelta(days=7), default
 
 
 def filter_prices_response(
@@ -43,13 +78,21 @@ def filter_prices_response(
 class AlpacaProvider(BaseProvider):
     SUPPORTS_BATCH_HISTORY = 50
     PROVIDER = ProviderType.ALPACA
+    # well inside the trading API's 200 requests a minute
+    MAX_CONCURRENT_ORDERS = 8
+    # the trading API's 200 a minute is split between orders and account
+    # reads; market data has its own 200
+    RATE_LIMITS = {
+        EndpointClass.QUOTES: RateLimit(requests=180, per_seconds=60, burst=10),
+        EndpointClass.ORDERS: RateLimit(requests=100, per_seconds=60, burst=10),
+        EndpointClass.ACCOUNT: RateLimit(requests=80, per_seconds=60, burst=10),
+    }
 
     API_KEY_VARIABLE = "ALPACA_API_KEY"
     API_SECRET_VARIABLE = "ALPACA_API_SECRET"
 
     LEGACY_BASE = "https://api.alpaca.markets"
-
-    CACHE: dict[str, CachedValue] = {}
+    DIVIDENDS_NEWEST_FIRST = True
 
     def __init__(
         self,
@@ -116,16 +159,10 @@ class AlpacaProvider(BaseProvider):
         from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
         from alpaca.data.requests import StockBarsRequest, Adjustment
 
+        start, end = price_window(at_day)
+        # one request per call; _get_instrument_prices_wrapper batches
+        self._throttle(EndpointClass.QUOTES)
         if at_day:
-            today = datetime.now(tz=timezone.utc)
-            start = min(
-                datetime(at_day.year, at_day.month, at_day.day, tzinfo=timezone.utc),
-                today - timedelta(days=7),
-            )
-            end = min(
-                datetime.now(tz=timezone.utc) - timedelta(minutes=30),
-                start + timedelta(days=7),
-            )
             raw = self.historical_client.get_stock_bars(
                 StockBarsRequest(
                     symbol_or_symbols=tickers,
@@ -141,9 +178,6 @@ class AlpacaProvider(BaseProvider):
 
             return {ticker: filter_prices_response(ticker, raw) for ticker in tickers}
         else:
-            default = datetime.now(tz=timezone.utc) - timedelta(hours=1)
-            start = default - timedelta(days=7)
-            end = default
             raw = self.historical_client.get_stock_bars(
                 StockBarsRequest(
                     symbol_or_symbols=tickers,
@@ -193,102 +227,128 @@ class AlpacaProvider(BaseProvider):
     def _get_instrument_price(
         self, ticker: str, at_day: Optional[date] = None, fail_on_missing: bool = True
     ) -> Optional[Decimal]:
-        return self._price_cache.get_prices(tickers=[ticker], date=at_day)[ticker]
+        # called by the PriceCache on a miss; going back through it would
+        # wait on this same fetch
+        return self._get_instrument_prices_wrapper(
+            [ticker], at_day=at_day, fail_on_missing=fail_on_missing
+        ).get(ticker)
 
     def get_transactions(self) -> List[Transaction]:
         """
         Get all filled transactions from Alpaca API.
         Only returns orders that have been filled (executed).
-        Uses timestamp-based pagination as order ID pagination is not available in current alpaca-py.
+        """
+        return list(self.iter_transactions())
+
+    def iter_transactions(
+        self,
+        since: datetime | None = None,
+        checkpoint: datetime | None = None,
+        on_checkpoint: Callable[[datetime], Any] | None = None,
+    ) -> Iterator[Transaction]:
+        """
+        Yield filled transactions, most recent first, a page at a time.
+
+        since limits the query to orders submitted after it. Orders are
+        paged by submission timestamp, as order ID pagination is not
+        available in current alpaca-py; checkpoint resumes a previous pass
+        from a timestamp it reported, repeating the few orders submitted at
+        that instant. on_checkpoint is called after each page with the
+        timestamp to resume from.
         """
         from alpaca.trading.requests import GetOrdersRequest, QueryOrderStatus
-        from alpaca.trading.enums import OrderSide
         from alpaca.common.enums import Sort
         from alpaca.trading.models import Order
 
-        all_orders: List[Order] = []
         CHUNK_SIZE = 500  # Maximum allowed per API docs
-        until_time = None  # Start from the most recent
+        until_time = checkpoint  # None starts from the most recent
+        # ids at or before the page boundary, which the next page repeats
+        overlap_ids: Set[Any] = set()
+        fetched = 0
 
-        # Get all filled orders using timestamp-based pagination
         while True:
-            # Create filter request
             filter_request = GetOrdersRequest(
                 status=QueryOrderStatus.CLOSED,  # Only get closed orders
                 limit=CHUNK_SIZE,
+                after=since,
                 until=until_time,
                 direction=Sort.DESC,  # Get most recent first
             )
-
+            self._throttle(EndpointClass.ACCOUNT)
             response = cast(
                 List[Order], self.trading_client.get_orders(filter=filter_request)
             )
-
             if not response:  # No more orders
-                break
+                return
+            fetched += len(response)
+            Logger.debug(f"Fetched {fetched} Alpaca orders so far")
 
-            all_orders.extend(response)
+            for order in response:
+                if order.id in overlap_ids:
+                    continue
+                transaction = self._order_to_transaction(order)
+                if transaction:
+                    yield transaction
 
             # Check if we got a full batch (meaning there might be more)
             if len(response) < CHUNK_SIZE:
-                break  # This was the last batch
+                return  # This was the last batch
 
             # Set the until timestamp for the next batch to the oldest order in this batch
             # Use a small offset hack to avoid missing orders with identical timestamps
-            until_time = (
+            next_until = (
                 response[-3].submitted_at
                 if len(response) >= 3
                 else response[-1].submitted_at
             )
-            print("Fetched", len(all_orders), "orders so far...")
-
-        # Remove any duplicate orders by ID (in case of timestamp overlap)
-        seen_ids = set()
-        unique_orders = []
-        for order in all_orders:
-            if order.id not in seen_ids:
-                unique_orders.append(order)
-                seen_ids.add(order.id)
-
-        transactions: List[Transaction] = []
-
-        for order in unique_orders:
-            # Skip orders that don't have filled price, quantity, or symbol
-            if not order.filled_avg_price or not order.filled_qty or not order.symbol:
-                continue
-
-            # Map OrderSide to TransactionType
-            transaction_type = None
-            if order.side == OrderSide.BUY:
-                transaction_type = OrderType.BUY
-            elif order.side == OrderSide.SELL:
-                transaction_type = OrderType.SELL
-            else:
-                continue  # Skip unknown transaction types
-
-            try:
-                transactions.append(
-                    Transaction(
-                        date=(
-                            order.filled_at.date()
-                            if order.filled_at
-                            else order.submitted_at.date()
-                        ),
-                        ticker=order.symbol,
-                        qty=Decimal(
-                            str(order.filled_qty)
-                        ),  # Use filled_qty instead of qty
-                        type=transaction_type,
-                        unitPrice=Money(value=Decimal(str(order.filled_avg_price))),
-                        currency=Currency.USD,
-                    )
+            if next_until == until_time:
+                next_until = response[-1].submitted_at
+            if next_until is None or next_until == until_time:
+                Logger.warning(
+                    f"Could not page past {until_time}: a full page of orders shares it"
                 )
-            except (ValueError, TypeError, AttributeError) as e:
-                # Log the error and skip this order
-                print(f"Error processing order {order.id}: {e}")
-                continue
+                return
+            until_time = next_until
+            overlap_ids = {
+                order.id
+                for order in response
+                if order.submitted_at and order.submitted_at <= until_time
+            }
+            if on_checkpoint:
+                on_checkpoint(until_time)
 
-        return transactions
+    def _order_to_transaction(self, order) -> Optional[Transaction]:
+        from alpaca.trading.enums import OrderSide
+
+        # Skip orders that don't have filled price, quantity, or symbol
+        if not order.filled_avg_price or not order.filled_qty or not order.symbol:
+            return None
+
+        # Map OrderSide to TransactionType
+        if order.side == OrderSide.BUY:
+            transaction_type = OrderType.BUY
+        elif order.side == OrderSide.SELL:
+            transaction_type = OrderType.SELL
+        else:
+            return None  # Skip unknown transaction types
+
+        try:
+            return Transaction(
+                date=(
+                    order.filled_at.date()
+                    if order.filled_at
+                    else order.submitted_at.date()
+                ),
+                ticker=order.symbol,
+                qty=Decimal(str(order.filled_qty)),  # Use filled_qty instead of qty
+                type=transaction_type,
+                unitPrice=Money(value=Decimal(str(order.filled_avg_price))),
+                currency=Currency.USD,
+            )
+        except (ValueError, TypeError, AttributeError) as e:
+            # Log the error and skip this order
+            Logger.warning(f"Error processing order {order.id}: {e}")
+            return None
 
     def buy_instrument(self, ticker: str, qty: Decimal, value: Optional[Money] = None):
         from alpaca.trading.requests import MarketOrderRequest
@@ -377,7 +437,6 @@ class AlpacaProvider(BaseProvider):
         return set([o.symbol for o in open_orders])
 
     def get_holdings(self):
-        from decimal import Decimal
         from alpaca.common.exceptions import APIError
 
         try:
@@ -399,10 +458,26 @@ class AlpacaProvider(BaseProvider):
             if message == "forbidden":
                 raise ConfigurationError("Account credentials invalid")
             raise e
+        return self._build_holdings(
+            my_stocks,
+            account,
+            unsettled,
+            unsettled_cash,
+            self.get_per_ticker_profit_or_loss(),
+        )
+
+    def _build_holdings(
+        self,
+        my_stocks,
+        account,
+        unsettled: Set[str],
+        unsettled_cash: Decimal,
+        profit: Dict[str, ProfitModel],
+    ) -> RealPortfolio:
         unsettled_elements = [
             RealPortfolioElement(
                 ticker=ticker,
-                units=0,
+                units=Decimal(0),
                 value=Money(value=Decimal(0)),
                 weight=Decimal(0),
                 unsettled=True,
@@ -422,7 +497,6 @@ class AlpacaProvider(BaseProvider):
             [Decimal(item.market_value) for item in my_stocks if item.market_value]
         )
 
-        profit = self.get_per_ticker_profit_or_loss()
         out = [
             RealPortfolioElement(
                 ticker=row.symbol,
@@ -449,7 +523,15 @@ class AlpacaProvider(BaseProvider):
         my_stocks = self._get_cached_value(
             ObjectKey.POSITIONS, callable=self.trading_client.get_all_positions
         )
-        raw_divs = [x for x in self._get_dividends() if x["status"] == "executed"]
+        dividends = self._get_cached_value(
+            ObjectKey.DIVIDENDS, callable=self._get_dividends
+        )
+        return self._profit_or_loss(my_stocks, dividends)
+
+    def _profit_or_loss(
+        self, my_stocks, dividends: list[dict]
+    ) -> Dict[str, ProfitModel]:
+        raw_divs = [x for x in dividends if x["status"] == "executed"]
 
         divs: DefaultDict[str, Money] = defaultdict(lambda: Money(value=Decimal(0)))
         for z in raw_divs:
@@ -469,53 +551,293 @@ class AlpacaProvider(BaseProvider):
                 )
         return base
 
-    def _get_dividends(self) -> list[dict]:
+    def _iter_dividend_pages(self, after: Optional[date] = None) -> Iterator[list]:
+        """Pages of dividend activities, most recent first. after is pushed
+        into the query so older pages are never fetched."""
         api_call = "/v2/account/activities/DIV"
         headers = self._legacy_headers
         params = {
             "page_size": "100",
+            "direction": "desc",
         }
-        all_data = []
-        has_data = True
-        while has_data:
-            raw_response = requests.get(
-                self.LEGACY_BASE + api_call, params=params, headers=headers
+        if after:
+            params["after"] = after.isoformat()
+        while True:
+            self._throttle(EndpointClass.ACCOUNT)
+            raw_response = self._with_retries(
+                EndpointClass.ACCOUNT,
+                lambda: self.http_session.get(
+                    self.LEGACY_BASE + api_call,
+                    params=params,
+                    headers=headers,
+                    timeout=self.HTTP_POOL.timeout,
+                ),
             )
             response = json.loads(raw_response.text)
-            all_data += response
-
             if len(response) == 0:
-                has_data = False
-            else:
-                try:
-                    params["page_token"] = response[-1]["id"]
-                except (KeyError, IndexError) as e:
-                    raise ValueError(
-                        f"Could not find page token in response {str(response)}"
-                    ) from e
-        return all_data
+                return
+            yield response
+            try:
+                params["page_token"] = response[-1]["id"]
+            except (KeyError, IndexError) as e:
+                raise ValueError(
+                    f"Could not find page token in response {str(response)}"
+                ) from e
 
-    def get_dividend_details(
+    def _get_dividends(self) -> list[dict]:
+        return [row for page in self._iter_dividend_pages() for row in page]
+
+    def iter_dividend_details(
         self, start: datetime | None = None
-    ) -> list[DividendResult]:
-        value = self._get_dividends()
-        final = []
-        for x in value:
-            if x["status"] == "executed":
+    ) -> Iterator[DividendResult]:
+        # after is exclusive; ask from the day before to keep start's day
+        after = start.date() - timedelta(days=1) if start else None
+        for page in self._iter_dividend_pages(after):
+            for x in page:
+                if x["status"] != "executed":
+                    continue
                 paid_date = date.fromisoformat(x["date"])
                 if start and paid_date < start.date():
                     continue
-                final.append(
-                    DividendResult(
-                        ticker=x["symbol"],
-                        amount=Money(value=float(x["net_amount"])),
-                        date=paid_date,
-                        provider=self.PROVIDER,
-                        external_id=x["id"],
-                    )
+                yield DividendResult(
+                    ticker=x["symbol"],
+                    amount=Money(value=float(x["net_amount"])),
+                    date=paid_date,
+                    provider=self.PROVIDER,
+                    external_id=x["id"],
                 )
+
+    def get_dividend_details(
+        self, start: datetime | None = None
+    ) -> list[DividendResult]:
+        return list(self.iter_dividend_details(start))
+
+    def as_async(self) -> "AsyncAlpacaProvider":
+        return AsyncAlpacaProvider(self)
+
+
+class AsyncAlpacaProvider(AsyncBaseProvider):
+    """Native asyncio Alpaca provider calling the REST API over httpx, as
+    alpaca-py has no async client. Responses are parsed into the same
+    alpaca-py models the sync provider builds holdings from."""
+
+    provider: AlpacaProvider
+
+    def __init__(self, provider: AlpacaProvider, client=None):
+        super().__init__(provider)
+        if client is None:
+            import httpx
+
+            pool = provider.HTTP_POOL
+            client = httpx.AsyncClient(
+                headers=provider._legacy_headers,
+                limits=httpx.Limits(
+                    max_connections=pool.pool_maxsize,
+                    max_keepalive_connections=pool.pool_maxsize,
+                ),
+                timeout=httpx.Timeout(pool.read_timeout, connect=pool.connect_timeout),
+            )
+        self._client = client
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        endpoint: EndpointClass = EndpointClass.ACCOUNT,
+        **kwargs,
+    ) -> Any:
+        await self.provider._throttle_async(endpoint)
+        response = await self.provider._with_retries_async(
+            endpoint,
+            lambda: self._client.request(method, url, **kwargs),
+            idempotent=method == "GET",
+        )
+        if response.status_code == 403:
+            raise ConfigurationError("Account credentials invalid")
+        response.raise_for_status()
+        return response.json()
+
+    async def _get_bars(
+        self, tickers: List[str], at_day: Optional[date]
+    ) -> Dict[str, Optional[Decimal]]:
+        start, end = price_window(at_day)
+        params: Dict[str, str] = {
+            "symbols": ",".join(tickers),
+            "timeframe": "1Day",
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "limit": "10000",
+        }
+        if at_day:
+            params["adjustment"] = "split"
+        bars: DefaultDict[str, list] = defaultdict(list)
+        while True:
+            response = await self._request(
+                "GET",
+                DATA_BASE + "/v2/stocks/bars",
+                endpoint=EndpointClass.QUOTES,
+                params=params,
+            )
+            for ticker, ticker_bars in (response.get("bars") or {}).items():
+                bars[ticker].extend(ticker_bars)
+            if not response.get("next_page_token"):
+                break
+            params["page_token"] = response["next_page_token"]
+        prices: Dict[str, Optional[Decimal]] = {}
+        for ticker in tickers:
+            # first day on or after at_day, otherwise the latest day
+            ordered = bars[ticker] if at_day else reversed(bars[ticker])
+            prices[ticker] = next(
+                (Decimal(str(bar["c"])) for bar in ordered if bar.get("c")), None
+            )
+        return prices
+
+    async def _get_instrument_prices(
+        self,
+        tickers: List[str],
+        at_day: Optional[date] = None,
+        fail_on_missing: bool = True,
+    ) -> Dict[str, Optional[Decimal]]:
+        batches = divide_into_batches(
+            list(tickers), self.provider.SUPPORTS_BATCH_HISTORY
+        )
+        final: Dict[str, Optional[Decimal]] = {}
+        for prices in await asyncio.gather(
+            *[self._get_bars(batch, at_day) for batch in batches]
+        ):
+            final.update(prices)
         return final
 
+    async def get_instrument_prices(
+        self,
+        tickers: List[str],
+        at_day: Optional[date] = None,
+        fail_on_missing: bool = True,
+    ) -> Dict[str, Optional[Decimal]]:
+        if self.provider._quote_provider:
+            return await super().get_instrument_prices(
+                tickers, at_day, fail_on_missing=fail_on_missing
+            )
+        return await self.provider._price_cache.get_prices_async(
+            tickers,
+            self._get_instrument_prices,
+            date=at_day,
+            fail_on_missing=fail_on_missing,
+        )
+
+    async def _get_open_orders(self) -> list:
+        from alpaca.trading.models import Order
+
+        raw = await self._request(
+            "GET",
+            self.provider.LEGACY_BASE + "/v2/orders",
+            params={"status": "open", "limit": str(MAX_OPEN_ORDER_SIZE)},
+        )
+        if len(raw) == MAX_OPEN_ORDER_SIZE:
+            raise ValueError(
+                "Returned max number of open orders - cannot continue safely"
+            )
+        return [Order(**row) for row in raw]
+
+    async def get_unsettled_instruments(self) -> Set[str]:
+        open_orders = await self._get_cached_value(
+            ObjectKey.OPEN_ORDERS, self._get_open_orders
+        )
+        return set([o.symbol for o in open_orders])
+
+    async def _get_dividends(self) -> list[dict]:
+        params = {"page_size": "100"}
+        all_data: list[dict] = []
+        while True:
+            response = await self._request(
+                "GET",
+                self.provider.LEGACY_BASE + "/v2/account/activities/DIV",
+                params=params,
+            )
+            if not response:
+                return all_data
+            all_data += response
+            try:
+                params["page_token"] = response[-1]["id"]
+            except (KeyError, IndexError) as e:
+                raise ValueError(
+                    f"Could not find page token in response {str(response)}"
+                ) from e
+
+    async def get_holdings(self) -> RealPortfolio:
+        from alpaca.trading.models import Position, TradeAccount
+
+        legacy_base = self.provider.LEGACY_BASE
+        positions, account, open_orders, dividends = await asyncio.gather(
+            self._get_cached_value(
+                ObjectKey.POSITIONS,
+                lambda: self._request("GET", legacy_base + "/v2/positions"),
+            ),
+            self._get_cached_value(
+                ObjectKey.ACCOUNT,
+                lambda: self._request("GET", legacy_base + "/v2/account"),
+            ),
+            self._get_cached_value(ObjectKey.OPEN_ORDERS, self._get_open_orders),
+            self._get_cached_value(ObjectKey.DIVIDENDS, self._get_dividends),
+        )
+        # entries cached by the sync provider are already models
+        my_stocks = [
+            row if isinstance(row, Position) else Position(**row) for row in positions
+        ]
+        if not isinstance(account, TradeAccount):
+            account = TradeAccount(**account)
+        return self.provider._build_holdings(
+            my_stocks,
+            account,
+            set([o.symbol for o in open_orders]),
+            sum([Decimal(o.notional) for o in open_orders], Decimal(0)),
+            self.provider._profit_or_loss(my_stocks, dividends),
+        )
+
+    async def _submit_order(
+        self, side: str, ticker: str, qty: Decimal, value: Optional[Money]
+    ) -> bool:
+        order: Dict[str, str] = {
+            "symbol": ticker,
+            "side": side,
+            "type": "market",
+            "time_in_force": "day",
+        }
+        if value:
+            order["notional"] = str(round(float(value), 2))
+        else:
+            order["qty"] = str(qty)
+        # only throttled orders are retried; alpaca did not act on those
+        response = await self.provider._with_retries_async(
+            EndpointClass.ORDERS,
+            lambda: self._client.post(
+                self.provider.LEGACY_BASE + "/v2/orders", json=order
+            ),
+            idempotent=False,
+        )
+        if response.is_error:
+            try:
+                message = response.json().get("message", "Unknown Error")
+            except ValueError:
+                message = response.text
+            raise OrderError(
+                message=f"Failed to {side} {ticker} {qty} {response.status_code}: {message}"
+            )
+        return True
+
+    async def buy_instrument(
+        self, ticker: str, qty: Decimal, value: Optional[Money] = None
+    ) -> bool:
+        return await self._submit_order("buy", ticker, qty, value)
+
+    async def sell_instrument(
+        self, ticker: str, qty: Decimal, value: Optional[Money] = None
+    ) -> bool:
+        return await self._submit_order("sell", ticker, qty, value)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
 
 class PaperAlpacaProvider(AlpacaProvider):
     PROVIDER = ProviderType.ALPACA_PAPER
@@ -0,0 +1,227 @@
+# asyncio interface to providers
+# a multi-broker rebalance spends most of its time waiting on the network,
+# so awaiting every broker at once bounds it by the slowest broker instead
+# of the sum of all of them
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, TYPE_CHECKING
+
+from py_portfolio_index.constants import Logger
+from py_portfolio_index.enums import (
+    EndpointClass,
+    ObjectKey,
+    OrderType,
+    ProviderType,
+)
+from py_portfolio_index.exceptions import OrderError
+from py_portfolio_index.models import (
+    Money,
+    OrderElement,
+    OrderPlan,
+    OrderResult,
+    RealPortfolio,
+)
+
+from py_portfolio_index.portfolio_providers.base_portfolio import (
+    CachedValue,
+    collect_order_results,
+)
+
+if TYPE_CHECKING:
+    from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+
+
+class AsyncBaseProvider(object):
+    """Async counterpart of BaseProvider.
+
+    Wraps a sync provider, which still owns credentials, caches and
+    configuration; subclasses override the calls they can make natively
+    and anything else falls back to a worker thread."""
+
+    def __init__(self, provider: BaseProvider) -> None:
+        self.provider = provider
+
+    @property
+    def PROVIDER(self) -> ProviderType:
+        return self.provider.PROVIDER
+
+    async def _in_thread(self, method: str, *args, **kwargs):
+        return await asyncio.to_thread(getattr(self.provider, method), *args, **kwargs)
+
+    async def _get_cached_value(
+        self,
+        key: ObjectKey,
+        fetch: Callable[[], Awaitable[Any]],
+        value: Optional[Any] = None,
+    ) -> Any:
+        """Async counterpart of BaseProvider._get_cached_value, reading and
+        filling the wrapped provider's per instance cache so sync and async
+        callers share entries and invalidation."""
+        provider = self.provider
+        skey = f"{key}_{value}" if value else f"{key}"
+        max_age_seconds = provider.get_cache_policy(key).max_age_seconds
+        with provider._cache_lock:
+            cached = provider.CACHE.get(skey)
+            if cached is not None:
+                provider.CACHE.move_to_end(skey)
+        if cached is not None and cached.value:
+            age = (datetime.now() - cached.set).total_seconds()
+            if age < max_age_seconds:
+                return cached.value
+        # fetch throttles its own requests
+        output = await fetch()
+        with provider._cache_lock:
+            cached = provider.CACHE.get(skey)
+            if cached is None:
+                cached = CachedValue(value=None)
+                provider.CACHE[skey] = cached
+                while len(provider.CACHE) > provider.MAX_CACHE_ENTRIES:
+                    provider.CACHE.popitem(last=False)
+            cached.value = output
+            cached.set = datetime.now()
+        return output
+
+    async def get_holdings(self) -> RealPortfolio:
+        return await self._in_thread("get_holdings")
+
+    async def get_unsettled_instruments(self) -> Set[str]:
+        return await self._in_thread("get_unsettled_instruments")
+
+    async def get_instrument_prices(
+        self,
+        tickers: List[str],
+        at_day: Optional[date] = None,
+        fail_on_missing: bool = True,
+    ) -> Dict[str, Optional[Decimal]]:
+        return await self._in_thread(
+            "get_instrument_prices", tickers, at_day, fail_on_missing=fail_on_missing
+        )
+
+    async def get_instrument_price(
+        self, ticker: str, at_day: Optional[date] = None
+    ) -> Optional[Decimal]:
+        prices = await self.get_instrument_prices([ticker], at_day)
+        return prices.get(ticker)
+
+    async def buy_instrument(
+        self, ticker: str, qty: Decimal, value: Optional[Money] = None
+    ) -> bool:
+        return await self._in_thread("buy_instrument", ticker, qty, value)
+
+    async def sell_instrument(
+        self, ticker: str, qty: Decimal, value: Optional[Money] = None
+    ) -> bool:
+        return await self._in_thread("sell_instrument", ticker, qty, value)
+
+    async def handle_order_element(
+        self,
+        element: OrderElement,
+        dry_run: bool = False,
+        price: Optional[Decimal] = None,
+    ) -> Decimal:
+        if price is None:
+            price = await self.get_instrument_price(element.ticker)
+        units, value = self.provider._order_units(element, price)
+        if dry_run:
+            Logger.info(f"Would have bought {units} of {element.ticker}")
+            return units
+        if element.order_type not in (OrderType.BUY, OrderType.SELL):
+            raise OrderError("Invalid order type")
+        if not self.provider.ORDERS_THROTTLED_ON_SUBMIT:
+            await self.provider._throttle_async(EndpointClass.ORDERS)
+        try:
+            if element.order_type == OrderType.BUY:
+                await self.buy_instrument(element.ticker, units, value)
+                Logger.info(f"Bought {units} of {element.ticker}")
+            else:
+                await self.sell_instrument(element.ticker, units, value)
+                Logger.info(f"Sold {units} of {element.ticker}")
+        finally:
+            # a failed submission may still have reached the broker
+            self.provider.invalidate(*self.provider.ORDER_INVALIDATES)
+        return units
+
+    async def purchase_order_plan(
+        self,
+        plan: OrderPlan,
+        skip_errored_stocks: bool = False,
+        ignore_unsettled: bool = True,
+        plan_only: bool = False,
+        include_sell_orders: bool = False,
+        max_concurrency: Optional[int] = None,
+    ) -> List[OrderResult]:
+        """See BaseProvider.purchase_order_plan"""
+        if ignore_unsettled:
+            unsettled = await self.get_unsettled_instruments()
+        else:
+            unsettled = set()
+        elements = self.provider._plan_elements(plan, unsettled, include_sell_orders)
+        if not elements:
+            return []
+        prices = await self.get_instrument_prices(
+            list(dict.fromkeys(item.ticker for item in elements)),
+            fail_on_missing=False,
+        )
+        window = asyncio.Semaphore(
+            max_concurrency or self.provider.MAX_CONCURRENT_ORDERS
+        )
+        errors: List[Exception] = []
+
+        async def submit(item: OrderElement) -> Optional[OrderResult]:
+            async with window:
+                if errors and not skip_errored_stocks:
+                    return None
+                try:
+                    units = await self.handle_order_element(
+                        item, dry_run=plan_only, price=prices.get(item.ticker)
+                    )
+                except Exception as e:
+                    Logger.error(f"Failed to purchase {item.ticker}:{str(e)}.")
+                    errors.append(e)
+                    return OrderResult(element=item, success=False, error=str(e))
+            return OrderResult(element=item, success=True, units=units)
+
+        outcomes = await asyncio.gather(*[submit(item) for item in elements])
+        return collect_order_results(list(outcomes), errors, skip_errored_stocks)
+
+    async def aclose(self) -> None:
+        pass
+
+    async def __aenter__(self) -> AsyncBaseProvider:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+class ThreadedAsyncProvider(AsyncBaseProvider):
+    """Adapter for providers without an async client: every call runs the
+    sync provider's method in a worker thread."""
+
+    async def purchase_order_plan(
+        self,
+        plan: OrderPlan,
+        skip_errored_stocks: bool = False,
+        ignore_unsettled: bool = True,
+        plan_only: bool = False,
+        include_sell_orders: bool = False,
+        max_concurrency: Optional[int] = None,
+    ) -> List[OrderResult]:
+        return await self._in_thread(
+            "purchase_order_plan",
+            plan,
+            skip_errored_stocks=skip_errored_stocks,
+            ignore_unsettled=ignore_unsettled,
+            plan_only=plan_only,
+            include_sell_orders=include_sell_orders,
+            max_concurrency=max_concurrency,
+        )
+
+
+def as_async_provider(provider: BaseProvider | AsyncBaseProvider) -> AsyncBaseProvider:
+    if isinstance(provider, AsyncBaseProvider):
+        return provider
+    return provider.as_async()
@@ -1,6 +1,20 @@
 from __future__ import annotations
 from math import floor, ceil
-from typing import Dict, Union, Optional, Set, List, Callable, Any
+import asyncio
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Union,
+    Optional,
+    Set,
+    List,
+    Callable,
+    Any,
+    Awaitable,
+    Hashable,
+    Iterator,
+)
 from decimal import Decimal
 from datetime import date
 
@@ -12,7 +26,7 @@ from py_portfolio_index.common import (
 )
 from py_portfolio_index.constants import Logger
 from py_portfolio_index.enums import RoundingStrategy, ProviderType, OrderType
-from py_portfolio_index.exceptions import OrderError
+from py_portfolio_index.exceptions import OrderError, OrderPlanError
 from py_portfolio_index.models import (
     Money,
     OrderPlan,
@@ -20,68 +34,404 @@ from py_portfolio_index.models import (
     StockInfo,
     ProfitModel,
     DividendResult,
+    OrderResult,
     Transaction,
 )
 from py_portfolio_index.models import RealPortfolio
 from dataclasses import dataclass, field
+from time import sleep
 from datetime import datetime
-from py_portfolio_index.portfolio_providers.common import PriceCache
-from py_portfolio_index.enums import ObjectKey
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, Thread
+from py_portfolio_index.portfolio_providers.common import (
+    DEFAULT_RETRY_POLICY,
+    HttpPool,
+    RATE_LIMITER,
+    RETRIER,
+    SHARED_CACHE,
+    PriceCache,
+    RateLimit,
+    RateLimiter,
+    Retrier,
+    RetryPolicy,
+    SharedCache,
+    SingleFlight,
+    pooled_session,
+)
+from py_portfolio_index.portfolio_providers.price_store import HistoricalPriceStore
+from py_portfolio_index.enums import EndpointClass, ObjectKey
+
+if TYPE_CHECKING:
+    from requests import Session
+
+    from py_portfolio_index.portfolio_providers.async_provider import (
+        AsyncBaseProvider,
+    )
+
+
+def collect_order_results(
+    outcomes: List[Optional[OrderResult]],
+    errors: List[Exception],
+    skip_errored_stocks: bool,
+) -> List[OrderResult]:
+    """Drop orders that were never attempted and raise if a failure should
+    stop the plan"""
+    results = [item for item in outcomes if item is not None]
+    if errors and not skip_errored_stocks:
+        raise OrderPlanError(
+            f"Order plan stopped after a failed order: {errors[0]}", results
+        ) from errors[0]
+    return results
 
 
 @dataclass
 class CachedValue:
     value: Any
-    fetcher: Callable
+    # None for shared-tier entries: they outlive the provider that made
+    # them, so each refresh uses the fetcher of the instance asking
+    fetcher: Optional[Callable] = None
     set: datetime = field(default_factory=datetime.now)
 
 
+@dataclass
+class CachePolicy:
+    """How long a cached provider object is served.
+
+    Within max_age_seconds the cached value is returned as is. With
+    stale_while_revalidate, an older value is still returned immediately
+    while a background refresh runs, until it is max_stale_seconds old;
+    after that the caller blocks on the refresh."""
+
+    max_age_seconds: int = 60 * 60
+    stale_while_revalidate: bool = False
+    max_stale_seconds: int = 60 * 60 * 24
+
+
+DEFAULT_CACHE_POLICY = CachePolicy()
+
+
 class BaseProvider(object):
     PROVIDER: ProviderType = ProviderType.DUMMY
     MIN_ORDER_VALUE = Money(value=1)
     MAX_ORDER_DECIMALS = 2
     SUPPORTS_BATCH_HISTORY = 0
     SUPPORTS_FRACTIONAL_SHARES = True
+    # orders submitted at once by purchase_order_plan
+    MAX_CONCURRENT_ORDERS = 1
+    # per ObjectKey overrides of DEFAULT_CACHE_POLICY
+    CACHE_POLICIES: Dict[ObjectKey, CachePolicy] = {}
+    # bound on the per instance cache; least recently used entries go first
+    MAX_CACHE_ENTRIES = 1024
+    # endpoint classes without a limit are not throttled
+    RATE_LIMITS: Dict[EndpointClass, RateLimit] = {}
+    # buy_instrument/sell_instrument take their own ORDERS token, so the
+    # order pipeline must not take one as well
+    ORDERS_THROTTLED_ON_SUBMIT = False
+    # backoff for transient broker failures; see _with_retries
+    RETRY_POLICY: RetryPolicy = DEFAULT_RETRY_POLICY
+    # iter_dividend_details yields the most recently posted dividends
+    # first, so an incremental sync can stop at the first one it has seen
+    DIVIDENDS_NEWEST_FIRST = False
+    # connection pool for calls made outside a broker SDK
+    HTTP_POOL: HttpPool = HttpPool()
+    # False when _new_http_session hands back a session shared beyond this
+    # instance, which shutdown must then leave open
+    OWNS_HTTP_SESSION = True
 
     def __init__(self, quote_provider: BaseProvider | None = None) -> None:
         self.stock_info_cache: Dict[str, StockInfo] = {}
+        # process-wide, so every instance shares the broker's budget; set
+        # to None to disable throttling
+        self.rate_limiter: Optional[RateLimiter] = RATE_LIMITER
+        # raise RateLimitError rather than wait for a token
+        self.raise_on_rate_limit = False
+        # process-wide, so retry metrics cover every instance
+        self.retrier: Retrier = RETRIER
+        # fetchers throttle EndpointClass.QUOTES per request they send
         self._price_cache: PriceCache = PriceCache(
             fetcher=self._get_instrument_prices,
             single_fetcher=self._get_instrument_price,
         )
-        self.CACHE: dict[str, CachedValue] = {}
+        # owned by this instance, so accounts never see each other's data
+        self.CACHE: OrderedDict[str, CachedValue] = OrderedDict()
+        # process-wide tier for entries requested with shared=True;
+        # set to None to keep everything on the instance
+        self.shared_cache: Optional[SharedCache] = SHARED_CACHE
+        self._cache_lock = Lock()
+        self._cache_flight = SingleFlight()
+        self._cache_policies: Dict[ObjectKey, CachePolicy] = dict(self.CACHE_POLICIES)
+        self._revalidating: Set[Hashable] = set()
         self._quote_provider = quote_provider
+        self._http_session: Optional[Session] = None
+        self._http_lock = Lock()
+
+    def enable_historical_price_store(
+        self, store: Optional[HistoricalPriceStore] = None
+    ) -> HistoricalPriceStore:
+        """Keep closed-day prices from this provider on disk, so later runs
+        only ask the broker for dates and tickers not seen before. Defaults
+        to a store in the user cache directory."""
+        store = store or HistoricalPriceStore()
+        self._price_cache.historical_store = store
+        self._price_cache.source = self.PROVIDER.value
+        return store
+
+    def _throttle(self, endpoint: EndpointClass, tokens: int = 1) -> float:
+        """Take tokens for a call to endpoint, waiting if needed. Returns
+        the seconds waited."""
+        limit = self.RATE_LIMITS.get(endpoint)
+        if limit is None or self.rate_limiter is None:
+            return 0.0
+        return self.rate_limiter.acquire(
+            self.PROVIDER.value,
+            endpoint,
+            limit,
+            tokens,
+            block=not self.raise_on_rate_limit,
+        )
 
-    def clear_cache(self, skip_clearing: List[str]):
-        for value in self.CACHE.values():
-            if value in skip_clearing:
-                continue
-            value.value = None
+    def _throttle_order(self) -> float:
+        """Take an ORDERS token for an order about to be submitted, unless
+        the provider takes it on submit"""
+        if self.ORDERS_THROTTLED_ON_SUBMIT:
+            return 0.0
+        return self._throttle(EndpointClass.ORDERS)
+
+    def _back_off(self, endpoint: EndpointClass, seconds: float) -> float:
+        """Record that the broker throttled endpoint for seconds, so every
+        caller sharing the budget holds off, then wait for the next token.
+        Without a declared limit this just sleeps."""
+        limit = self.RATE_LIMITS.get(endpoint)
+        if limit is None or self.rate_limiter is None:
+            sleep(seconds)
+            return seconds
+        self.rate_limiter.penalize(self.PROVIDER.value, endpoint, limit, seconds)
+        return self.rate_limiter.acquire(self.PROVIDER.value, endpoint, limit)
+
+    async def _back_off_async(self, endpoint: EndpointClass, seconds: float) -> float:
+        limit = self.RATE_LIMITS.get(endpoint)
+        if limit is None or self.rate_limiter is None:
+            await asyncio.sleep(seconds)
+            return seconds
+        self.rate_limiter.penalize(self.PROVIDER.value, endpoint, limit, seconds)
+        return await self.rate_limiter.acquire_async(
+            self.PROVIDER.value, endpoint, limit
+        )
+
+    async def _throttle_async(self, endpoint: EndpointClass, tokens: int = 1) -> float:
+        limit = self.RATE_LIMITS.get(endpoint)
+        if limit is None or self.rate_limiter is None:
+            return 0.0
+        return await self.rate_limiter.acquire_async(
+            self.PROVIDER.value,
+            endpoint,
+            limit,
+            tokens,
+            block=not self.raise_on_rate_limit,
+        )
+
+    @property
+    def http_session(self) -> Session:
+        """requests session pooled per HTTP_POOL, reused by every raw HTTP
+        call this instance makes so connections are kept alive"""
+        with self._http_lock:
+            if self._http_session is None:
+                self._http_session = self._new_http_session()
+            return self._http_session
+
+    def _new_http_session(self) -> Session:
+        return pooled_session(self.HTTP_POOL)
+
+    def _with_retries(
+        self, endpoint: EndpointClass, func: Callable[[], Any], idempotent: bool = True
+    ) -> Any:
+        """Call func, retrying transient broker failures under RETRY_POLICY.
+        Pass idempotent=False for calls that must not be repeated unless the
+        broker turned them away, such as orders without a dedupe key.
+        Throttled retries back off endpoint's shared budget."""
+
+        def wait(seconds: float, throttled: bool) -> None:
+            if throttled:
+                self._back_off(endpoint, seconds)
+            else:
+                sleep(seconds)
+
+        return self.retrier.call(
+            f"{self.PROVIDER.value}:{endpoint.value}",
+            func,
+            self.RETRY_POLICY,
+            idempotent=idempotent,
+            wait=wait,
+        )
+
+    async def _with_retries_async(
+        self,
+        endpoint: EndpointClass,
+        func: Callable[[], Awaitable[Any]],
+        idempotent: bool = True,
+    ) -> Any:
+        async def wait(seconds: float, throttled: bool) -> None:
+            if throttled:
+                await self._back_off_async(endpoint, seconds)
+            else:
+                await asyncio.sleep(seconds)
+
+        return await self.retrier.call_async(
+            f"{self.PROVIDER.value}:{endpoint.value}",
+            func,
+            self.RETRY_POLICY,
+            idempotent=idempotent,
+            wait=wait,
+        )
+
+    # cached objects an order can change
+    ORDER_INVALIDATES = (
+        ObjectKey.OPEN_ORDERS,
+        ObjectKey.UNSETTLED,
+        ObjectKey.POSITIONS,
+    )
+
+    @staticmethod
+    def _cache_key_matches(skey: str, key: ObjectKey | str) -> bool:
+        if isinstance(key, ObjectKey):
+            return skey == f"{key}" or skey.startswith(f"{key}_")
+        return skey == key
+
+    def clear_cache(self, skip_clearing: Optional[List[ObjectKey | str]] = None):
+        """Drop every cached object except those matching skip_clearing,
+        given as ObjectKeys or exact cache keys"""
+        skip_clearing = skip_clearing or []
+        with self._cache_lock:
+            for skey, value in self.CACHE.items():
+                if any(self._cache_key_matches(skey, key) for key in skip_clearing):
+                    continue
+                value.value = None
         if self._quote_provider:
             self._quote_provider.clear_cache(skip_clearing)
 
+    def invalidate(self, *keys: ObjectKey) -> int:
+        """Drop cached objects for the given keys, including any variants
+        cached with a value suffix. Returns how many entries were dropped."""
+        return self._invalidate_matching(
+            lambda skey: any(self._cache_key_matches(skey, key) for key in keys)
+        )
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        return self._invalidate_matching(lambda skey: skey.startswith(prefix))
+
+    def invalidate_prices(
+        self, tickers: Optional[List[str]] = None, at_day: Optional[date] = None
+    ) -> int:
+        """Drop cached prices for tickers (all when None) at a date (today
+        when None)"""
+        return self._price_cache.invalidate(tickers, at_day)
+
+    def _invalidate_matching(self, matches: Callable[[str], bool]) -> int:
+        dropped = 0
+        with self._cache_lock:
+            entries = list(self.CACHE.items())
+        if self.shared_cache:
+            entries += self.shared_cache.items(self.PROVIDER.value)
+        for skey, value in entries:
+            if value.value is not None and matches(skey):
+                value.value = None
+                dropped += 1
+        return dropped
+
+    def set_cache_policy(self, key: ObjectKey, policy: CachePolicy) -> None:
+        self._cache_policies[key] = policy
+
+    def get_cache_policy(self, key: ObjectKey) -> CachePolicy:
+        return self._cache_policies.get(key, DEFAULT_CACHE_POLICY)
+
     def _get_cached_value(
         self,
         key: ObjectKey,
         value: Optional[Any] = None,
-        max_age_seconds: int = 60 * 60,
+        max_age_seconds: Optional[int] = None,
         callable: Optional[Callable] = None,
+        shared: bool = False,
     ) -> Any:
+        """Return a cached provider object, fetching it with callable when
+        missing or expired. With shared, the entry lives in the process-wide
+        tier under this provider type, for data that is the same for every
+        account."""
         if value:
             skey = f"{key}_{value}"
         else:
             skey = f"{key}"
-        if skey in self.CACHE:
-            cached = self.CACHE[skey]
-        elif callable:
-            cached = CachedValue(value=None, fetcher=callable)
-            self.CACHE[skey] = cached
+        policy = self.get_cache_policy(key)
+        if max_age_seconds is None:
+            max_age_seconds = policy.max_age_seconds
+        tier = self.shared_cache if shared else None
+        flight_key: Hashable
+        if tier is not None and callable:
+            namespace = self.PROVIDER.value
+            fetcher = callable
+            cached = tier.get_or_create(
+                namespace, skey, lambda: CachedValue(value=None)
+            )
+            flight, flight_key = tier.flight, (namespace, skey)
+
+            def refresh():
+                self._throttle(EndpointClass.ACCOUNT)
+                output = self._refresh_cached(cached, fetcher)
+                tier.record(namespace, skey, output)
+                return output
+
+        else:
+            with self._cache_lock:
+                if skey in self.CACHE:
+                    cached = self.CACHE[skey]
+                    self.CACHE.move_to_end(skey)
+                elif callable:
+                    cached = CachedValue(value=None, fetcher=callable)
+                    self.CACHE[skey] = cached
+                    while len(self.CACHE) > self.MAX_CACHE_ENTRIES:
+                        self.CACHE.popitem(last=False)
+            flight, flight_key = self._cache_flight, skey
+
+            def refresh():
+                self._throttle(EndpointClass.ACCOUNT)
+                # entries filled by the async provider carry no fetcher
+                return self._refresh_cached(cached, callable or cached.fetcher)
+
         if cached.value:
-            age = datetime.now() - cached.set
-            if age.seconds < max_age_seconds:
+            age = (datetime.now() - cached.set).total_seconds()
+            if age < max_age_seconds:
                 return cached.value
-        cached.value = cached.fetcher()
-
+            if policy.stale_while_revalidate and age < policy.max_stale_seconds:
+                stale = cached.value
+                self._revalidate(flight, flight_key, refresh)
+                return stale
+        # concurrent misses on the same key share one fetch
+        return flight.do(flight_key, refresh)
+
+    def _revalidate(
+        self, flight: SingleFlight, flight_key: Hashable, refresh: Callable
+    ) -> None:
+        with self._cache_lock:
+            if flight_key in self._revalidating:
+                return
+            self._revalidating.add(flight_key)
+
+        def run():
+            try:
+                flight.do(flight_key, refresh)
+            except Exception as e:
+                Logger.warning(f"Background refresh of {flight_key} failed: {e}")
+            finally:
+                with self._cache_lock:
+                    self._revalidating.discard(flight_key)
+
+        Thread(target=run, name=f"revalidate-{flight_key}", daemon=True).start()
+
+    @staticmethod
+    def _refresh_cached(cached: CachedValue, fetcher: Optional[Callable]) -> Any:
+        if fetcher is None:
+            raise ValueError("No fetcher available to refresh cached value")
+        cached.value = fetcher()
+        cached.set = datetime.now()
         return cached.value
 
     @property
@@ -114,6 +464,13 @@ class BaseProvider(object):
     def get_transactions(self) -> List[Transaction]:
         raise NotImplementedError
 
+    def iter_transactions(self, since: datetime | None = None) -> Iterator[Transaction]:
+        """Filled transactions on or after since. Providers that page through
+        their order history override this to stream pages as they arrive."""
+        for transaction in self.get_transactions():
+            if since is None or transaction.date >= since.date():
+                yield transaction
+
     def get_profit_or_loss(self) -> ProfitModel:
         raw = self.get_per_ticker_profit_or_loss().values()
         appreciation = sum([x.appreciation for x in raw], Money(value=0.0))
@@ -121,11 +478,18 @@ class BaseProvider(object):
         return ProfitModel(appreciation=appreciation, dividends=dividends)
 
     def get_instrument_prices(
-        self, tickers: List[str], at_day: Optional[date] = None
+        self,
+        tickers: List[str],
+        at_day: Optional[date] = None,
+        fail_on_missing: bool = True,
     ) -> Dict[str, Optional[Decimal]]:
         if self._quote_provider:
-            return self._quote_provider.get_instrument_prices(tickers, at_day)
-        return self._price_cache.get_prices(tickers=tickers, date=at_day)
+            return self._quote_provider.get_instrument_prices(
+                tickers, at_day, fail_on_missing=fail_on_missing
+            )
+        return self._price_cache.get_prices(
+            tickers=tickers, date=at_day, fail_on_missing=fail_on_missing
+        )
 
     def get_instrument_price(
         self, ticker: str, at_day: Optional[date] = None
@@ -205,6 +569,7 @@ class BaseProvider(object):
                 Logger.info(f"going to buy {to_buy_units} of {key}")
                 try:
                     if not plan_only:
+                        self._throttle_order()
                         successfully_purchased = self.buy_instrument(key, to_buy_units)
                     if successfully_purchased:
                         purchasing_power_resolved = (
@@ -248,37 +613,53 @@ class BaseProvider(object):
                     "Invalid rounding strategy provided with non-fractional shares."
                 )
 
-    def handle_order_element(self, element: OrderElement, dry_run: bool = False):
-        raw_price = self.get_instrument_price(element.ticker)
-
+    def _order_units(
+        self, element: OrderElement, raw_price: Optional[Decimal]
+    ) -> tuple[Decimal, Money]:
+        """Units and value to submit for an order element at raw_price"""
         if not raw_price:
             raise OrderError(f"No price found for this instrument: {element.ticker}")
         price: Money = Money(value=raw_price)
         if element.qty:
             units = Decimal(element.qty)
-            value = Money(value=units * price.decimal)
-
+            return units, Money(value=units * price.decimal)
         elif element.value:
-            raw_price = self.get_instrument_price(element.ticker)
             Logger.info(f"got price of {price} for {element.ticker}")
             units = round_up_to_place(
                 (element.value / price).decimal, self.MAX_ORDER_DECIMALS
             )
-            value = element.value
-        else:
-            raise OrderError("Order element must have qty or value")
+            return units, element.value
+        raise OrderError("Order element must have qty or value")
+
+    def handle_order_element(
+        self,
+        element: OrderElement,
+        dry_run: bool = False,
+        price: Optional[Decimal] = None,
+    ) -> Decimal:
+        """Submit one order, priced at price if given. Returns the units
+        ordered."""
+        if price is None:
+            price = self.get_instrument_price(element.ticker)
+        units, value = self._order_units(element, price)
         if not dry_run:
-            if element.order_type == OrderType.BUY:
-                self.buy_instrument(element.ticker, units, value)
-                Logger.info(f"Bought {units} of {element.ticker}")
-            elif element.order_type == OrderType.SELL:
-                self.sell_instrument(element.ticker, units, value)
-                Logger.info(f"Sold {units} of {element.ticker}")
-            else:
+            if element.order_type not in (OrderType.BUY, OrderType.SELL):
                 raise OrderError("Invalid order type")
+            self._throttle_order()
+            try:
+                if element.order_type == OrderType.BUY:
+                    self.buy_instrument(element.ticker, units, value)
+                    Logger.info(f"Bought {units} of {element.ticker}")
+                else:
+                    self.sell_instrument(element.ticker, units, value)
+                    Logger.info(f"Sold {units} of {element.ticker}")
+            finally:
+                # a failed submission may still have reached the broker
+                self.invalidate(*self.ORDER_INVALIDATES)
 
         else:
             Logger.info(f"Would have bought {units} of {element.ticker}")
+        return units
 
     def _get_stock_info(self, ticker: str) -> dict:
         raise NotImplementedError
@@ -286,6 +667,7 @@ class BaseProvider(object):
     def get_stock_info(self, ticker: str) -> StockInfo:
         cached = self.stock_info_cache.get(ticker, None)
         if not cached:
+            self._throttle(EndpointClass.ACCOUNT)
             dynamic = self._get_stock_info(ticker)
             basic = get_basic_stock_info(ticker, fail_on_missing=False)
             if basic:
@@ -297,6 +679,19 @@ class BaseProvider(object):
             return final
         return cached
 
+    def _plan_elements(
+        self, plan: OrderPlan, unsettled: Set[str], include_sell_orders: bool
+    ) -> List[OrderElement]:
+        elements = []
+        for item in plan.to_buy:
+            if item.ticker in unsettled:
+                Logger.info(f"Skipping {item.ticker} with unsettled orders.")
+                continue
+            if item.order_type == OrderType.SELL and not include_sell_orders:
+                continue
+            elements.append(item)
+        return elements
+
     def purchase_order_plan(
         self,
         plan: OrderPlan,
@@ -304,23 +699,49 @@ class BaseProvider(object):
         ignore_unsettled: bool = True,
         plan_only: bool = False,
         include_sell_orders: bool = False,
-    ):
+        max_concurrency: Optional[int] = None,
+    ) -> List[OrderResult]:
+        """Submit the orders in plan, up to max_concurrency (default
+        MAX_CONCURRENT_ORDERS) at a time, priced from one batch quote
+        request for the whole plan.
+
+        Returns a result per attempted order, in plan order. Unless
+        skip_errored_stocks, a failure stops further submissions; orders
+        already in flight finish and OrderPlanError is raised with the
+        results."""
         if ignore_unsettled:
             unsettled = self.get_unsettled_instruments()
         else:
             unsettled = set()
-        for item in plan.to_buy:
-            if item.ticker in unsettled:
-                Logger.info(f"Skipping {item.ticker} with unsettled orders.")
-                continue
+        elements = self._plan_elements(plan, unsettled, include_sell_orders)
+        if not elements:
+            return []
+        prices = self.get_instrument_prices(
+            list(dict.fromkeys(item.ticker for item in elements)),
+            fail_on_missing=False,
+        )
+        stop = Event()
+        errors: List[Exception] = []
+
+        def submit(item: OrderElement) -> Optional[OrderResult]:
+            if stop.is_set():
+                return None
             try:
-                if item.order_type == OrderType.SELL and not include_sell_orders:
-                    continue
-                self.handle_order_element(item, dry_run=plan_only)
+                units = self.handle_order_element(
+                    item, dry_run=plan_only, price=prices.get(item.ticker)
+                )
             except Exception as e:
                 Logger.error(f"Failed to purchase {item.ticker}:{str(e)}.")
+                errors.append(e)
                 if not skip_errored_stocks:
-                    raise e
+                    stop.set()
+                return OrderResult(element=item, success=False, error=str(e))
+            return OrderResult(element=item, success=True, units=units)
+
+        window = max_concurrency or self.MAX_CONCURRENT_ORDERS
+        with ThreadPoolExecutor(max_workers=min(window, len(elements))) as executor:
+            outcomes = list(executor.map(submit, elements))
+        return collect_order_results(outcomes, errors, skip_errored_stocks)
 
     def refresh(self):
         pass
@@ -333,11 +754,35 @@ class BaseProvider(object):
     ) -> list[DividendResult]:
         raise NotImplementedError
 
+    def iter_dividend_details(
+        self, start: datetime | None = None
+    ) -> Iterator[DividendResult]:
+        """Dividends paid on or after start. Providers that page through
+        their history override this to fetch pages only as they are
+        consumed, most recently posted first; see DIVIDENDS_NEWEST_FIRST."""
+        return iter(self.get_dividend_details(start))
+
     def get_dividend_history(self) -> Dict[str, Money]:
         return self._get_cached_value(ObjectKey.DIVIDENDS, callable=self._get_dividends)
 
+    def as_async(self) -> AsyncBaseProvider:
+        """An asyncio interface to this provider. Providers without a
+        native async client run each call in a worker thread. Each call
+        opens a new wrapper, bound to the running event loop; the caller
+        owns it and must await aclose(), or use it with async with."""
+        from py_portfolio_index.portfolio_providers.async_provider import (
+            ThreadedAsyncProvider,
+        )
+
+        return ThreadedAsyncProvider(self)
+
     def _shutdown(self):
         pass
 
     def shutdown(self):
+        with self._http_lock:
+            if self._http_session is not None:
+                if self.OWNS_HTTP_SESSION:
+                    self._http_session.close()
+                self._http_session = None
         return self._shutdown()
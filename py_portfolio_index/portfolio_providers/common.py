@@ -3,61 +3,279 @@
 # accepts list of stocks + dates to get values for
 # returns these from cache if possible, or for those not found
 # calls provider to return prices
-from collections import defaultdict
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import List, Dict
 from datetime import date as datetype
-from datetime import datetime
 from decimal import Decimal
-from py_portfolio_index.exceptions import PriceFetchError
+from py_portfolio_index.constants import Logger
+from py_portfolio_index.enums import EndpointClass
+from py_portfolio_index.exceptions import (
+    PriceFetchError,
+    RateLimitError,
+    TransientError,
+)
+from py_portfolio_index.portfolio_providers.price_store import HistoricalPriceStore
 
+import asyncio
+import random
+import re
+import sys
 import time
 import functools
-from typing import Optional, Callable, Any
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Optional,
+    Awaitable,
+    Callable,
+    Any,
+    Hashable,
+    Mapping,
+    Tuple,
+    TypeVar,
+)
+from inspect import signature
 import logging
 
 # 1 hour
 DEFAULT_TIMEOUT = 60 * 60
 
+K = TypeVar("K", bound=Hashable)
+
+
+INSTANT = "INSTANT"
+# per date label
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_LABELS = 64
+
+
+def accepts_fail_on_missing(fetcher: Callable) -> bool:
+    """Whether fetcher takes the optional fail_on_missing keyword"""
+    try:
+        parameters = signature(fetcher).parameters
+    except (TypeError, ValueError):
+        return False
+    return "fail_on_missing" in parameters or any(
+        param.kind == param.VAR_KEYWORD for param in parameters.values()
+    )
+
+
+def call_fetcher(
+    fetcher: Callable,
+    tickers: List[str],
+    date: datetype | None,
+    fail_on_missing: bool = True,
+) -> Any:
+    """Call a (tickers, date) price fetcher, passing fail_on_missing only
+    to fetchers that take it"""
+    if accepts_fail_on_missing(fetcher):
+        return fetcher(tickers, date, fail_on_missing=fail_on_missing)
+    return fetcher(tickers, date)
+
 
 class PriceCache(object):
+    """Prices keyed by date label, then ticker.
+
+    Both levels are LRU ordered: once a label holds max_entries tickers the
+    least recently used ticker is evicted, and once there are max_labels
+    labels the least recently used label is dropped entirely. Instant
+    prices expire timeout seconds after they were fetched; dated prices
+    never change and only leave through eviction.
+
+    With a historical_store, dated lookups that miss in memory are tried
+    against it before the fetcher, and closed-day prices that are fetched
+    are written back to it under source."""
+
     def __init__(
-        self, fetcher, single_fetcher=None, timeout: int = DEFAULT_TIMEOUT
+        self,
+        fetcher,
+        single_fetcher=None,
+        timeout: int = DEFAULT_TIMEOUT,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_labels: int = DEFAULT_MAX_LABELS,
+        historical_store: Optional[HistoricalPriceStore] = None,
+        source: str = "default",
     ) -> None:
         self.fetcher = fetcher
+        self.historical_store = historical_store
+        self.source = source
         self.single_fetcher = single_fetcher
-        self.store: defaultdict[str, dict[str, Decimal | None]] = defaultdict(dict)
-        self.instant_refresh_times: dict[str, datetime] = {}
+        self.store: OrderedDict[str, OrderedDict[str, Decimal | None]] = OrderedDict()
+        # monotonic fetch time of each instant price
+        self.instant_refresh_times: dict[str, float] = {}
         self.default_timeout: int = timeout
+        self.max_entries = max_entries
+        self.max_labels = max_labels
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.store_hits = 0
+        # lookups that waited on another thread's fetch
+        self.coalesced = 0
+        self._lock = threading.RLock()
+        self._in_flight: dict[tuple[str, str], Future] = {}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "store_hits": self.store_hits,
+            "coalesced": self.coalesced,
+            "labels": len(self.store),
+            "entries": sum(len(v) for v in self.store.values()),
+        }
 
     @staticmethod
     def date_to_label(date: datetype | None) -> str:
         if not date:
-            label = "INSTANT"
+            label = INSTANT
         else:
             label = date.isoformat()
         return label
 
+    def _label_store(self, label: str) -> OrderedDict[str, Decimal | None]:
+        cached = self.store.get(label)
+        if cached is None:
+            cached = OrderedDict()
+            self.store[label] = cached
+            while len(self.store) > self.max_labels:
+                old_label, old = self.store.popitem(last=False)
+                self.evictions += len(old)
+                if old_label == INSTANT:
+                    self.instant_refresh_times.clear()
+        else:
+            self.store.move_to_end(label)
+        return cached
+
+    def _expired(self, label: str, ticker: str, now: float) -> bool:
+        if label != INSTANT:
+            return False
+        fetched = self.instant_refresh_times.get(ticker)
+        return fetched is None or now - fetched > self.default_timeout
+
+    def _set(self, label: str, ticker: str, price) -> None:
+        cached = self._label_store(label)
+        cached[ticker] = price
+        cached.move_to_end(ticker)
+        if label == INSTANT:
+            self.instant_refresh_times[ticker] = time.monotonic()
+        while len(cached) > self.max_entries:
+            evicted, _ = cached.popitem(last=False)
+            self.evictions += 1
+            if label == INSTANT:
+                self.instant_refresh_times.pop(evicted, None)
+
+    def _lookup(
+        self, label: str, tickers: List[str]
+    ) -> tuple[Dict[str, Decimal | None], Dict[str, Future], List[str]]:
+        """Split tickers into cached prices, fetches already in flight in
+        another thread, and tickers this caller now owns fetching. Owned
+        tickers must be handed back through _release."""
+        found: Dict[str, Decimal | None] = {}
+        waiting: Dict[str, Future] = {}
+        owned: List[str] = []
+        now = time.monotonic()
+        with self._lock:
+            cached = self._label_store(label)
+            for ticker in dict.fromkeys(tickers):
+                if ticker in cached and not self._expired(label, ticker, now):
+                    found[ticker] = cached[ticker]
+                    cached.move_to_end(ticker)
+                elif (label, ticker) in self._in_flight:
+                    waiting[ticker] = self._in_flight[(label, ticker)]
+                else:
+                    self._in_flight[(label, ticker)] = Future()
+                    owned.append(ticker)
+            self.hits += len(found)
+            self.misses += len(owned)
+            self.coalesced += len(waiting)
+        return found, waiting, owned
+
+    def _release(
+        self,
+        label: str,
+        owned: List[str],
+        prices: Dict[str, Decimal | None],
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self._lock:
+            for ticker, price in prices.items():
+                self._set(label, ticker, price)
+            futures = [self._in_flight.pop((label, ticker)) for ticker in owned]
+        for future in futures:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(prices)
+
+    def invalidate(
+        self, tickers: Optional[List[str]] = None, date: datetype | None = None
+    ) -> int:
+        """Drop cached prices for tickers, or the whole label when tickers
+        is None. Returns how many prices were dropped."""
+        label = self.date_to_label(date)
+        with self._lock:
+            cached = self.store.get(label)
+            if not cached:
+                return 0
+            if tickers is None:
+                tickers = list(cached)
+            dropped = 0
+            for ticker in tickers:
+                if ticker in cached:
+                    del cached[ticker]
+                    dropped += 1
+                if label == INSTANT:
+                    self.instant_refresh_times.pop(ticker, None)
+            return dropped
+
+    def _load_historical(
+        self, label: str, tickers: List[str], date: datetype
+    ) -> Dict[str, Decimal]:
+        if not self.historical_store:
+            return {}
+        stored = self.historical_store.get_prices(self.source, tickers, date)
+        with self._lock:
+            self.store_hits += len(stored)
+        return stored
+
+    def _save_historical(self, date: datetype | None, prices: Dict) -> None:
+        if date and self.historical_store:
+            self.historical_store.put_prices(self.source, date, prices)
+
     def get_price(self, ticker: str, date: datetype | None = None) -> Decimal | None:
         """If we have an optimized single stock lookup"""
         label = self.date_to_label(date)
-        cached: dict[str, Decimal | None] = self.store[label]
-        if ticker in cached and label == "INSTANT":
-            if (
-                datetime.now() - self.instant_refresh_times[ticker]
-            ).seconds > self.default_timeout:
-                del cached[ticker]
-        if ticker in cached:
-            return cached[ticker]
+        found, waiting, owned = self._lookup(label, [ticker])
+        if ticker in found:
+            return found[ticker]
+        if ticker in waiting:
+            try:
+                return waiting[ticker].result().get(ticker)
+            except PriceFetchError:
+                raise
+            except Exception as e:
+                raise PriceFetchError([ticker], e)
+        prices: Dict[str, Decimal | None] = {}
         try:
-            price = self.single_fetcher(ticker, date)
-            cached[ticker] = price
-            if label == "INSTANT":
-                self.instant_refresh_times[ticker] = datetime.now()
-            return price
-        except NotImplementedError:
-            return self.get_prices([ticker], date)[ticker]
+            if date:
+                prices.update(self._load_historical(label, [ticker], date))
+            if ticker not in prices:
+                try:
+                    if not self.single_fetcher:
+                        raise NotImplementedError
+                    prices[ticker] = self.single_fetcher(ticker, date)
+                except NotImplementedError:
+                    prices.update(call_fetcher(self.fetcher, [ticker], date))
+                self._save_historical(date, prices)
         except Exception as e:
+            self._release(label, owned, {}, error=e)
             raise PriceFetchError([ticker], e)
+        self._release(label, owned, prices)
+        return prices.get(ticker)
 
     def get_prices(
         self,
@@ -67,33 +285,632 @@ class PriceCache(object):
     ) -> Dict[str, Decimal | None]:
         # if no date is provided, assume they want the instantaneous price
         label = self.date_to_label(date)
-        cached: dict[str, Decimal | None] = self.store[label]
-        found = {k: v for k, v in cached.items() if k in tickers}
-        if label == "INSTANT":
-            for k, v in self.instant_refresh_times.items():
-                if k in tickers:
-                    if (datetime.now() - v).seconds > self.default_timeout:
-                        found.pop(k, None)
-        missing = [x for x in tickers if x not in found]
-        if missing:
+        found, waiting, owned = self._lookup(label, tickers)
+        if owned:
+            prices: Dict[str, Decimal | None] = {}
+            error: Optional[BaseException] = None
             try:
-                prices: dict[str, Decimal | None] = self.fetcher(
-                    missing, date, fail_on_missing=fail_on_missing
-                )
-            except PriceFetchError:
+                if date:
+                    prices.update(self._load_historical(label, owned, date))
+                missing = [ticker for ticker in owned if ticker not in prices]
+                if missing:
+                    fetched = call_fetcher(self.fetcher, missing, date, fail_on_missing)
+                    self._save_historical(date, fetched)
+                    prices.update(fetched)
+            except PriceFetchError as e:
+                error = e
+            except Exception as e:
+                error = PriceFetchError(owned, e)
+            self._release(label, owned, prices, error=error)
+            if error is not None and fail_on_missing:
+                raise error
+            found.update(prices)
+        # tickers another caller was already fetching
+        for ticker, future in waiting.items():
+            try:
+                shared = future.result()
+            except Exception as e:
                 if fail_on_missing:
-                    raise
+                    if isinstance(e, PriceFetchError):
+                        raise
+                    raise PriceFetchError([ticker], e)
+                continue
+            if ticker in shared:
+                found[ticker] = shared[ticker]
+        return found
+
+    async def get_prices_async(
+        self,
+        tickers: List[str],
+        fetcher: Callable[..., Awaitable[Mapping[str, Decimal | None]]],
+        date: datetype | None = None,
+        fail_on_missing: bool = True,
+    ) -> Dict[str, Decimal | None]:
+        """get_prices for event loops. fetcher is a coroutine function with
+        the same signature as the sync fetcher, and fetches already in
+        flight elsewhere are awaited without blocking the loop."""
+        label = self.date_to_label(date)
+        found, waiting, owned = self._lookup(label, tickers)
+        if owned:
+            prices: Dict[str, Decimal | None] = {}
+            error: Optional[BaseException] = None
+            try:
+                if date:
+                    prices.update(self._load_historical(label, owned, date))
+                missing = [ticker for ticker in owned if ticker not in prices]
+                if missing:
+                    fetched = await call_fetcher(
+                        fetcher, missing, date, fail_on_missing
+                    )
+                    self._save_historical(date, dict(fetched))
+                    prices.update(fetched)
+            except PriceFetchError as e:
+                error = e
+            except Exception as e:
+                error = PriceFetchError(owned, e)
+            except BaseException as e:
+                # cancelled; let waiters retry rather than hang
+                self._release(label, owned, {}, error=PriceFetchError(owned, e))
+                raise
+            self._release(label, owned, prices, error=error)
+            if error is not None and fail_on_missing:
+                raise error
+            found.update(prices)
+        for ticker, future in waiting.items():
+            try:
+                shared = await asyncio.wrap_future(future)
             except Exception as e:
                 if fail_on_missing:
-                    raise PriceFetchError(missing, e)
-            for ticker, price in prices.items():
-                cached[ticker] = price
-                found[ticker] = price
-                if label == "INSTANT":
-                    self.instant_refresh_times[ticker] = datetime.now()
+                    if isinstance(e, PriceFetchError):
+                        raise
+                    raise PriceFetchError([ticker], e)
+                continue
+            if ticker in shared:
+                found[ticker] = shared[ticker]
         return found
 
 
+class SingleFlight(object):
+    """Run one call per key at a time; concurrent callers with the same
+    key wait for and share that call's result or exception."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+def approximate_size(obj: Any) -> int:
+    """Rough deep size in bytes of obj and the containers it holds"""
+    seen: set[int] = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__"):
+            stack.append(vars(item))
+    return total
+
+
+# 64MB
+DEFAULT_SHARED_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class SharedCache(object):
+    """Process-wide LRU store for objects that are identical for every
+    provider instance of a type, such as instrument maps.
+
+    Entries are keyed by (namespace, key); providers use their provider
+    type as the namespace. Once the approximate size of the recorded
+    values passes max_bytes, least recently used entries are dropped."""
+
+    def __init__(self, max_bytes: int = DEFAULT_SHARED_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.flight = SingleFlight()
+        self.size = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], Any] = OrderedDict()
+        self._sizes: dict[tuple[str, str], int] = {}
+
+    def get_or_create(
+        self, namespace: str, key: str, factory: Callable[[], Any]
+    ) -> Any:
+        with self._lock:
+            entry_key = (namespace, key)
+            if entry_key in self._entries:
+                self._entries.move_to_end(entry_key)
+            else:
+                self._entries[entry_key] = factory()
+            return self._entries[entry_key]
+
+    def record(self, namespace: str, key: str, value: Any) -> None:
+        """Account for the size of a freshly stored value and evict to
+        stay under the cap"""
+        size = approximate_size(value)
+        with self._lock:
+            entry_key = (namespace, key)
+            if entry_key not in self._entries:
+                return
+            self.size += size - self._sizes.get(entry_key, 0)
+            self._sizes[entry_key] = size
+            self._entries.move_to_end(entry_key)
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                evicted, _ = self._entries.popitem(last=False)
+                self.size -= self._sizes.pop(evicted, 0)
+                self.evictions += 1
+
+    def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        with self._lock:
+            return [
+                (key, value)
+                for (space, key), value in self._entries.items()
+                if space == namespace
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.size = 0
+
+
+SHARED_CACHE = SharedCache()
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """requests per per_seconds, enforced as a token bucket holding up to
+    burst tokens. Over any window of per_seconds at most requests + burst
+    calls go through, so declare requests below the broker's limit by at
+    least burst."""
+
+    requests: int
+    per_seconds: float
+    burst: int = 1
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.per_seconds
+
+
+class TokenBucket(object):
+    def __init__(self, limit: RateLimit) -> None:
+        self.limit = limit
+        self.tokens = float(limit.burst)
+        self.updated = time.monotonic()
+        self.acquired = 0
+        # total seconds callers were told to wait
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            float(self.limit.burst),
+            self.tokens + max(0.0, now - self.updated) * self.limit.rate,
+        )
+        self.updated = now
+
+    def wait_time(self, tokens: int = 1) -> float:
+        """Seconds until tokens would be available, without taking them"""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.limit.rate)
+
+    def try_reserve(self, tokens: int = 1) -> float:
+        """Take tokens only if available now. Returns 0 when taken, or the
+        seconds until they would be, leaving the bucket untouched."""
+        with self._lock:
+            self._refill()
+            if self.tokens < tokens:
+                return (tokens - self.tokens) / self.limit.rate
+            self.tokens -= tokens
+            self.acquired += tokens
+            return 0.0
+
+    def penalize(self, seconds: float) -> None:
+        """The broker throttled us: hold every caller back for at least
+        seconds"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.limit.rate)
+
+    def reserve(self, tokens: int = 1) -> float:
+        """Take tokens, going into debt if the bucket is short, and return
+        how long the caller must wait before using them. Callers are served
+        in the order they reserve."""
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            self.acquired += tokens
+            delay = max(0.0, -self.tokens / self.limit.rate)
+            self.waited += delay
+            return delay
+
+
+class RateLimiter(object):
+    """Token buckets keyed by (namespace, endpoint class).
+
+    Providers use their provider type as the namespace, so every instance
+    of a provider draws on the same budget. Waiting happens outside the
+    bucket lock; with block=False a call that would have to wait raises
+    RateLimitError instead."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple[str, EndpointClass], TokenBucket] = {}
+
+    def bucket(
+        self, namespace: str, endpoint: EndpointClass, limit: RateLimit
+    ) -> TokenBucket:
+        """The bucket for namespace and endpoint. The first limit declared
+        for them wins; replacing the bucket would forget the tokens already
+        spent, so a differing limit is logged and ignored."""
+        with self._lock:
+            key = (namespace, endpoint)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(limit)
+                self._buckets[key] = bucket
+            elif bucket.limit != limit:
+                Logger.warning(
+                    f"{namespace} {endpoint.value} is already limited to {bucket.limit}; ignoring {limit}"
+                )
+            return bucket
+
+    def _reserve(
+        self,
+        namespace: str,
+        endpoint: EndpointClass,
+        limit: RateLimit,
+        tokens: int,
+        block: bool,
+    ) -> float:
+        bucket = self.bucket(namespace, endpoint, limit)
+        if not block:
+            wait = bucket.try_reserve(tokens)
+            if wait > 0:
+                raise RateLimitError(
+                    f"{namespace} {endpoint.value} rate limit exceeded; retry in {wait:.1f} seconds. "
+                    f"Limit is {limit.requests} per {limit.per_seconds} seconds.",
+                    wait,
+                )
+            return 0.0
+        return bucket.reserve(tokens)
+
+    def penalize(
+        self,
+        namespace: str,
+        endpoint: EndpointClass,
+        limit: RateLimit,
+        seconds: float,
+    ) -> None:
+        self.bucket(namespace, endpoint, limit).penalize(seconds)
+
+    def acquire(
+        self,
+        namespace: str,
+        endpoint: EndpointClass,
+        limit: RateLimit,
+        tokens: int = 1,
+        block: bool = True,
+    ) -> float:
+        """Wait until tokens are available and take them. Returns the
+        seconds waited."""
+        delay = self._reserve(namespace, endpoint, limit, tokens, block)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(
+        self,
+        namespace: str,
+        endpoint: EndpointClass,
+        limit: RateLimit,
+        tokens: int = 1,
+        block: bool = True,
+    ) -> float:
+        delay = self._reserve(namespace, endpoint, limit, tokens, block)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                f"{namespace}:{endpoint.value}": {
+                    "acquired": bucket.acquired,
+                    "waited": bucket.waited,
+                }
+                for (namespace, endpoint), bucket in self._buckets.items()
+            }
+
+
+RATE_LIMITER = RateLimiter()
+
+
+@dataclass(frozen=True)
+class HttpPool:
+    """Keep-alive pool for a provider's raw HTTP calls. pool_connections
+    is how many hosts keep a pool, pool_maxsize how many connections each
+    host keeps open for reuse."""
+
+    pool_connections: int = 4
+    pool_maxsize: int = 16
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+def pooled_session(pool: HttpPool, session: Optional[Any] = None) -> Any:
+    """Mount keep-alive adapters sized by pool on a requests session, a new
+    one unless given. Retries are left to the Retrier."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    if session is None:
+        session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool.pool_connections,
+        pool_maxsize=pool.pool_maxsize,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# statuses worth another attempt; only 429 promises the broker did nothing
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+THROTTLED_STATUS = 429
+# Robinhood (and other Django REST Framework APIs) throttle messages
+AVAILABLE_IN = re.compile(r"available in ([0-9]+) seconds")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter: the wait before retry n is
+    uniform between 0 and min(max_delay, base_delay * 2**n), unless the
+    broker said how long to wait. max_attempts counts the first call."""
+
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    retry_statuses: frozenset[int] = RETRY_STATUSES
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def throttle_hint(message: Any) -> Optional[float]:
+    """Seconds from an 'available in N seconds' throttle message"""
+    match = AVAILABLE_IN.search(str(message))
+    return float(match.group(1)) if match else None
+
+
+def retry_after(response: Any) -> Optional[float]:
+    """Seconds the broker asked for in a Retry-After header, or in the
+    detail of a throttled response body"""
+    from email.utils import parsedate_to_datetime
+
+    headers = getattr(response, "headers", None) or {}
+    header = headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+        try:
+            moment = parsedate_to_datetime(header)
+            return max(0.0, moment.timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    try:
+        body = response.json()
+    except Exception:
+        return None
+    if isinstance(body, dict) and body.get("detail"):
+        return throttle_hint(body["detail"])
+    return None
+
+
+def _is_transport_error(error: BaseException) -> bool:
+    # requests' connection errors and timeouts are OSErrors
+    if isinstance(error, OSError):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(error, httpx.TransportError)
+
+
+class Retrier(object):
+    """Retries broker calls and keeps per operation metrics.
+
+    A call is retried when it raises TransientError or is answered 429, as
+    the broker did not act on it. Other retry_statuses and transport errors
+    are only retried for idempotent calls: an order that timed out may have
+    been placed, so it is only retried when the broker dedupes on a key the
+    request carries. Calls returning a response (requests or httpx) are
+    checked by status; once attempts run out the last response is returned
+    or the last error raised."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _record(self, name: str, **counts: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(
+                name, {"calls": 0, "retries": 0, "waited": 0.0, "exhausted": 0}
+            )
+            for key, value in counts.items():
+                stats[key] += value
+
+    def delay(
+        self,
+        policy: RetryPolicy,
+        attempt: int,
+        idempotent: bool,
+        response: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> Tuple[Optional[float], bool]:
+        """Seconds to wait before retrying, or None to stop, and whether
+        the broker throttled the call"""
+        if isinstance(error, TransientError):
+            if error.retry_after is not None:
+                return error.retry_after, True
+            return policy.backoff(attempt), True
+        if response is None and error is not None:
+            response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        if isinstance(status, int):
+            if status not in policy.retry_statuses:
+                return None, False
+            throttled = status == THROTTLED_STATUS
+            if not (throttled or idempotent):
+                return None, False
+            hint = retry_after(response)
+            return (policy.backoff(attempt) if hint is None else hint), throttled
+        if error is not None and idempotent and _is_transport_error(error):
+            return policy.backoff(attempt), False
+        return None, False
+
+    def _next(
+        self,
+        name: str,
+        policy: RetryPolicy,
+        attempt: int,
+        idempotent: bool,
+        result: Any,
+        error: Optional[BaseException],
+    ) -> Tuple[Optional[float], bool]:
+        if error is None and getattr(result, "status_code", None) not in (
+            policy.retry_statuses
+        ):
+            return None, False
+        wait, throttled = self.delay(policy, attempt, idempotent, result, error)
+        if wait is None:
+            return None, False
+        if attempt + 1 >= policy.max_attempts:
+            self._record(name, exhausted=1)
+            return None, False
+        self._record(name, retries=1, waited=wait)
+        Logger.info(
+            f"Retrying {name} in {wait:.1f} seconds (attempt {attempt + 2} of {policy.max_attempts})"
+        )
+        return wait, throttled
+
+    def call(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        idempotent: bool = True,
+        wait: Callable[[float, bool], Any] = lambda seconds, throttled: time.sleep(
+            seconds
+        ),
+    ) -> Any:
+        """Call func until it succeeds or stops being retryable. wait is
+        given the delay and whether the broker throttled the call."""
+        self._record(name, calls=1)
+        attempt = 0
+        while True:
+            result, error = None, None
+            try:
+                result = func()
+            except Exception as e:
+                error = e
+            delay, throttled = self._next(
+                name, policy, attempt, idempotent, result, error
+            )
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+            wait(delay, throttled)
+            attempt += 1
+
+    async def call_async(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        idempotent: bool = True,
+        wait: Optional[Callable[[float, bool], Awaitable[Any]]] = None,
+    ) -> Any:
+        self._record(name, calls=1)
+        attempt = 0
+        while True:
+            result, error = None, None
+            try:
+                result = await func()
+            except Exception as e:
+                error = e
+            delay, throttled = self._next(
+                name, policy, attempt, idempotent, result, error
+            )
+            if delay is None:
+                if error is not None:
+                    raise error
+                return result
+            if wait is None:
+                await asyncio.sleep(delay)
+            else:
+                await wait(delay, throttled)
+            attempt += 1
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+RETRIER = Retrier()
+
+
 def time_endpoint(
     logger: Optional[logging.Logger] = None, log_level: int = logging.INFO
 ) -> Callable:
@@ -154,3 +971,28 @@ def time_endpoint(
         return wrapper
 
     return decorator
+
+
+def fan_out(
+    calls: Mapping[K, Callable[[], Any]], max_workers: Optional[int] = None
+) -> Tuple[Dict[K, Any], Dict[K, float]]:
+    """Run zero-argument callables concurrently in a thread pool.
+
+    Returns the results and the wall time in seconds of each call, both
+    keyed like the input. Every call is allowed to finish; the first
+    exception raised, in input order, is then re-raised."""
+
+    def timed(func: Callable[[], Any]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+
+    if not calls:
+        return {}, {}
+    results: Dict[K, Any] = {}
+    timings: Dict[K, float] = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(calls)) as executor:
+        futures = {key: executor.submit(timed, func) for key, func in calls.items()}
+    for key, future in futures.items():
+        results[key], timings[key] = future.result()
+    return results, timings
@@ -74,7 +74,7 @@ class LocalDictProvider(BaseProvider):
         if not price:
             raise ValueError("No available price for this instrument")
         if value:
-            qty = value / price
+            qty = (value / price).decimal
             value_delta = value
         else:
             value_delta = Money(value=qty * price)
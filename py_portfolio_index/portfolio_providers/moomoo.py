@@ -17,17 +17,16 @@ from py_portfolio_index.exceptions import (
     PriceFetchError,
     OrderError,
 )
-from py_portfolio_index.enums import ProviderType
+from py_portfolio_index.enums import EndpointClass, ProviderType
+from py_portfolio_index.portfolio_providers.common import RateLimit
 
 from py_portfolio_index.portfolio_providers.helpers.moomoo import (
     DEFAULT_PORT,
     MooMooProxy,
 )
-from functools import lru_cache
 from os import environ
-from collections import defaultdict, deque
+from collections import defaultdict
 from datetime import datetime
-import time
 
 FRACTIONAL_SLEEP = 60
 BATCH_SIZE = 50
@@ -48,6 +47,13 @@ class MooMooProvider(BaseProvider):
     TRADE_TOKEN_ENV = "MOOMOO_TRADE_TOKEN"
     DEVICE_ID_ENV = "MOOMOO_DEVICE_ID"
     OPEND_ENV = "MOOMOO_OPEND_PATH"
+    RATE_LIMITS = {
+        # OpenD allows 15 orders per 30 seconds
+        EndpointClass.ORDERS: RateLimit(requests=14, per_seconds=30),
+        EndpointClass.QUOTES: RateLimit(requests=50, per_seconds=30, burst=10),
+    }
+    # _buy_instrument takes the token, so direct calls are limited too
+    ORDERS_THROTTLED_ON_SUBMIT = True
 
     Proxy = MooMooProxy
 
@@ -96,46 +102,8 @@ class MooMooProvider(BaseProvider):
         )
         self.last_unlocked: datetime | None = None
 
-        # Rate limiting for orders: max 15 orders per 30 seconds
-        self._order_timestamps: deque = deque()
-        self._max_orders_per_window = 14  # Conservative: 14 instead of 15
-        self._rate_limit_window = 30  # seconds
-        self._raise_on_rate_limit = raise_on_rate_limit
-
-    def _check_order_rate_limit(self) -> None:
-        """Check if we can place an order without exceeding rate limits.
-        Either raises OrderError or sleeps to throttle based on raise_on_rate_limit flag.
-        """
-        current_time = time.time()
-
-        # Remove timestamps older than the rate limit window
-        while (
-            self._order_timestamps
-            and current_time - self._order_timestamps[0] > self._rate_limit_window
-        ):
-            self._order_timestamps.popleft()
-
-        # Check if we would exceed the rate limit
-        if len(self._order_timestamps) >= self._max_orders_per_window:
-            oldest_timestamp = self._order_timestamps[0]
-            wait_time = self._rate_limit_window - (current_time - oldest_timestamp)
-
-            if self._raise_on_rate_limit:
-                raise OrderError(
-                    f"Order rate limit exceeded. Please wait {wait_time:.1f} seconds before placing another order. "
-                    f"Current limit: {self._max_orders_per_window} orders per {self._rate_limit_window} seconds."
-                )
-            else:
-                # Sleep to throttle the order submission
-                # Add a small buffer (0.1 seconds) to ensure we're safely under the limit
-                sleep_time = wait_time + 0.1
-                time.sleep(sleep_time)
-
-    def _record_order_attempt(self) -> None:
-        """Record that an order attempt was made."""
-        self._order_timestamps.append(time.time())
+        self.raise_on_rate_limit = raise_on_rate_limit
 
-    @lru_cache(maxsize=None)
     def _get_instrument_price(
         self, ticker: str, at_day: Optional[date] = None, fail_on_missing: bool = True
     ) -> Optional[Decimal]:
@@ -158,6 +126,7 @@ class MooMooProvider(BaseProvider):
             # )
             # return Decimal(value=list(historicals.itertuples())[0].vwap)
         else:
+            self._throttle(EndpointClass.QUOTES)
             ret_sub, err_message = self._quote_context.subscribe(
                 ["US." + ticker], [SubType.TICKER], subscribe_push=False
             )
@@ -180,9 +149,6 @@ class MooMooProvider(BaseProvider):
     ) -> bool:
         from moomoo import RET_OK, TrdSide, OrderType
 
-        # Check rate limit before attempting to place order
-        self._check_order_rate_limit()
-
         if (
             not self.last_unlocked
             or (datetime.now() - self.last_unlocked).seconds > 300
@@ -193,9 +159,7 @@ class MooMooProvider(BaseProvider):
             else:
                 raise ConfigurationError(f"unlock trade error: {data}")
 
-        # Record the order attempt before making the API call
-        self._record_order_attempt()
-
+        self._throttle(EndpointClass.ORDERS)
         ret, data = self._trade_provider.place_order(
             # price is arbitrary for makret
             price=0.0 if not value else value.value,
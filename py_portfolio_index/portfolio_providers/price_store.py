@@ -0,0 +1,85 @@
+# Persistent store for closed-day prices
+# a price for a date that has already closed never changes, so once fetched
+# it can be served from disk on every later run
+import sqlite3
+from datetime import date as datetype
+from decimal import Decimal
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Mapping, Optional
+
+from py_portfolio_index.constants import CACHE_DIR
+
+DEFAULT_FILE_NAME = "historical_prices.sqlite"
+
+
+class HistoricalPriceStore(object):
+    """SQLite table of prices keyed by (source, ticker, date).
+
+    Prices are stored as text so Decimals round trip exactly. Only dates
+    before today are written; today's prices may still move."""
+
+    def __init__(self, path: Optional[Path | str] = None) -> None:
+        if path is None:
+            from platformdirs import user_cache_dir
+
+            path = Path(user_cache_dir(CACHE_DIR, ensure_exists=True)) / (
+                DEFAULT_FILE_NAME
+            )
+        self.path = Path(path)
+        self._lock = Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS prices (
+                    source TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    price TEXT NOT NULL,
+                    PRIMARY KEY (source, ticker, day)
+                )""")
+
+    @staticmethod
+    def is_closed(day: datetype) -> bool:
+        return day < datetype.today()
+
+    def get_prices(
+        self, source: str, tickers: List[str], day: datetype
+    ) -> Dict[str, Decimal]:
+        if not tickers:
+            return {}
+        output: Dict[str, Decimal] = {}
+        # stay well below sqlite's bound parameter limit
+        for idx in range(0, len(tickers), 500):
+            batch = tickers[idx : idx + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT ticker, price FROM prices WHERE source = ? AND day = ?"
+                    f" AND ticker IN ({placeholders})",
+                    [source, day.isoformat(), *batch],
+                ).fetchall()
+            output.update({ticker: Decimal(price) for ticker, price in rows})
+        return output
+
+    def put_prices(
+        self, source: str, day: datetype, prices: Mapping[str, Optional[Decimal]]
+    ) -> None:
+        if not self.is_closed(day):
+            return
+        rows = [
+            (source, ticker, day.isoformat(), str(price))
+            for ticker, price in prices.items()
+            if price is not None
+        ]
+        if not rows:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO prices (source, ticker, day, price)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
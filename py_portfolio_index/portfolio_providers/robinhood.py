@@ -1,6 +1,4 @@
-import re
 from decimal import Decimal
-from time import sleep
 from datetime import date, datetime
 from typing import Optional, List, Dict, DefaultDict
 from py_portfolio_index.constants import Logger
@@ -16,20 +14,50 @@ from py_portfolio_index.portfolio_providers.base_portfolio import (
     BaseProvider,
     ObjectKey,
 )
-from py_portfolio_index.exceptions import PriceFetchError, ConfigurationError
+from py_portfolio_index.exceptions import (
+    PriceFetchError,
+    ConfigurationError,
+    TransientError,
+)
 from py_portfolio_index.portfolio_providers.helpers.robinhood import (
     validate_login,
     ROBINHOOD_PASSWORD_ENV,
     ROBINHOOD_USERNAME_ENV,
 )
-from py_portfolio_index.enums import ProviderType
+from py_portfolio_index.enums import EndpointClass, ProviderType
+from py_portfolio_index.portfolio_providers.common import (
+    RateLimit,
+    pooled_session,
+    throttle_hint,
+)
 from os import environ
 from collections import defaultdict
 
 FRACTIONAL_SLEEP = 60
+# when a throttle message does not say how long
+THROTTLE_SLEEP = 30
 BATCH_SIZE = 50
 
 
+def raise_if_throttled(response) -> None:
+    """Robinhood reports a throttled order in the detail of the response
+    body; raise it as a TransientError carrying the wait it asked for"""
+    try:
+        body = response.json()
+    except Exception:
+        return
+    msg = body.get("detail") if isinstance(body, dict) else None
+    if msg and "throttled" in msg:
+        t = throttle_hint(msg) or THROTTLE_SLEEP
+        Logger.info(f"RH error: was throttled! Backing off {t}")
+        raise TransientError(msg, retry_after=t)
+    elif msg and "Too many requests for fractional orders" in msg:
+        Logger.info(
+            f"RH error: was throttled on fractional orders! Backing off {FRACTIONAL_SLEEP}"
+        )
+        raise TransientError(msg, retry_after=FRACTIONAL_SLEEP)
+
+
 def nearest_value(all_historicals, pivot) -> Optional[dict]:
     filtered = [z for z in all_historicals if z]
     if not filtered:
@@ -84,6 +112,14 @@ class RobinhoodProvider(BaseProvider):
 
     PROVIDER: ProviderType = ProviderType.ROBINHOOD
     SUPPORTS_BATCH_HISTORY: int = 70
+    # unpublished; kept well under where throttling was seen
+    RATE_LIMITS = {
+        EndpointClass.QUOTES: RateLimit(requests=60, per_seconds=60, burst=5),
+        EndpointClass.ACCOUNT: RateLimit(requests=60, per_seconds=60, burst=5),
+        EndpointClass.ORDERS: RateLimit(requests=10, per_seconds=60),
+    }
+    # the pooled session is robin_stocks' module level one
+    OWNS_HTTP_SESSION = False
 
     def __init__(
         self,
@@ -104,6 +140,8 @@ class RobinhoodProvider(BaseProvider):
             )
         self._provider = r
         BaseProvider.__init__(self)
+        # pool robin_stocks' session before it makes any calls
+        _ = self.http_session
         if not external_auth:
             self._provider.login(username=username, password=password)
         else:
@@ -121,6 +159,7 @@ class RobinhoodProvider(BaseProvider):
             ObjectKey.MISC,
             value="valid_tickers",
             callable=lambda: {row["symbol"] for row in self._local_instrument_cache},
+            shared=True,
         )
 
     def _load_local_instrument_cache(self):
@@ -149,6 +188,7 @@ class RobinhoodProvider(BaseProvider):
     def _get_instrument_price(
         self, ticker: str, at_day: Optional[date] = None, fail_on_missing: bool = True
     ) -> Optional[Decimal]:
+        self._throttle(EndpointClass.QUOTES)
         if at_day:
             historicals = self._provider.get_stock_historicals(
                 [ticker], interval="day", span="year", bounds="regular"
@@ -174,7 +214,6 @@ class RobinhoodProvider(BaseProvider):
         from robin_stocks.robinhood.stocks import (
             orders_url,
             # request_post,
-            SESSION,
             update_session,
         )
         from robin_stocks.robinhood.orders import (
@@ -184,9 +223,7 @@ class RobinhoodProvider(BaseProvider):
         )
         from uuid import uuid4
 
-        def request_post(
-            url, payload=None, timeout=16, json=False, jsonify_data=True, retry: int = 1
-        ):
+        def request_post(url, payload=None, timeout=16, json=False, jsonify_data=True):
             """For a given url and payload, makes a post request and returns the response. Allows for responses other than 200.
 
             :param url: The url to send a post request to.
@@ -202,22 +239,28 @@ class RobinhoodProvider(BaseProvider):
             :returns: Returns the data from the post request.
 
             """
-            data = None
-            res = None
-            if json:
-                update_session("Content-Type", "application/json")
-                res = SESSION.post(url, json=payload, timeout=timeout)
-                update_session(
-                    "Content-Type", "application/x-www-form-urlencoded; charset=utf-8"
-                )
-            else:
-                res = SESSION.post(url, data=payload, timeout=timeout)
 
-            if res.status_code == 429:
-                sleep(5 * retry)
-                return request_post(
-                    url, payload, timeout, json, jsonify_data, retry + 1
-                )
+            session = self.http_session
+
+            def post():
+                if json:
+                    update_session("Content-Type", "application/json")
+                    try:
+                        res = session.post(url, json=payload, timeout=timeout)
+                    finally:
+                        update_session(
+                            "Content-Type",
+                            "application/x-www-form-urlencoded; charset=utf-8",
+                        )
+                else:
+                    res = session.post(url, data=payload, timeout=timeout)
+                raise_if_throttled(res)
+                return res
+
+            # robinhood dedupes orders on the payload's ref_id, so a retry
+            # after a timeout cannot place the order twice; this is the only
+            # retry layer for orders
+            res = self._with_retries(EndpointClass.ORDERS, post, idempotent=True)
             if res.status_code not in [
                 200,
                 201,
@@ -258,6 +301,7 @@ class RobinhoodProvider(BaseProvider):
             callable=lambda: {
                 row["symbol"]: row["url"] for row in self._local_instrument_cache
             },
+            shared=True,
         )
         payload = {
             "account": account,
@@ -285,22 +329,6 @@ class RobinhoodProvider(BaseProvider):
         float_qty = float(qty)
         output = self._buy_instrument(ticker, float_qty, value)
         msg = output.get("detail")
-        if msg and "throttled" in msg:
-            m = re.search("available in ([0-9]+) seconds", msg)
-            if m:
-                found = m.group(1)
-                t = int(found)
-            else:
-                t = 30
-            Logger.info(f"RH error: was throttled! Sleeping {t}")
-            sleep(t)
-            return self.buy_instrument(ticker=ticker, qty=qty)
-        elif msg and "Too many requests for fractional orders" in msg:
-            Logger.info(
-                f"RH error: was throttled on fractional orders! Sleeping {FRACTIONAL_SLEEP}"
-            )
-            sleep(FRACTIONAL_SLEEP)
-            return self.buy_instrument(ticker=ticker, qty=qty)
         if not output.get("id"):
             if msg:
                 Logger.error(msg)
@@ -309,6 +337,13 @@ class RobinhoodProvider(BaseProvider):
             raise ValueError(output)
         return True
 
+    def _new_http_session(self):
+        # robin_stocks keeps the login on its module level session, so pool
+        # that one rather than opening another
+        from robin_stocks.robinhood.stocks import SESSION
+
+        return pooled_session(self.HTTP_POOL, session=SESSION)
+
     def get_unsettled_instruments(self) -> set[str]:
         from robin_stocks.robinhood.orders import orders_url, request_get
 
@@ -366,6 +401,7 @@ class RobinhoodProvider(BaseProvider):
             ObjectKey.MISC,
             value="instrument_to_symbol_map",
             callable=self._process_cache_to_dict,
+            shared=True,
         )
         try:
             out = instrument_to_symbol_map[instrument]
@@ -378,6 +414,7 @@ class RobinhoodProvider(BaseProvider):
                     callable=self._process_cache_to_dict,
                     # force refresh
                     max_age_seconds=1,
+                    shared=True,
                 )
                 return self._get_local_instrument_symbol(instrument, True)
             raise e
@@ -412,6 +449,7 @@ class RobinhoodProvider(BaseProvider):
             ObjectKey.MISC,
             value="instrument_to_symbol_map",
             callable=self._process_cache_to_dict,
+            shared=True,
         )
         for row in my_stocks:
             local = {}
@@ -465,6 +503,7 @@ class RobinhoodProvider(BaseProvider):
         ticker_list = tickers
         batches = []
         for batch in divide_into_batches(ticker_list, BATCH_SIZE):
+            self._throttle(EndpointClass.QUOTES)
             if at_day:
                 historicals = self._provider.get_stock_historicals(
                     batch, interval="day", span="year", bounds="regular"
@@ -487,6 +526,7 @@ class RobinhoodProvider(BaseProvider):
         instrument_to_symbol_map = self._get_cached_value(
             ObjectKey.MISC,
             callable=self._process_cache_to_dict,
+            shared=True,
         )
         divs: dict[str, Money] = self._get_cached_value(
             ObjectKey.DIVIDENDS, callable=self._get_dividends
@@ -515,6 +555,7 @@ class RobinhoodProvider(BaseProvider):
         instrument_to_symbol_map = self._get_cached_value(
             ObjectKey.MISC,
             callable=self._process_cache_to_dict,
+            shared=True,
         )
         [
             item.update({"symbol": instrument_to_symbol_map[item["instrument"]]})
@@ -532,6 +573,7 @@ class RobinhoodProvider(BaseProvider):
         instrument_to_symbol_map = self._get_cached_value(
             ObjectKey.MISC,
             callable=self._process_cache_to_dict,
+            shared=True,
         )
         [
             item.update({"symbol": instrument_to_symbol_map[item["instrument"]]})
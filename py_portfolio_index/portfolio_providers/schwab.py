@@ -1,6 +1,6 @@
 from decimal import Decimal
-from datetime import date, datetime
-from typing import Optional, List, Dict, DefaultDict, Any
+from datetime import date, datetime, time, timedelta
+from typing import Optional, List, Dict, DefaultDict, Any, Set
 from py_portfolio_index.constants import CACHE_DIR
 from py_portfolio_index.models import (
     RealPortfolio,
@@ -13,23 +13,28 @@ from py_portfolio_index.portfolio_providers.base_portfolio import (
     BaseProvider,
     ObjectKey,
 )
+from py_portfolio_index.portfolio_providers.async_provider import AsyncBaseProvider
 from py_portfolio_index.exceptions import ConfigurationError
 from py_portfolio_index.constants import Logger, UNKNOWN_TICKER
-from py_portfolio_index.exceptions import OrderError
-from py_portfolio_index.enums import ProviderType
+from py_portfolio_index.exceptions import OrderError, TransientError
+from py_portfolio_index.enums import EndpointClass, ProviderType
+from py_portfolio_index.portfolio_providers.common import RateLimit
 from py_portfolio_index.models import DividendResult
 from collections import defaultdict
-from functools import lru_cache
+from contextlib import contextmanager
+from functools import partial
 from os import environ, remove
 from pathlib import Path
 from platformdirs import user_cache_dir
 from pytz import UTC
-from time import sleep
+import asyncio
 import re
 
 FRACTIONAL_SLEEP = 60
 BATCH_SIZE = 50
 FRACTIONAL_SLEEP = 60
+# how far back the transactions API reaches
+TRANSACTION_WINDOW_DAYS = 60
 
 CACHE_PATH = "schwab_tickers.json"
 CACHE_DESC_PATH = "schwab_desc_to_ticker.json"
@@ -95,6 +100,45 @@ def safe_get_symbol(input: dict[str, Any]) -> str:
     return input.get("instrument", {}).get("symbol", UNKNOWN_TICKER)
 
 
+def quote_prices(tickers: List[str], quotes: dict) -> Dict[str, Optional[Decimal]]:
+    return {
+        ticker: (
+            Decimal(value=quotes[ticker]["quote"]["lastPrice"])
+            if ticker in quotes
+            else None
+        )
+        for ticker in tickers
+    }
+
+
+def market_buy_order(symbol: str, qty: Decimal | int):
+    from schwab.orders.equities import equity_buy_market, Duration, Session
+
+    return (
+        equity_buy_market(symbol, quantity=int(qty))
+        .set_duration(Duration.DAY)
+        .set_session(Session.NORMAL)
+        .build()
+    )
+
+
+@contextmanager
+def portfolio_errors():
+    """Treat failures to read the account as an expired session"""
+    try:
+        yield
+    except KeyError as e:
+        raise ConfigurationError(
+            f"Could not fetch portfolio on {str(e)}; assuming session expired"
+        )
+    except Exception as e:
+        if "refresh_token" in str(e):
+            raise ConfigurationError(
+                f"Could not fetch portfolio: {str(e)}; assuming session expired"
+            )
+        raise e
+
+
 class SchwabProvider(BaseProvider):
     """Provider for interacting with stocks held in
     Schwab
@@ -102,6 +146,12 @@ class SchwabProvider(BaseProvider):
 
     PROVIDER = ProviderType.SCHWAB
     SUPPORTS_BATCH_HISTORY = 0
+    # 120 requests a minute per app
+    RATE_LIMITS = {
+        EndpointClass.QUOTES: RateLimit(requests=100, per_seconds=60, burst=10),
+        EndpointClass.ACCOUNT: RateLimit(requests=100, per_seconds=60, burst=10),
+        EndpointClass.ORDERS: RateLimit(requests=100, per_seconds=60, burst=10),
+    }
     API_KEY_ENV = "SCHWAB_API_KEY"
     APP_SECRET_ENV = "SCHWAB_APP_SECRET"
     SUPPORTS_FRACTIONAL_SHARES = False
@@ -152,6 +202,10 @@ class SchwabProvider(BaseProvider):
         # we must set both of these to have a valid login
         BaseProvider.__init__(self)
         self._provider = c
+        # kept so an async client can be opened on the same token
+        self._api_key = api_key
+        self._app_secret = app_secret
+        self._token_path = token_path
         try:
             self._account_hash = api_helper(self._provider.get_account_numbers())[0][
                 "hashValue"
@@ -189,28 +243,13 @@ class SchwabProvider(BaseProvider):
         with open(file, "w") as f:
             json.dump(self._local_description_lookup_cache, f)
 
-    @lru_cache(maxsize=None)
     def _get_instrument_price(
         self, ticker: str, at_day: Optional[date] = None, fail_on_missing: bool = True
     ) -> Optional[Decimal]:
-        stored = self._price_cache.get_prices(tickers=[ticker], date=at_day)
-        if stored:
-            return stored[ticker]
-        if at_day:
-            start_datetime, end_datetime = date_to_datetimes(at_day)
-            historicals = api_helper(
-                self._provider.get_price_history_every_day(
-                    symbol=ticker,
-                    start_datetime=start_datetime,
-                    end_datetime=end_datetime,
-                )
-            )
-            rval = Decimal(value=historicals[0].vwap)
-
-        else:
-            quotes = api_helper(self._provider.get_quote(symbol=ticker))
-            rval = Decimal(value=quotes["quotes"])
-        return rval
+        # caching happens in the PriceCache wrapped around this
+        return self._get_instrument_prices(
+            [ticker], at_day=at_day, fail_on_missing=fail_on_missing
+        ).get(ticker)
 
     def _buy_instrument(
         self,
@@ -219,28 +258,22 @@ class SchwabProvider(BaseProvider):
         value: Optional[Money] = None,
         price: Optional[Decimal] = None,
     ) -> None:
-        from schwab.orders.equities import equity_buy_market, Duration, Session
-        from httpx import Request
-
-        order: Request = self._provider.place_order(
-            self._account_hash,
-            order_spec=equity_buy_market(symbol, quantity=int(qty))
-            .set_duration(Duration.DAY)
-            .set_session(Session.NORMAL)
-            .build(),
-        )
-        try:
-            _ = self._utils.extract_order_id(order)
-        except Exception as e:
-            if "order not successful: status 429" in str(e):
-                Logger.info(
-                    f"RH error: was throttled on fractional orders! Sleeping {FRACTIONAL_SLEEP}"
-                )
-                sleep(FRACTIONAL_SLEEP)
-                return self._buy_instrument(
-                    symbol=symbol, qty=qty, value=value, price=price
-                )
-            raise e
+        def submit() -> None:
+            order = self._provider.place_order(
+                self._account_hash, order_spec=market_buy_order(symbol, qty)
+            )
+            try:
+                _ = self._utils.extract_order_id(order)
+            except Exception as e:
+                if "order not successful: status 429" in str(e):
+                    Logger.info(
+                        f"Schwab throttled orders; backing off {FRACTIONAL_SLEEP}"
+                    )
+                    raise TransientError(str(e), retry_after=FRACTIONAL_SLEEP)
+                raise e
+
+        # orders carry no dedupe key, so only throttled ones are retried
+        self._with_retries(EndpointClass.ORDERS, submit, idempotent=False)
         return None
 
     def buy_instrument(self, ticker: str, qty: Decimal, value: Optional[Money] = None):
@@ -265,9 +298,12 @@ class SchwabProvider(BaseProvider):
             self._provider.Order.Status.QUEUED,
             self._provider.Order.Status.WORKING,
         ):
-            orders = api_helper(
-                self._provider.get_orders_for_account(
-                    account_hash=self._account_hash, status=status
+            orders += api_helper(
+                self._with_retries(
+                    EndpointClass.ACCOUNT,
+                    lambda: self._provider.get_orders_for_account(
+                        account_hash=self._account_hash, status=status
+                    ),
                 )
             )
         return set(safe_get_symbol(item) for item in orders)
@@ -299,34 +335,40 @@ class SchwabProvider(BaseProvider):
     def get_portfolio(self) -> dict:
         from schwab.client import Client
 
-        try:
+        with portfolio_errors():
             return api_helper(
-                self._provider.get_account(
-                    account_hash=self._account_hash,
-                    fields=Client.Account.Fields.POSITIONS,
+                self._with_retries(
+                    EndpointClass.ACCOUNT,
+                    lambda: self._provider.get_account(
+                        account_hash=self._account_hash,
+                        fields=Client.Account.Fields.POSITIONS,
+                    ),
                 )
             )["securitiesAccount"]
-        except KeyError as e:
-            raise ConfigurationError(
-                f"Could not fetch portfolio on {str(e)}; assuming session expired"
-            )
-        except Exception as e:
-            if "refresh_token" in str(e):
-                raise ConfigurationError(
-                    f"Could not fetch portfolio: {str(e)}; assuming session expired"
-                )
-            raise e
 
     def get_holdings(self) -> RealPortfolio:
         accounts_data = self._get_cached_value(
             ObjectKey.ACCOUNT, callable=self.get_portfolio
         )
-        my_stocks = accounts_data["positions"]
-
         unsettled = self._get_cached_value(
             ObjectKey.UNSETTLED, callable=self.get_unsettled_instruments
         )
+        symbols = [safe_get_symbol(row) for row in accounts_data["positions"]]
+        return self._build_holdings(
+            accounts_data,
+            unsettled,
+            self._price_cache.get_prices(symbols),
+            self.get_per_ticker_profit_or_loss(),
+        )
 
+    def _build_holdings(
+        self,
+        accounts_data: dict,
+        unsettled: set[str],
+        prices: Dict[str, Optional[Decimal]],
+        pl_info: Dict[str, ProfitModel],
+    ) -> RealPortfolio:
+        my_stocks = accounts_data["positions"]
         pre = {}
         symbols = []
         for row in my_stocks:
@@ -339,7 +381,6 @@ class SchwabProvider(BaseProvider):
             local["value"] = Money(value=row["marketValue"])
             local["weight"] = 0
             pre[ticker] = local
-        prices = self._price_cache.get_prices(symbols)
         total_value = Decimal(0.0)
         for s in symbols:
             price = prices[s]
@@ -347,7 +388,6 @@ class SchwabProvider(BaseProvider):
                 continue
             total_value += price * Decimal(pre[s]["units"])
         final = []
-        pl_info = self.get_per_ticker_profit_or_loss()
         for s in symbols:
             local = pre[s]
             local["weight"] = local["value"].value / total_value
@@ -372,46 +412,72 @@ class SchwabProvider(BaseProvider):
             if at_day:
                 start_datetime, end_datetime = date_to_datetimes(at_day)
                 for ticker in list_batch:
+                    self._throttle(EndpointClass.QUOTES)
                     historicals = api_helper(
-                        self._provider.get_price_history_every_day(
-                            symbol=ticker,
-                            start_datetime=start_datetime,
-                            end_datetime=end_datetime,
+                        self._with_retries(
+                            EndpointClass.QUOTES,
+                            lambda: self._provider.get_price_history_every_day(
+                                symbol=ticker,
+                                start_datetime=start_datetime,
+                                end_datetime=end_datetime,
+                            ),
                         )
                     )
                     batches.append(
                         {ticker: Decimal(value=historicals["candles"][0]["close"])}
                     )
             else:
-                quotes = api_helper(self._provider.get_quotes(symbols=list_batch))
-                for ticker in list_batch:
-                    if ticker in quotes:
-                        prices[ticker] = Decimal(
-                            value=quotes[ticker]["quote"]["lastPrice"]
-                        )
-                    else:
-                        prices[ticker] = None
+                self._throttle(EndpointClass.QUOTES)
+                quotes = api_helper(
+                    self._with_retries(
+                        EndpointClass.QUOTES,
+                        lambda: self._provider.get_quotes(symbols=list_batch),
+                    )
+                )
+                prices.update(quote_prices(list_batch, quotes))
         for fbatch in batches:
             prices = {**prices, **fbatch}
         return prices
 
-    def _get_dividends_wrapper(self):
+    def _get_dividends_wrapper(self, start_date: datetime | None = None):
         from schwab.client.base import BaseClient
 
         return api_helper(
-            self._provider.get_transactions(
-                account_hash=self._account_hash,
-                transaction_types=BaseClient.Transactions.TransactionType.DIVIDEND_OR_INTEREST,
+            self._with_retries(
+                EndpointClass.ACCOUNT,
+                lambda: self._provider.get_transactions(
+                    account_hash=self._account_hash,
+                    start_date=start_date,
+                    transaction_types=BaseClient.Transactions.TransactionType.DIVIDEND_OR_INTEREST,
+                ),
             )
         )
 
+    def _get_dividend_transactions(self, start: datetime | None = None) -> list:
+        # without a start date the API returns its default window, which is
+        # as far back as start_date may reach
+        window_start = datetime.now(tz=UTC) - timedelta(days=TRANSACTION_WINDOW_DAYS)
+        if start is None or start.astimezone(UTC) <= window_start:
+            return self._get_cached_value(
+                ObjectKey.DIVIDENDS, callable=self._get_dividends_wrapper
+            )
+        return self._get_cached_value(
+            ObjectKey.DIVIDENDS,
+            value=start.date().isoformat(),
+            callable=lambda: self._get_dividends_wrapper(
+                datetime.combine(start.date(), time.min, tzinfo=UTC)
+            ),
+        )
+
     def get_per_ticker_profit_or_loss(self) -> Dict[str, ProfitModel]:
         account_info = self._get_cached_value(
             ObjectKey.ACCOUNT, callable=self.get_portfolio
         )
+        return self._profit_or_loss(account_info, self._get_dividends())
 
-        dividends = self._get_dividends()
-
+    def _profit_or_loss(
+        self, account_info: dict, dividends: DefaultDict[str, Money]
+    ) -> Dict[str, ProfitModel]:
         first = {
             safe_get_symbol(x): ProfitModel(
                 appreciation=Money(value=Decimal(x["longOpenProfitLoss"])),
@@ -441,6 +507,9 @@ class SchwabProvider(BaseProvider):
                 ticker = lookup_desc
         return ticker or UNKNOWN_TICKER, changes
 
+    def as_async(self) -> "AsyncSchwabProvider":
+        return AsyncSchwabProvider(self)
+
     def _get_dividends(self) -> defaultdict[str, Money]:
         dividends: dict = self._get_cached_value(
             ObjectKey.DIVIDENDS_DETAIL, callable=self._get_dividends_wrapper
@@ -464,9 +533,7 @@ class SchwabProvider(BaseProvider):
     def get_dividend_details(
         self, start: datetime | None = None
     ) -> list[DividendResult]:
-        dividends: dict = self._get_cached_value(
-            ObjectKey.DIVIDENDS, callable=self._get_dividends_wrapper
-        )
+        dividends = self._get_dividend_transactions(start)
         final = []
         changes = False
         for item in dividends:
@@ -489,3 +556,153 @@ class SchwabProvider(BaseProvider):
         if changes:
             self._save_local_description_lookup_cache()
         return final
+
+
+class AsyncSchwabProvider(AsyncBaseProvider):
+    """Native asyncio Schwab provider on schwab-py's AsyncClient, opened
+    on the sync provider's token file and sharing its price cache."""
+
+    provider: SchwabProvider
+
+    def __init__(self, provider: SchwabProvider, client=None):
+        super().__init__(provider)
+        if client is None:
+            from schwab import auth
+
+            client = auth.client_from_token_file(
+                provider._token_path,
+                provider._api_key,
+                app_secret=provider._app_secret,
+                asyncio=True,
+            )
+        self._client = client
+
+    async def _get_instrument_prices(
+        self,
+        tickers: List[str],
+        at_day: Optional[date] = None,
+        fail_on_missing: bool = True,
+    ) -> Dict[str, Optional[Decimal]]:
+        if at_day:
+            # one history request per ticker; not worth a native path
+            return await asyncio.to_thread(
+                self.provider._get_instrument_prices,
+                tickers,
+                at_day,
+                fail_on_missing=fail_on_missing,
+            )
+        batches = divide_into_batches(tickers, 100)
+        await self.provider._throttle_async(EndpointClass.QUOTES, len(batches))
+        responses = await asyncio.gather(
+            *[
+                self.provider._with_retries_async(
+                    EndpointClass.QUOTES,
+                    partial(self._client.get_quotes, symbols=batch),
+                )
+                for batch in batches
+            ]
+        )
+        prices: Dict[str, Optional[Decimal]] = {}
+        for batch, response in zip(batches, responses):
+            prices.update(quote_prices(batch, api_helper(response)))
+        return prices
+
+    async def get_instrument_prices(
+        self,
+        tickers: List[str],
+        at_day: Optional[date] = None,
+        fail_on_missing: bool = True,
+    ) -> Dict[str, Optional[Decimal]]:
+        if self.provider._quote_provider:
+            return await super().get_instrument_prices(
+                tickers, at_day, fail_on_missing=fail_on_missing
+            )
+        return await self.provider._price_cache.get_prices_async(
+            tickers,
+            self._get_instrument_prices,
+            date=at_day,
+            fail_on_missing=fail_on_missing,
+        )
+
+    async def get_portfolio(self) -> dict:
+        from schwab.client import Client
+
+        await self.provider._throttle_async(EndpointClass.ACCOUNT)
+        with portfolio_errors():
+            response = await self.provider._with_retries_async(
+                EndpointClass.ACCOUNT,
+                lambda: self._client.get_account(
+                    account_hash=self.provider._account_hash,
+                    fields=Client.Account.Fields.POSITIONS,
+                ),
+            )
+            return api_helper(response)["securitiesAccount"]
+
+    async def get_unsettled_instruments(self) -> Set[str]:
+        await self.provider._throttle_async(EndpointClass.ACCOUNT, 3)
+        responses = await asyncio.gather(
+            *[
+                self.provider._with_retries_async(
+                    EndpointClass.ACCOUNT,
+                    partial(
+                        self._client.get_orders_for_account,
+                        account_hash=self.provider._account_hash,
+                        status=status,
+                    ),
+                )
+                for status in (
+                    self._client.Order.Status.PENDING_ACTIVATION,
+                    self._client.Order.Status.QUEUED,
+                    self._client.Order.Status.WORKING,
+                )
+            ]
+        )
+        return set(
+            safe_get_symbol(item)
+            for response in responses
+            for item in api_helper(response)
+        )
+
+    async def get_holdings(self) -> RealPortfolio:
+        accounts_data, unsettled, dividends = await asyncio.gather(
+            self.get_portfolio(),
+            self.get_unsettled_instruments(),
+            # description lookups are cached and mostly local
+            asyncio.to_thread(self.provider._get_dividends),
+        )
+        symbols = [safe_get_symbol(row) for row in accounts_data["positions"]]
+        prices = await self.get_instrument_prices(symbols)
+        return self.provider._build_holdings(
+            accounts_data,
+            unsettled,
+            prices,
+            self.provider._profit_or_loss(accounts_data, dividends),
+        )
+
+    async def buy_instrument(
+        self, ticker: str, qty: Decimal, value: Optional[Money] = None
+    ) -> bool:
+        async def submit() -> None:
+            response = await self._client.place_order(
+                self.provider._account_hash, order_spec=market_buy_order(ticker, qty)
+            )
+            try:
+                self.provider._utils.extract_order_id(response)
+            except Exception as e:
+                if "order not successful: status 429" in str(e):
+                    Logger.info(
+                        f"Schwab throttled orders; backing off {FRACTIONAL_SLEEP}"
+                    )
+                    raise TransientError(str(e), retry_after=FRACTIONAL_SLEEP)
+                raise e
+
+        try:
+            await self.provider._with_retries_async(
+                EndpointClass.ORDERS, submit, idempotent=False
+            )
+        except Exception as e:
+            raise OrderError(f"Could not buy {ticker}: {str(e)}")
+        return True
+
+    async def aclose(self) -> None:
+        await self._client.close_async_session()
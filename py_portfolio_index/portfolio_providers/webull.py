@@ -18,8 +18,8 @@ from py_portfolio_index.exceptions import ConfigurationError, PriceFetchError
 from py_portfolio_index.models import DividendResult
 from collections import defaultdict
 import uuid
-from py_portfolio_index.enums import ProviderType
-from functools import lru_cache
+from py_portfolio_index.enums import EndpointClass, ProviderType
+from py_portfolio_index.portfolio_providers.common import RateLimit
 from os import environ
 from pytz import UTC
 import hashlib
@@ -127,6 +127,12 @@ class WebullProvider(BaseProvider):
 
     PROVIDER = ProviderType.WEBULL
     SUPPORTS_BATCH_HISTORY = 0
+    # unpublished for the unofficial API; conservative
+    RATE_LIMITS = {
+        EndpointClass.QUOTES: RateLimit(requests=60, per_seconds=60, burst=5),
+        EndpointClass.ACCOUNT: RateLimit(requests=30, per_seconds=60, burst=5),
+        EndpointClass.ORDERS: RateLimit(requests=10, per_seconds=60),
+    }
     PASSWORD_ENV = "WEBULL_PASSWORD"
     USERNAME_ENV = "WEBULL_USERNAME"
     TRADE_TOKEN_ENV = "WEBULL_TRADE_TOKEN"
@@ -215,9 +221,13 @@ class WebullProvider(BaseProvider):
         except ValueError:
             return None
 
-    @lru_cache(maxsize=None)
+    def _get_quote(self, webull_id: str) -> dict:
+        # each worker paces itself, so the pool can't burst past the limit
+        self._throttle(EndpointClass.QUOTES)
+        return self._provider.get_quote(None, webull_id)
+
     def _get_instrument_price(
-        self, ticker: str, at_day: Optional[date] = None
+        self, ticker: str, at_day: Optional[date] = None, fail_on_missing: bool = True
     ) -> Optional[Decimal]:
         # TODO: determine if there is a bulk API
         webull_id = self._local_instrument_cache.get(ticker)
@@ -230,6 +240,7 @@ class WebullProvider(BaseProvider):
                 return None
             self._local_instrument_cache[ticker] = webull_id
             self._save_local_instrument_cache()
+        self._throttle(EndpointClass.QUOTES)
         if at_day:
             historicals = self._provider.get_bars(
                 tId=webull_id,
@@ -255,7 +266,6 @@ class WebullProvider(BaseProvider):
         self, symbol: str, qty: Optional[float], value: Optional[Money] = None
     ) -> dict:
         from webull import webull
-        import requests
 
         # we should always have this at this point, as we would have had
         # to check price
@@ -322,11 +332,16 @@ class WebullProvider(BaseProvider):
             elif orderType == "STP TRAIL":
                 data["trailingStopStep"] = float(trial_value)
                 data["trailingType"] = str(trial_type)
-            response = requests.post(
-                provider._urls.place_orders(provider._account_id),
-                json=data,
-                headers=headers,
-                timeout=provider.timeout,
+            # webull dedupes orders on serialId, so a retry after a timeout
+            # cannot place the order twice
+            response = self._with_retries(
+                EndpointClass.ORDERS,
+                lambda: self.http_session.post(
+                    provider._urls.place_orders(provider._account_id),
+                    json=data,
+                    headers=headers,
+                    timeout=provider.timeout,
+                ),
             )
             return response.json()
 
@@ -371,7 +386,9 @@ class WebullProvider(BaseProvider):
         return True
 
     def get_unsettled_instruments(self) -> set[str]:
-        orders = self._provider.get_current_orders()
+        orders = self._with_retries(
+            EndpointClass.ACCOUNT, self._provider.get_current_orders
+        )
         return set(item["ticker"]["symbol"] for item in orders)
 
     def _get_stock_info(self, ticker: str) -> dict:
@@ -380,7 +397,9 @@ class WebullProvider(BaseProvider):
 
     def get_portfolio(self) -> dict:
         try:
-            return self._provider.get_portfolio()
+            return self._with_retries(
+                EndpointClass.ACCOUNT, self._provider.get_portfolio
+            )
         except Exception as e:
             raise ConfigurationError(
                 f"Could not fetch portfolio on {str(e)}; assuming session expired"
@@ -388,7 +407,9 @@ class WebullProvider(BaseProvider):
 
     def get_positions(self) -> list[dict]:
         try:
-            return self._provider.get_positions()
+            return self._with_retries(
+                EndpointClass.ACCOUNT, self._provider.get_positions
+            )
         except Exception as e:
             raise ConfigurationError(
                 f"Could not fetch positions on {str(e)}; assuming session expired"
@@ -479,6 +500,7 @@ class WebullProvider(BaseProvider):
             if at_day:
                 output: dict[str, Decimal | None] = {}
                 for _, ticker in wb_ids.items():
+                    self._throttle(EndpointClass.QUOTES)
                     historicals = self._provider.get_bars(
                         stock=ticker,
                         interval="d1",
@@ -503,8 +525,7 @@ class WebullProvider(BaseProvider):
                 final: Dict[str, Decimal | None] = {}
                 with ThreadPoolExecutor(max_workers=10) as executor:
                     futures = {
-                        executor.submit(self._provider.get_quote, None, wbid)
-                        for wbid in wb_ids
+                        executor.submit(self._get_quote, wbid) for wbid in wb_ids
                     }
                     for future in as_completed(futures):
                         future_output = future.result()
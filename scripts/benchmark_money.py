@@ -0,0 +1,111 @@
+"""Compare the slotted Money type against the old pydantic model.
+
+Times the arithmetic the order planner does per ticker and a full
+generate_order_plan run.
+
+    PYTHONPATH=. python scripts/benchmark_money.py
+"""
+
+import timeit
+from decimal import Decimal
+from typing import Union
+
+from pydantic import BaseModel, field_validator
+
+from py_portfolio_index import generate_order_plan
+from py_portfolio_index.enums import Currency
+from py_portfolio_index.models import (
+    IdealPortfolio,
+    IdealPortfolioElement,
+    Money,
+    RealPortfolio,
+    RealPortfolioElement,
+)
+
+SIZE = 2000
+
+
+class LegacyMoney(BaseModel):
+    """Money as it was before the slotted rewrite, copied from the
+    pydantic model: validator, comparison helper and arithmetic"""
+
+    value: Union[Decimal, int, float, "LegacyMoney"]
+    currency: Currency = Currency.USD
+
+    @property
+    def decimal(self) -> Decimal:
+        return self.value  # type: ignore
+
+    @field_validator("value", mode="before")
+    def coerce_to_decimal(cls, v) -> Decimal:
+        if isinstance(v, (int, float)):
+            return Decimal(v)
+        elif isinstance(v, LegacyMoney):
+            # TODO convert this
+            return v.decimal
+        elif isinstance(v, Decimal):
+            return v
+        return Decimal(v)
+
+    def _cmp_helper(self, other):
+        if isinstance(other, LegacyMoney):
+            if other.currency != self.currency:
+                raise ValueError("Currency conversions not supported")
+            return other.value
+        elif isinstance(other, int):
+            return Decimal(value=other)
+        return other
+
+    def __add__(self, other) -> "LegacyMoney":
+        return LegacyMoney(
+            value=self.value + self._cmp_helper(other), currency=self.currency
+        )
+
+    def __sub__(self, other) -> "LegacyMoney":
+        return LegacyMoney(
+            value=self.value - self._cmp_helper(other), currency=self.currency
+        )
+
+    def __mul__(self, other) -> "LegacyMoney":
+        return LegacyMoney(
+            value=self.value * self._cmp_helper(other), currency=self.currency
+        )
+
+
+def planner_loop(cls):
+    remaining = cls(value=100000)
+    for idx in range(SIZE):
+        target = cls(value=Decimal(idx)) * Decimal("1.5")
+        held = cls(value=idx)
+        remaining = remaining - (target - held)
+
+
+def order_plan():
+    ideal = IdealPortfolio(
+        holdings=[
+            IdealPortfolioElement(ticker=f"T{idx}", weight=Decimal(1) / SIZE)
+            for idx in range(SIZE)
+        ]
+    )
+    real = RealPortfolio(
+        holdings=[
+            RealPortfolioElement(ticker=f"T{idx}", units=1, value=Money(value=idx % 50))
+            for idx in range(0, SIZE, 2)
+        ],
+        cash=Money(value=50000),
+    )
+    prices = {f"T{idx}": Decimal(10 + idx % 90) for idx in range(SIZE)}
+    generate_order_plan(
+        real,
+        ideal,
+        price_fetcher=lambda tickers: {t: prices[t] for t in tickers},
+        purchase_power=Money(value=50000),
+    )
+
+
+if __name__ == "__main__":
+    for label, cls in (("pydantic", LegacyMoney), ("slotted", Money)):
+        elapsed = min(timeit.repeat(lambda: planner_loop(cls), number=5, repeat=3))
+        print(f"planner loop ({label}): {elapsed / 5 * 1000:.2f}ms")
+    elapsed = min(timeit.repeat(order_plan, number=1, repeat=3))
+    print(f"generate_order_plan ({SIZE} tickers): {elapsed * 1000:.2f}ms")
@@ -4,8 +4,8 @@ from io import StringIO
 import requests
 from datetime import datetime, timedelta
 import re
-from time import sleep
 from py_portfolio_index import PaperAlpacaProvider
+from py_portfolio_index.enums import EndpointClass
 import json
 import calendar
 
@@ -36,7 +36,7 @@ def validate_ticker(
         if "API limit reached. Please try again later. " in str(e):
             if attempt > 5:
                 raise e
-            sleep(30 * 1.1**attempt)
+            provider._back_off(EndpointClass.ACCOUNT, 30 * 1.1**attempt)
             return validate_ticker(ticker, provider, info_cache, attempt + 1)
         print(f"Failed to validate {ticker} with error {e}")
         info_cache[ticker] = False
@@ -45,11 +45,12 @@ setuptools.setup(
     },
     install_requires=install_requires,
     extras_require={
-        "alpaca": ["alpaca-py"],
+        "alpaca": ["alpaca-py", "httpx"],
         "robinhood": ["robin-stocks"],
         "webull": ["webull"],
         "schwab": ["schwab-py"],
         "moomoo": ["moomoo-api"],
+        "vectorized": ["numpy"],
     },
     classifiers=[
         "Programming Language :: Python",
@@ -3,6 +3,7 @@ from decimal import Decimal
 from py_portfolio_index.models import Money, RealPortfolioElement
 from py_portfolio_index.portfolio_providers.local_dict import LocalDictProvider
 from py_portfolio_index.enums import RoundingStrategy
+from py_portfolio_index.common import round_up_to_place
 
 
 @pytest.fixture
@@ -128,3 +129,243 @@ def test_purchase_ticker_value_dict_skip_unsettled(local_provider):
     holdings = local_provider.get_holdings()
     msft_holding = holdings.get_holding("MSFT")
     assert msft_holding is None
+
+
+def test_cached_value_single_flight(local_provider):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from py_portfolio_index.enums import ObjectKey
+
+    calls = []
+    barrier = threading.Barrier(6)
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "positions"
+
+    def lookup(_):
+        barrier.wait()
+        return local_provider._get_cached_value(ObjectKey.POSITIONS, callable=fetch)
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(lookup, range(6)))
+    assert results == ["positions"] * 6
+    assert len(calls) == 1
+
+
+def test_cached_value_stale_while_revalidate(local_provider):
+    import threading
+    import time
+    from datetime import datetime, timedelta
+    from py_portfolio_index.enums import ObjectKey
+    from py_portfolio_index.portfolio_providers.base_portfolio import CachePolicy
+
+    local_provider.set_cache_policy(
+        ObjectKey.ACCOUNT,
+        CachePolicy(
+            max_age_seconds=5, stale_while_revalidate=True, max_stale_seconds=60
+        ),
+    )
+    values = iter(range(1, 10))
+    refreshed = threading.Event()
+
+    def fetch():
+        value = next(values)
+        if value > 1:
+            refreshed.set()
+        return value
+
+    def get():
+        return local_provider._get_cached_value(ObjectKey.ACCOUNT, callable=fetch)
+
+    def age(seconds):
+        local_provider.CACHE[str(ObjectKey.ACCOUNT)].set = datetime.now() - timedelta(
+            seconds=seconds
+        )
+
+    assert get() == 1
+    age(10)
+    # stale value comes back right away, refresh happens in the background
+    assert get() == 1
+    assert refreshed.wait(5)
+    while local_provider._revalidating:
+        time.sleep(0.01)
+    assert get() == 2
+    # past the hard limit the caller waits for fresh data
+    age(120)
+    assert get() == 3
+
+
+def test_cache_invalidation(local_provider):
+    from py_portfolio_index.enums import ObjectKey
+    from py_portfolio_index.models import OrderElement, OrderType
+
+    for key, value in (
+        (ObjectKey.POSITIONS, None),
+        (ObjectKey.OPEN_ORDERS, "AAPL"),
+        (ObjectKey.DIVIDENDS, None),
+    ):
+        local_provider._get_cached_value(key, value=value, callable=lambda: "data")
+
+    def cached():
+        return {k for k, v in local_provider.CACHE.items() if v.value is not None}
+
+    local_provider.clear_cache(skip_clearing=[ObjectKey.DIVIDENDS])
+    assert cached() == {str(ObjectKey.DIVIDENDS)}
+
+    for key in (ObjectKey.POSITIONS, ObjectKey.OPEN_ORDERS):
+        local_provider._get_cached_value(key, value="AAPL", callable=lambda: "data")
+    local_provider.handle_order_element(
+        OrderElement(
+            ticker="AAPL", order_type=OrderType.BUY, value=Money(value=150), qty=None
+        )
+    )
+    assert cached() == {str(ObjectKey.DIVIDENDS)}
+
+    assert local_provider.get_instrument_price("AAPL") == Decimal("150.0")
+    local_provider._price_dict["AAPL"] = Decimal("155.0")
+    assert local_provider.invalidate_prices(["AAPL"]) == 1
+    assert local_provider.get_instrument_price("AAPL") == Decimal("155.0")
+
+
+def test_provider_cache_tiers():
+    from py_portfolio_index.enums import ObjectKey
+    from py_portfolio_index.portfolio_providers.common import SharedCache
+
+    first = LocalDictProvider(holdings=[])
+    second = LocalDictProvider(holdings=[])
+    shared = SharedCache(max_bytes=10_000)
+    first.shared_cache = second.shared_cache = shared
+
+    # per account data stays on the instance
+    first._get_cached_value(ObjectKey.POSITIONS, callable=lambda: "first")
+    assert (
+        second._get_cached_value(ObjectKey.POSITIONS, callable=lambda: "second")
+        == "second"
+    )
+
+    # shared data is fetched once per provider type
+    calls = []
+
+    def instruments():
+        calls.append(1)
+        return {"AAPL": "instrument-url"}
+
+    for provider in (first, second):
+        provider._get_cached_value(
+            ObjectKey.MISC, value="instruments", callable=instruments, shared=True
+        )
+    assert len(calls) == 1
+
+    # the shared tier stays under its memory cap
+    for idx in range(20):
+        first._get_cached_value(
+            ObjectKey.MISC,
+            value=f"big_{idx}",
+            callable=lambda: ["x" * 1000],
+            shared=True,
+        )
+    assert shared.size <= shared.max_bytes
+    assert shared.evictions > 0
+
+    first.MAX_CACHE_ENTRIES = 3
+    for idx in range(5):
+        first._get_cached_value(ObjectKey.OPEN_ORDERS, value=idx, callable=lambda: 1)
+    assert len(first.CACHE) == 3
+
+
+def test_shared_cache_does_not_pin_provider():
+    import gc
+    import weakref
+    from py_portfolio_index.enums import ObjectKey
+    from py_portfolio_index.portfolio_providers.base_portfolio import CachePolicy
+    from py_portfolio_index.portfolio_providers.common import SharedCache
+
+    class Provider(LocalDictProvider):
+        def __init__(self, name: str):
+            super().__init__(holdings=[])
+            self.name = name
+
+        def instruments(self):
+            return {"AAPL": self.name}
+
+    shared = SharedCache(max_bytes=10_000)
+    provider = Provider("first")
+    provider.shared_cache = shared
+    provider._get_cached_value(
+        ObjectKey.MISC, value="instruments", callable=provider.instruments, shared=True
+    )
+    ref = weakref.ref(provider)
+    del provider
+    gc.collect()
+    assert ref() is None
+
+    # an expired shared entry refreshes through the instance asking for it
+    second = Provider("second")
+    second.shared_cache = shared
+    second.set_cache_policy(
+        ObjectKey.MISC, CachePolicy(max_age_seconds=0, stale_while_revalidate=False)
+    )
+    assert second._get_cached_value(
+        ObjectKey.MISC, value="instruments", callable=second.instruments, shared=True
+    ) == {"AAPL": "second"}
+
+
+def test_purchase_order_plan_pipeline(local_provider):
+    import threading
+    import time
+    from py_portfolio_index.exceptions import OrderPlanError
+    from py_portfolio_index.models import OrderElement, OrderPlan, OrderType
+
+    tickers = ["AAPL", "GOOG", "MSFT", "AAPL", "GOOG", "MSFT"]
+    plan = OrderPlan(
+        to_buy=[
+            OrderElement(
+                ticker=ticker, order_type=OrderType.BUY, value=Money(value=10), qty=None
+            )
+            for ticker in tickers
+        ],
+        to_sell=[],
+    )
+    lock = threading.Lock()
+    active = []
+    peak = []
+    price_calls = []
+    fetch_prices = local_provider.get_instrument_prices
+
+    def get_instrument_prices(tickers, at_day=None, fail_on_missing=True):
+        price_calls.append(tickers)
+        return fetch_prices(tickers, at_day, fail_on_missing=fail_on_missing)
+
+    def buy_instrument(ticker, qty, value=None):
+        with lock:
+            active.append(ticker)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(ticker)
+        if ticker == "GOOG":
+            raise ValueError("rejected")
+        return True
+
+    local_provider.get_instrument_prices = get_instrument_prices
+    local_provider.get_instrument_price = None
+    local_provider.buy_instrument = buy_instrument
+
+    results = local_provider.purchase_order_plan(
+        plan, skip_errored_stocks=True, max_concurrency=3
+    )
+    # one batch quote for the plan, and never more than three orders open
+    assert price_calls == [["AAPL", "GOOG", "MSFT"]]
+    assert 1 < max(peak) <= 3
+    assert [x.element.ticker for x in results] == tickers
+    assert [x.success for x in results] == [True, False, True] * 2
+    assert results[1].error == "rejected"
+    assert results[0].units == round_up_to_place(Decimal(10) / Decimal(150))
+
+    # without skipping, the first failure stops the rest of the plan
+    with pytest.raises(OrderPlanError) as raised:
+        local_provider.purchase_order_plan(plan)
+    assert [x.success for x in raised.value.results] == [True, False]
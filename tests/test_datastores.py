@@ -92,3 +92,71 @@ order by symbol.ticker asc;"""
         # Cleanup: remove file if it still exists
         if os.path.exists(db_path):
             os.remove(db_path)
+
+
+def test_sync_dividends_uses_watermark(tmp_path):
+    import json
+    from datetime import date
+    from py_portfolio_index.datastores.sync import sync_dividends
+    from py_portfolio_index.enums import ObjectKey, ProviderType
+    from py_portfolio_index.portfolio_providers.alpaca_v2 import AlpacaProvider
+
+    def dividend(day: int) -> dict:
+        return {
+            "id": f"2024010{day}::{day}",
+            "date": f"2024-01-0{day}",
+            "symbol": "AAPL",
+            "status": "executed",
+            "net_amount": "1.5",
+        }
+
+    # the activities API lists the most recently posted first
+    posted = [dividend(day) for day in (5, 4, 3, 2, 1)]
+
+    class Response:
+        def __init__(self, rows):
+            self.status_code = 200
+            self.text = json.dumps(rows)
+
+    class ActivitiesSession:
+        def __init__(self):
+            self.calls = []
+
+        def get(self, url, params, **kwargs):
+            self.calls.append(dict(params))
+            rows = [
+                row
+                for row in posted
+                if "after" not in params or row["date"] > params["after"]
+            ]
+            if "page_token" in params:
+                ids = [row["id"] for row in rows]
+                rows = rows[ids.index(params["page_token"]) + 1 :]
+            return Response(rows[:2])
+
+        def close(self):
+            pass
+
+    provider = AlpacaProvider(key_id="key", secret_key="secret")
+    session = ActivitiesSession()
+    provider._http_session = session
+    db = DuckDBDatastore(str(tmp_path / "dividends.db"))
+    db.reset()
+
+    first = sync_dividends(provider, db)
+    assert len(first) == 5 and "after" not in session.calls[0]
+    assert db.get_watermarks(ObjectKey.DIVIDENDS, ProviderType.ALPACA)[1] == date(
+        2024, 1, 5
+    )
+
+    # a daily sync reads one page and stops at what is stored
+    posted.insert(0, dividend(6))
+    session.calls.clear()
+    second = sync_dividends(provider, db)
+    assert [item.external_id for item in second] == ["20240106::6"]
+    assert session.calls == [
+        {"page_size": "100", "direction": "desc", "after": "2024-01-04"}
+    ]
+    assert len(db.get_dividend_external_ids(ProviderType.ALPACA)) == 6
+    assert sync_dividends(provider, db) == []
+    db.close()
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from py_portfolio_index.models import Money
 from py_portfolio_index.enums import Currency
 
@@ -8,3 +10,28 @@ def test_parsing():
     c = Money(value=1.0, currency=Currency.USD)
     d = Money(value=a)
     assert a == b == c == d
+
+
+def test_arithmetic_preserves_type():
+    a = Money(value=10)
+    total = sum([a, Money(value="2.5"), Money(value=Decimal("0.5"))])
+    assert isinstance(total, Money)
+    assert total == Money(value=13)
+    assert (a - 4) * 2 == 12
+    assert a / 4 == Money(value=Decimal("2.5"))
+    assert abs(Money(value=-3)).value == Decimal(3)
+    assert round(Money(value=Decimal("1.236")), 2).value == Decimal("1.24")
+
+
+def test_pydantic_round_trip():
+    from py_portfolio_index.models import RealPortfolioElement
+
+    element = RealPortfolioElement(
+        ticker="AAPL", units=1.0, value=Money(value=Decimal("100.25"))
+    )
+    dumped = element.model_dump(mode="json")
+    assert dumped["value"] == {"value": "100.25", "currency": "$"}
+    loaded = RealPortfolioElement.model_validate_json(element.model_dump_json())
+    assert loaded.value == Money(value=Decimal("100.25"))
+    assert loaded.value.currency == Currency.USD
+    assert RealPortfolioElement(ticker="AAPL", units=1.0, value=5).value == 5
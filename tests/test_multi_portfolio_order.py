@@ -84,3 +84,32 @@ def test_composite():
             provider=ProviderType.LOCAL_DICT,
         ),
     ]
+
+
+def test_composite_from_providers():
+    provider1 = LocalDictProvider(
+        holdings=[
+            RealPortfolioElement(ticker="AAPL", units=1.0, value=Money(value=100)),
+        ],
+        cash=Money(value=800),
+    )
+    provider2 = LocalDictNoPartialProvider(
+        holdings=[
+            RealPortfolioElement(ticker="MSFT", units=1.0, value=Money(value=50)),
+        ],
+        cash=Money(value=200),
+    )
+    provider2.get_unsettled_instruments = lambda: {"MSFT"}
+
+    composite = CompositePortfolio.from_providers([provider1, provider2])
+
+    assert composite.cash == Money(value=1000)
+    assert composite.value == Money(value=150)
+    assert composite.unsettled_instruments == {
+        ProviderType.LOCAL_DICT: set(),
+        ProviderType.LOCAL_DICT_NO_PARTIAL: {"MSFT"},
+    }
+    assert set(composite.timings[ProviderType.LOCAL_DICT]) == {
+        "holdings",
+        "unsettled",
+    }
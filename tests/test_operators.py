@@ -1,6 +1,12 @@
+import asyncio
+import pytest
+from decimal import Decimal
 from py_portfolio_index.operators import (
     generate_order_plan,
+    generate_order_plan_vectorized,
     generate_composite_order_plan,
+    generate_composite_order_plan_async,
+    purchase_composite_order_plan_async,
     generate_auto_target_size,
 )
 from py_portfolio_index.models import (
@@ -10,10 +16,16 @@ from py_portfolio_index.models import (
     IdealPortfolio,
     IdealPortfolioElement,
     CompositePortfolio,
+    OrderElement,
+    OrderPlan,
+)
+from py_portfolio_index.enums import PurchaseStrategy, OrderType, ProviderType
+from py_portfolio_index.portfolio_providers.local_dict import (
+    LocalDictProvider,
+    LocalDictNoPartialProvider,
 )
-from py_portfolio_index.enums import PurchaseStrategy
-from py_portfolio_index.portfolio_providers.local_dict import LocalDictProvider
 from py_portfolio_index.portfolio_providers.common import PriceCache
+from py_portfolio_index.exceptions import PriceFetchError
 
 
 def test_generate_order_plan():
@@ -89,3 +101,278 @@ def test_generate_composite__order_plan():
     for provider, order_plan in order_plan.items():
         for x in order_plan.to_buy:
             assert x.value == expected[x.ticker]
+
+
+def _parity_fixture(size: int = 300):
+    from random import Random
+
+    rng = Random(42)
+    tickers = [f"T{idx:04d}" for idx in range(size)]
+    ideal = IdealPortfolio(
+        holdings=[
+            IdealPortfolioElement(ticker=ticker, weight=Decimal(rng.random()))
+            for ticker in tickers
+        ]
+    )
+    ideal.normalize()
+    real = RealPortfolio(
+        holdings=[
+            RealPortfolioElement(
+                ticker=ticker,
+                units=1,
+                value=Money(value=Decimal(str(round(rng.uniform(1, 400), 2)))),
+            )
+            for ticker in rng.sample(tickers, size // 2)
+        ]
+    )
+    existing = [
+        OrderElement(
+            ticker=ticker,
+            order_type=OrderType.BUY,
+            value=Money(value=Decimal(25)),
+            qty=None,
+        )
+        for ticker in rng.sample(tickers, size // 10)
+    ]
+    prices = {ticker: Decimal(str(round(rng.uniform(5, 250), 2))) for ticker in tickers}
+    prices[tickers[3]] = None
+    return real, ideal, existing, prices
+
+
+@pytest.mark.parametrize("fractional_shares", [True, False])
+@pytest.mark.parametrize(
+    "buy_order",
+    [
+        PurchaseStrategy.LARGEST_DIFF_FIRST,
+        PurchaseStrategy.CHEAPEST_FIRST,
+        PurchaseStrategy.PEANUT_BUTTER,
+    ],
+)
+@pytest.mark.parametrize("purchase_power", [None, 5000])
+def test_vectorized_order_plan_parity(buy_order, fractional_shares, purchase_power):
+    real, ideal, existing, prices = _parity_fixture()
+
+    def fetcher(tickers):
+        return {ticker: prices[ticker] for ticker in tickers}
+
+    kwargs = dict(
+        buy_order=buy_order,
+        target_size=100_000,
+        purchase_power=purchase_power,
+        fractional_shares=fractional_shares,
+        existing_orders=existing,
+        include_sell_orders=True,
+    )
+    scalar = generate_order_plan(real, ideal, price_fetcher=fetcher, **kwargs)
+    vectorized = generate_order_plan_vectorized(
+        real, ideal, price_fetcher=fetcher, **kwargs
+    )
+
+    assert scalar.to_buy, "fixture should produce buy orders"
+    for expected_plan, actual_plan in (
+        (scalar.to_buy, vectorized.to_buy),
+        (scalar.to_sell, vectorized.to_sell),
+    ):
+        assert [x.ticker for x in actual_plan] == [x.ticker for x in expected_plan]
+        for expected, actual in zip(expected_plan, actual_plan):
+            assert actual.qty == expected.qty
+            assert actual.price == expected.price
+            if expected.value is None:
+                assert actual.value is None
+            else:
+                assert float(actual.value) == pytest.approx(
+                    float(expected.value), rel=1e-9
+                )
+
+
+def test_order_plan_merge_many():
+    def plan(*values):
+        return OrderPlan(
+            to_buy=[
+                OrderElement(
+                    ticker=ticker,
+                    order_type=OrderType.BUY,
+                    value=Money(value=value),
+                    qty=None,
+                    provider=ProviderType.LOCAL_DICT,
+                )
+                for ticker, value in values
+            ],
+            to_sell=[],
+        )
+
+    first = plan(("AAPL", 1), ("MSFT", 2))
+    merged = OrderPlan.merge_many([first, plan(("AAPL", 3)), plan(("GOOG", 4))])
+    assert [item.ticker for item in merged.to_buy] == ["AAPL", "MSFT", "GOOG"]
+    assert merged.to_buy[0].value == Money(value=4)
+    assert merged.to_buy[0].provider == ProviderType.LOCAL_DICT
+    assert first.to_buy[0].value == Money(value=1)
+
+    # in-place addition writes the merged element back
+    first += plan(("MSFT", 5))
+    assert first.to_buy[1].value == Money(value=7)
+
+
+def test_composite_order_plan_shared_quotes():
+    prices = {"AAPL": Decimal(100), "MSFT": Decimal(50)}
+    quotes = LocalDictProvider(
+        holdings=[], price_dict=dict(prices), cash=Money(value=0)
+    )
+    provider = LocalDictProvider(
+        holdings=[
+            RealPortfolioElement(ticker="AAPL", units=1.0, value=Money(value=100)),
+        ],
+        price_dict=dict(prices),
+        cash=Money(value=800),
+    )
+    ideal = IdealPortfolio(
+        holdings=[
+            IdealPortfolioElement(ticker="AAPL", weight=0.5),
+            IdealPortfolioElement(ticker="MSFT", weight=0.5),
+        ]
+    )
+
+    def plan(**kwargs):
+        output = generate_composite_order_plan(
+            CompositePortfolio([provider.get_holdings()]),
+            ideal,
+            target_size=Money(value=1000),
+            purchase_order_maps=PurchaseStrategy.LARGEST_DIFF_FIRST,
+            safety_threshold=1,
+            **kwargs,
+        )
+        return {x.ticker: x.value for x in output[ProviderType.LOCAL_DICT].to_buy}
+
+    expected = plan()
+    calls = []
+    own_prices = provider.get_instrument_prices
+
+    def tracked(tickers, at_day=None):
+        calls.append(tickers)
+        return own_prices(tickers, at_day)
+
+    provider.get_instrument_prices = tracked
+    assert plan(shared_quotes=True, quote_providers=[quotes]) == expected
+    assert not calls, "quotes should come from the shared source"
+
+    # a provider can opt out and keep using its own quotes
+    assert (
+        plan(
+            shared_quotes=True,
+            quote_providers=[quotes],
+            own_quote_providers={ProviderType.LOCAL_DICT},
+        )
+        == expected
+    )
+    assert calls
+
+
+@pytest.mark.parametrize(
+    "planner", [generate_order_plan, generate_order_plan_vectorized]
+)
+def test_order_plan_missing_prices(planner):
+    real_port = RealPortfolio(holdings=[])
+    ideal_port = IdealPortfolio(
+        holdings=[
+            IdealPortfolioElement(ticker="AAPL", weight=0.25),
+            IdealPortfolioElement(ticker="MSFT", weight=0.25),
+            IdealPortfolioElement(ticker="GONE", weight=0.5),
+        ]
+    )
+    calls = []
+
+    def fetcher(tickers, fail_on_missing=True):
+        calls.append(tickers)
+        return {y: (None if y == "GONE" else Decimal(10)) for y in tickers}
+
+    order_plan = planner(
+        real_port,
+        ideal_port,
+        target_size=1000,
+        price_fetcher=fetcher,
+    )
+    assert len(calls) == 1
+    assert {x.ticker: x.value for x in order_plan.to_buy} == {
+        "AAPL": Money(value=500),
+        "MSFT": Money(value=500),
+    }
+
+    with pytest.raises(PriceFetchError):
+        planner(
+            real_port,
+            ideal_port,
+            target_size=1000,
+            price_fetcher=fetcher,
+            skip_invalid=False,
+        )
+
+
+def test_async_composite_order_plan(monkeypatch):
+    from py_portfolio_index.portfolio_providers.async_provider import (
+        ThreadedAsyncProvider,
+    )
+
+    closed = []
+
+    async def aclose(self):
+        closed.append(self.PROVIDER)
+
+    monkeypatch.setattr(ThreadedAsyncProvider, "aclose", aclose)
+    prices = {"AAPL": Decimal(100), "MSFT": Decimal(50), "GOOG": Decimal(25)}
+    providers = [
+        LocalDictProvider(holdings=[], price_dict=dict(prices), cash=Money(value=500)),
+        LocalDictNoPartialProvider(
+            holdings=[], price_dict=dict(prices), cash=Money(value=400)
+        ),
+    ]
+    ideal = IdealPortfolio(
+        holdings=[
+            IdealPortfolioElement(ticker="AAPL", weight=0.5),
+            IdealPortfolioElement(ticker="MSFT", weight=0.3),
+            IdealPortfolioElement(ticker="GOOG", weight=0.2),
+        ]
+    )
+    kwargs = dict(
+        target_size=Money(value=900),
+        purchase_order_maps=PurchaseStrategy.LARGEST_DIFF_FIRST,
+        safety_threshold=1,
+    )
+
+    def summary(output):
+        return {
+            provider: {x.ticker: (x.qty, x.value) for x in plan.to_buy}
+            for provider, plan in output.items()
+        }
+
+    composite = CompositePortfolio([x.get_holdings() for x in providers])
+    expected = generate_composite_order_plan(composite, ideal, **kwargs)
+    output = asyncio.run(
+        generate_composite_order_plan_async(composite, ideal, **kwargs)
+    )
+    assert summary(output) == summary(expected)
+    # the wrappers the operator opened are closed again
+    assert sorted(closed) == sorted(x.PROVIDER for x in providers)
+
+    closed.clear()
+    asyncio.run(purchase_composite_order_plan_async(output, providers))
+    assert sorted(closed) == sorted(x.PROVIDER for x in providers)
+    for provider in providers:
+        bought = {x.ticker for x in output[provider.PROVIDER].to_buy}
+        held = {x.ticker for x in provider.get_holdings().holdings if x.units}
+        assert bought and bought <= held
+
+
+def test_prefetch_prices_keeps_batch_with_missing_ticker():
+    from py_portfolio_index.operators import prefetch_prices
+
+    class Quotes:
+        def get_instrument_prices(self, tickers, at_day=None, fail_on_missing=True):
+            if fail_on_missing and "DEAD" in tickers:
+                raise PriceFetchError(tickers, "no price for DEAD")
+            return {t: None if t == "DEAD" else Decimal(1) for t in tickers}
+
+    assert prefetch_prices(Quotes(), ["AAPL", "DEAD", "MSFT"]) == {
+        "AAPL": Decimal(1),
+        "DEAD": None,
+        "MSFT": Decimal(1),
+    }
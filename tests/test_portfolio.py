@@ -1,4 +1,8 @@
+import pytest
+from decimal import Decimal
 from py_portfolio_index.models import (
+    IdealPortfolio,
+    IdealPortfolioElement,
     RealPortfolio,
     RealPortfolioElement,
     CompositePortfolio,
@@ -39,3 +43,153 @@ def test_composite():
     composite = CompositePortfolio([base1, base2])
 
     assert composite.cash == Money(value=2)
+
+
+def test_ideal_portfolio_columns():
+    ideal = IdealPortfolio(
+        holdings=[
+            IdealPortfolioElement(ticker="AAPL", weight=Decimal("0.2")),
+            IdealPortfolioElement(ticker="MSFT", weight=Decimal("0.5")),
+            IdealPortfolioElement(ticker="XOM", weight=Decimal("0.3")),
+        ]
+    )
+    assert [x.ticker for x in ideal.holdings] == ["MSFT", "XOM", "AAPL"]
+    assert ideal.contains("XOM")
+
+    ideal.exclude(["XOM", "NOT_HELD"])
+    assert not ideal.contains("XOM")
+    assert ideal.get_weight("MSFT") == pytest.approx(Decimal(0.5 / 0.7))
+
+    ideal.reweight(["AAPL", "NVDA"], weight=2.0, min_weight=0.1)
+    weights = {x.ticker: x.weight for x in ideal.holdings}
+    assert set(weights) == {"AAPL", "MSFT", "NVDA"}
+    assert sum(weights.values()) == pytest.approx(Decimal(1))
+    assert weights["AAPL"] / weights["MSFT"] == pytest.approx(Decimal(0.8))
+
+    with pytest.raises(ValueError):
+        ideal.add_stock("AAPL", Decimal("0.1"))
+
+
+def test_ideal_portfolio_serialization():
+    ideal = IdealPortfolio(
+        holdings=[
+            IdealPortfolioElement(ticker="AAPL", weight=Decimal("0.25")),
+            IdealPortfolioElement(ticker="MSFT", weight=Decimal("0.75")),
+        ]
+    )
+    loaded = IdealPortfolio.model_validate_json(ideal.model_dump_json())
+    assert loaded.holdings == ideal.holdings
+    assert loaded.source_date == ideal.source_date
+
+
+def test_ideal_portfolio_pipeline_matches_chained_calls():
+    def build():
+        return IdealPortfolio(
+            holdings=[
+                IdealPortfolioElement(ticker=ticker, weight=Decimal(weight))
+                for ticker, weight in [
+                    ("AAPL", "0.3"),
+                    ("MSFT", "0.25"),
+                    ("XOM", "0.2"),
+                    ("CVX", "0.15"),
+                    ("NVDA", "0.1"),
+                ]
+            ]
+        )
+
+    chained = build()
+    chained.exclude(["XOM"]).exclude(["CVX", "BP"])
+    chained.reweight(["NVDA", "ENPH"], weight=2.0, min_weight=0.01)
+    chained.reweight(["NVDA", "XOM"], weight=1.5, min_weight=0.02)
+    chained.exclude(["ENPH"])
+
+    piped = (
+        build()
+        .pipeline()
+        .exclude(["XOM"])
+        .exclude(["CVX", "BP"])
+        .reweight(["NVDA", "ENPH"], weight=2.0, min_weight=0.01)
+        .reweight(["NVDA", "XOM"], weight=1.5, min_weight=0.02)
+        .exclude(["ENPH"])
+        .collect()
+    )
+
+    expected = {x.ticker: x.weight for x in chained.holdings}
+    actual = {x.ticker: x.weight for x in piped.holdings}
+    assert set(actual) == set(expected) == {"AAPL", "MSFT", "NVDA", "XOM"}
+    for ticker, weight in expected.items():
+        assert actual[ticker] == pytest.approx(weight)
+
+
+def test_real_portfolio_cached_index():
+    base = RealPortfolio(
+        holdings=[
+            RealPortfolioElement(ticker="AAPL", units=1, value=Money(value=1)),
+            RealPortfolioElement(ticker="MSFT", units=1, value=Money(value=2)),
+        ],
+        cash=Money(value=10),
+    )
+    assert base.value == 13
+    base.add_holding(RealPortfolioElement(ticker="AAPL", units=1, value=Money(value=3)))
+    base.add_holding(RealPortfolioElement(ticker="GOOG", units=1, value=Money(value=4)))
+    assert base.get_holding("AAPL").value == 4
+    assert base.get_holding("GOOG").units == 1
+    assert base.value == 20
+
+    # swapping the list out is picked up without an explicit invalidation
+    base.holdings = [RealPortfolioElement(ticker="TSLA", units=1, value=Money(value=5))]
+    assert base.get_holding("AAPL") is None
+    assert base.value == 15
+
+    # in-place edits to an element need invalidate_cache
+    base.holdings[0].value = Money(value=6)
+    base.invalidate_cache()
+    assert base.value == 16
+
+
+def test_real_portfolio_duplicate_tickers():
+    base = RealPortfolio(
+        holdings=[
+            RealPortfolioElement(ticker="AAPL", units=1, value=Money(value=50)),
+            RealPortfolioElement(ticker="AAPL", units=2, value=Money(value=100)),
+        ],
+    )
+    assert base.holdings_value == 150
+    base.add_holding(RealPortfolioElement(ticker="AAPL", units=1, value=Money(value=5)))
+    assert base.value == 155
+    base.invalidate_cache()
+    assert base.value == 155
+
+
+def test_composite_incremental_update():
+    base1 = RealPortfolio(
+        holdings=[
+            RealPortfolioElement(ticker="AAPL", units=1, value=Money(value=1)),
+            RealPortfolioElement(ticker="MSFT", units=1, value=Money(value=1)),
+        ],
+        cash=Money(value=1),
+    )
+    base2 = RealPortfolio(
+        holdings=[
+            RealPortfolioElement(ticker="AAPL", units=2, value=Money(value=2)),
+            RealPortfolioElement(ticker="GOOG", units=1, value=Money(value=3)),
+        ],
+        cash=Money(value=1),
+    )
+    composite = CompositePortfolio([base1, base2])
+    assert composite.get_holding("AAPL").value == 3
+
+    base2.holdings = [
+        RealPortfolioElement(ticker="AAPL", units=1, value=Money(value=5)),
+        RealPortfolioElement(ticker="TSLA", units=1, value=Money(value=4)),
+    ]
+    composite.update_portfolio(base2)
+
+    fresh = CompositePortfolio([base1, base2])
+    assert composite.get_holding("GOOG") is None
+    assert composite.value == fresh.value == 11
+    assert {item.ticker for item in composite.holdings} == {"AAPL", "MSFT", "TSLA"}
+    for item in fresh.holdings:
+        updated = composite.get_holding(item.ticker)
+        assert updated.units == item.units
+        assert updated.weight == item.weight
@@ -1,3 +1,5 @@
+import pytest
+from decimal import Decimal
 from py_portfolio_index.portfolio_providers.common import PriceCache
 from random import randint
 
@@ -18,3 +20,876 @@ def test_price_cache():
     )
 
     assert cache.get_price("AAPL") == cache.get_prices(["AAPL"])["AAPL"]
+
+
+def test_price_cache_fetcher_without_fail_on_missing():
+    import asyncio
+
+    async def fetch_async(tickers, date):
+        return {y: 2 for y in tickers}
+
+    cache = PriceCache(fetcher=lambda tickers, date: {y: 1 for y in tickers})
+    assert cache.get_prices(["AAPL"], fail_on_missing=False) == {"AAPL": 1}
+    assert cache.get_price("MSFT") == 1
+    prices = asyncio.run(cache.get_prices_async(["GOOG"], fetch_async))
+    assert prices == {"GOOG": 2}
+
+
+def test_price_cache_bounds_and_expiry(monkeypatch):
+    from datetime import date
+    from py_portfolio_index.portfolio_providers import common
+
+    fetched = []
+
+    def fetcher(tickers, date, fail_on_missing=True):
+        fetched.extend(tickers)
+        return {y: 1 for y in tickers}
+
+    cache = PriceCache(fetcher=fetcher, timeout=60, max_entries=2, max_labels=2)
+    cache.get_prices(["A", "B", "C"])
+    assert list(cache.store["INSTANT"]) == ["B", "C"]
+    assert cache.evictions == 1
+
+    cache.get_prices(["A"], date(2024, 1, 1))
+    cache.get_prices(["A"], date(2024, 1, 2))
+    assert list(cache.store) == ["2024-01-01", "2024-01-02"]
+    assert cache.evictions == 3
+
+    fetched.clear()
+    cache.get_prices(["A"], date(2024, 1, 2))
+    assert not fetched and cache.hits == 1
+
+    clock = [1000.0]
+    monkeypatch.setattr(common.time, "monotonic", lambda: clock[0])
+    cache.get_prices(["X"])
+    clock[0] += 30
+    cache.get_prices(["X"])
+    assert fetched == ["X"]
+    clock[0] += 60
+    cache.get_prices(["X"])
+    assert fetched == ["X", "X"]
+    assert cache.stats["misses"] == cache.misses
+
+
+def test_price_cache_lookup_scales_with_request():
+    from time import perf_counter
+
+    cached = [f"T{idx}" for idx in range(10_000)]
+    cache = PriceCache(
+        fetcher=lambda tickers, date, fail_on_missing=True: {y: 1 for y in tickers},
+    )
+    cache.get_prices(cached)
+    requested = cached[::2]
+
+    start = perf_counter()
+    for _ in range(10):
+        prices = cache.get_prices(requested)
+    elapsed = (perf_counter() - start) / 10
+    assert len(prices) == 5_000
+    assert cache.hits == 50_000
+    # a scan of the whole cache per requested ticker takes seconds here
+    assert elapsed < 0.05, f"5k lookups against 10k cached took {elapsed:.3f}s"
+
+
+def test_price_cache_historical_store(tmp_path):
+    from datetime import date
+    from decimal import Decimal
+    from py_portfolio_index.portfolio_providers.price_store import (
+        HistoricalPriceStore,
+    )
+
+    fetched = []
+
+    def fetcher(tickers, date, fail_on_missing=True):
+        fetched.extend(tickers)
+        return {y: Decimal("12.34") for y in tickers}
+
+    path = tmp_path / "prices.sqlite"
+    day = date(2024, 1, 2)
+    first = PriceCache(fetcher=fetcher, historical_store=HistoricalPriceStore(path))
+    first.get_prices(["AAPL", "MSFT"], day)
+    first.get_prices(["AAPL"], date.today())
+
+    # a new process only fetches what the store has not seen
+    fetched.clear()
+    second = PriceCache(fetcher=fetcher, historical_store=HistoricalPriceStore(path))
+    prices = second.get_prices(["AAPL", "MSFT", "GOOG"], day)
+    assert prices["AAPL"] == Decimal("12.34")
+    assert fetched == ["GOOG"]
+    assert second.store_hits == 2
+    second.get_prices(["AAPL"], date.today())
+    assert fetched == ["GOOG", "AAPL"]
+
+
+def test_price_cache_coalesces_concurrent_fetches():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    fetched = []
+    barrier = threading.Barrier(8)
+
+    def fetcher(tickers, date, fail_on_missing=True):
+        fetched.extend(tickers)
+        time.sleep(0.2)
+        return {y: 1 for y in tickers}
+
+    cache = PriceCache(fetcher=fetcher)
+
+    def lookup(_):
+        barrier.wait()
+        return cache.get_prices(["AAPL", "MSFT"])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lookup, range(8)))
+    assert all(result == {"AAPL": 1, "MSFT": 1} for result in results)
+    assert sorted(fetched) == ["AAPL", "MSFT"]
+    assert cache.coalesced + cache.misses == 16
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class _FakeSchwabClient:
+    def __init__(self):
+        self.price = 100
+
+    def get_quotes(self, symbols):
+        return _FakeResponse({y: {"quote": {"lastPrice": self.price}} for y in symbols})
+
+
+def _fake_schwab_provider():
+    from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+    from py_portfolio_index.portfolio_providers.schwab import SchwabProvider
+
+    provider = SchwabProvider.__new__(SchwabProvider)
+    BaseProvider.__init__(provider)
+    provider._provider = _FakeSchwabClient()
+    return provider
+
+
+def test_schwab_provider_is_collectable():
+    import gc
+    import weakref
+
+    provider = _fake_schwab_provider()
+    assert provider.get_instrument_price("AAPL") == 100
+    ref = weakref.ref(provider)
+    provider.shutdown()
+    del provider
+    gc.collect()
+    assert ref() is None
+
+
+def test_schwab_instant_quotes_refresh(monkeypatch):
+    from py_portfolio_index.portfolio_providers import common
+
+    clock = [1000.0]
+    monkeypatch.setattr(common.time, "monotonic", lambda: clock[0])
+    provider = _fake_schwab_provider()
+    assert provider.get_instrument_price("AAPL") == 100
+    provider._provider.price = 101
+    assert provider.get_instrument_price("AAPL") == 100
+    clock[0] += provider._price_cache.default_timeout + 1
+    assert provider.get_instrument_price("AAPL") == 101
+
+
+def test_schwab_quotes_throttle_per_request(monkeypatch):
+    from py_portfolio_index.enums import EndpointClass
+    from py_portfolio_index.portfolio_providers.common import RateLimit, RateLimiter
+
+    _frozen_clock(monkeypatch)
+    provider = _fake_schwab_provider()
+    provider.rate_limiter = RateLimiter()
+    provider.raise_on_rate_limit = True
+    monkeypatch.setitem(
+        provider.RATE_LIMITS,
+        EndpointClass.QUOTES,
+        RateLimit(requests=1, per_seconds=60, burst=2),
+    )
+    prices = provider.get_instrument_prices([f"T{i}" for i in range(150)])
+    assert len(prices) == 150
+    # two batches of quotes, one token each
+    namespace = provider.PROVIDER.value
+    assert provider.rate_limiter.stats[f"{namespace}:quotes"]["acquired"] == 2
+
+
+def test_async_schwab_prices_share_cache():
+    import asyncio
+    from py_portfolio_index.portfolio_providers.schwab import AsyncSchwabProvider
+
+    class FakeAsyncClient:
+        def __init__(self):
+            self.calls = []
+
+        async def get_quotes(self, symbols):
+            self.calls.append(list(symbols))
+            await asyncio.sleep(0.01)
+            return _FakeResponse({y: {"quote": {"lastPrice": 42}} for y in symbols})
+
+    provider = _fake_schwab_provider()
+    client = FakeAsyncClient()
+    async_provider = AsyncSchwabProvider(provider, client=client)
+
+    async def run():
+        return await asyncio.gather(
+            async_provider.get_instrument_prices(["AAPL", "MSFT"]),
+            async_provider.get_instrument_prices(["AAPL"]),
+        )
+
+    first, second = asyncio.run(run())
+    assert first == {"AAPL": 42, "MSFT": 42} and second == {"AAPL": 42}
+    # the concurrent request waited on the first rather than refetching
+    assert client.calls == [["AAPL", "MSFT"]]
+    # and the sync provider sees the same cached quotes
+    assert provider.get_instrument_price("MSFT") == 42
+    assert client.calls == [["AAPL", "MSFT"]]
+
+
+def test_async_schwab_unsettled_retries():
+    import asyncio
+    import httpx
+    from types import SimpleNamespace
+    from py_portfolio_index.portfolio_providers.common import RetryPolicy
+    from py_portfolio_index.portfolio_providers.schwab import AsyncSchwabProvider
+
+    request = httpx.Request("GET", "https://api.schwabapi.com/orders")
+    statuses = SimpleNamespace(
+        PENDING_ACTIVATION="PENDING_ACTIVATION", QUEUED="QUEUED", WORKING="WORKING"
+    )
+
+    class FakeAsyncClient:
+        Order = SimpleNamespace(Status=statuses)
+
+        def __init__(self):
+            self.calls = []
+
+        async def get_orders_for_account(self, account_hash, status):
+            self.calls.append(status)
+            if status == "WORKING" and self.calls.count(status) == 1:
+                return httpx.Response(503, request=request)
+            orders = [{"instrument": {"symbol": "AAPL"}}] if status == "WORKING" else []
+            return httpx.Response(200, json=orders, request=request)
+
+    provider = _fake_schwab_provider()
+    provider._account_hash = "hash"
+    provider.RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+    client = FakeAsyncClient()
+    async_provider = AsyncSchwabProvider(provider, client=client)
+
+    assert asyncio.run(async_provider.get_unsettled_instruments()) == {"AAPL"}
+    assert client.calls.count("WORKING") == 2
+
+
+def test_async_alpaca_provider():
+    import asyncio
+    import json
+    import httpx
+    from decimal import Decimal
+    from py_portfolio_index.models import Money
+    from py_portfolio_index.portfolio_providers.alpaca_v2 import (
+        AlpacaProvider,
+        AsyncAlpacaProvider,
+    )
+
+    position = {
+        "asset_id": "904837e3-3b76-47ec-b432-046db621571b",
+        "symbol": "AAPL",
+        "exchange": "NASDAQ",
+        "asset_class": "us_equity",
+        "avg_entry_price": "100",
+        "qty": "2",
+        "side": "long",
+        "market_value": "300",
+        "cost_basis": "200",
+        "unrealized_pl": "100",
+        "unrealized_plpc": "0.5",
+        "unrealized_intraday_pl": "0",
+        "unrealized_intraday_plpc": "0",
+        "current_price": "150",
+        "lastday_price": "150",
+        "change_today": "0",
+    }
+    account = {
+        "id": "904837e3-3b76-47ec-b432-046db621571b",
+        "account_number": "1",
+        "status": "ACTIVE",
+        "cash": "1000",
+    }
+    dividends = [{"id": "1", "symbol": "AAPL", "status": "executed", "net_amount": "5"}]
+    submitted = []
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        requested.append(path)
+        if path == "/v2/stocks/bars":
+            return httpx.Response(
+                200,
+                json={
+                    "bars": {"AAPL": [{"c": 140}, {"c": 150}]},
+                    "next_page_token": None,
+                },
+            )
+        if path == "/v2/positions":
+            return httpx.Response(200, json=[position])
+        if path == "/v2/account":
+            return httpx.Response(200, json=account)
+        if path == "/v2/orders" and request.method == "GET":
+            return httpx.Response(200, json=[])
+        if path == "/v2/orders":
+            submitted.append(json.loads(request.content))
+            return httpx.Response(200, json={})
+        if path == "/v2/account/activities/DIV":
+            page = [] if "page_token" in request.url.params else dividends
+            return httpx.Response(200, json=page)
+        return httpx.Response(404)
+
+    provider = AlpacaProvider(key_id="key", secret_key="secret")
+    async_provider = AsyncAlpacaProvider(
+        provider, client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+    async def run():
+        prices = await async_provider.get_instrument_prices(["AAPL", "MSFT"])
+        holdings = await async_provider.get_holdings()
+        # account objects are served from the provider's cache
+        assert await async_provider.get_holdings() == holdings
+        assert await async_provider.get_unsettled_instruments() == set()
+        assert requested.count("/v2/positions") == 1
+        assert requested.count("/v2/account/activities/DIV") == 2
+        await async_provider.buy_instrument("AAPL", Decimal(1))
+        await async_provider.aclose()
+        return prices, holdings
+
+    prices, holdings = asyncio.run(run())
+    assert prices == {"AAPL": Decimal(150), "MSFT": None}
+    assert holdings.cash == Money(value=1000)
+    aapl = holdings.get_holding("AAPL")
+    assert aapl.units == 2 and aapl.dividends == Money(value=5)
+    assert submitted == [
+        {
+            "symbol": "AAPL",
+            "side": "buy",
+            "type": "market",
+            "time_in_force": "day",
+            "qty": "1",
+        }
+    ]
+
+
+def _frozen_clock(monkeypatch, start=1000.0):
+    from py_portfolio_index.portfolio_providers import common
+
+    clock = [start]
+    monkeypatch.setattr(common.time, "monotonic", lambda: clock[0])
+    return clock
+
+
+def test_token_bucket_refill(monkeypatch):
+    from py_portfolio_index.portfolio_providers.common import RateLimit, TokenBucket
+
+    clock = _frozen_clock(monkeypatch)
+    bucket = TokenBucket(RateLimit(requests=2, per_seconds=1, burst=2))
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    # the next caller is queued behind the refill
+    assert bucket.reserve() == 0.5
+    assert bucket.try_reserve() == 1.0
+    clock[0] += 1.0
+    assert bucket.try_reserve() == 0
+    # never refills past the burst
+    clock[0] += 100
+    assert bucket.wait_time(2) == 0 and bucket.wait_time(3) == 0.5
+
+    bucket.penalize(5)
+    assert bucket.wait_time() == 5.5
+
+
+def test_rate_limiter_blocking_and_isolation(monkeypatch):
+    from py_portfolio_index.enums import EndpointClass
+    from py_portfolio_index.exceptions import OrderError, RateLimitError
+    from py_portfolio_index.portfolio_providers import common
+
+    _frozen_clock(monkeypatch)
+    slept = []
+    monkeypatch.setattr(common.time, "sleep", slept.append)
+    limiter = common.RateLimiter()
+    limit = common.RateLimit(requests=1, per_seconds=2)
+
+    assert limiter.acquire("a", EndpointClass.ORDERS, limit) == 0
+    with pytest.raises(RateLimitError) as raised:
+        limiter.acquire("a", EndpointClass.ORDERS, limit, block=False)
+    assert isinstance(raised.value, OrderError)
+    assert raised.value.wait_time == 2
+    # a refused call takes nothing, so a blocking caller waits the same
+    assert limiter.acquire("a", EndpointClass.ORDERS, limit) == 2
+    assert slept == [2]
+
+    # other providers and endpoint classes have their own buckets
+    assert limiter.acquire("b", EndpointClass.ORDERS, limit, block=False) == 0
+    assert limiter.acquire("a", EndpointClass.QUOTES, limit, block=False) == 0
+    assert limiter.stats["a:orders"]["acquired"] == 2
+
+    # a conflicting limit can't reset a bucket's spent tokens
+    looser = common.RateLimit(requests=100, per_seconds=1, burst=100)
+    assert limiter.bucket("a", EndpointClass.ORDERS, looser).limit == limit
+    with pytest.raises(RateLimitError):
+        limiter.acquire("a", EndpointClass.ORDERS, looser, block=False)
+
+
+def test_rate_limiter_try_reserve_is_atomic(monkeypatch):
+    import threading
+    from py_portfolio_index.portfolio_providers.common import RateLimit, TokenBucket
+
+    _frozen_clock(monkeypatch)
+    bucket = TokenBucket(RateLimit(requests=5, per_seconds=60, burst=5))
+    barrier = threading.Barrier(20)
+    taken = []
+
+    def worker():
+        barrier.wait()
+        if bucket.try_reserve() == 0:
+            taken.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(taken) == 5
+
+
+def test_moomoo_rate_limit_raises_order_error(monkeypatch):
+    import sys
+    from datetime import datetime
+    from decimal import Decimal
+    from types import SimpleNamespace
+    from py_portfolio_index.enums import OrderType
+    from py_portfolio_index.exceptions import OrderError
+    from py_portfolio_index.models import OrderElement, OrderPlan
+    from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+    from py_portfolio_index.portfolio_providers.common import RateLimiter
+    from py_portfolio_index.portfolio_providers.local_dict import LocalDictProvider
+    from py_portfolio_index.portfolio_providers.moomoo import MooMooProvider
+
+    _frozen_clock(monkeypatch)
+    provider = MooMooProvider.__new__(MooMooProvider)
+    BaseProvider.__init__(
+        provider,
+        quote_provider=LocalDictProvider(
+            holdings=[], price_dict={t: Decimal(10) for t in ("AAPL", "MSFT", "GOOG")}
+        ),
+    )
+    provider.rate_limiter = RateLimiter()
+    provider.raise_on_rate_limit = True
+    monkeypatch.setitem(
+        sys.modules,
+        "moomoo",
+        SimpleNamespace(
+            RET_OK=0,
+            TrdSide=SimpleNamespace(BUY="BUY"),
+            OrderType=SimpleNamespace(MARKET="MARKET"),
+        ),
+    )
+    bought = []
+
+    class FakeTradeContext:
+        def place_order(self, code, **kwargs):
+            bought.append(code.removeprefix("US."))
+            return 0, None
+
+    provider._trade_provider = FakeTradeContext()
+    provider.last_unlocked = datetime.now()
+    provider.get_unsettled_instruments = lambda: set()
+
+    def element(ticker):
+        return OrderElement(ticker=ticker, order_type=OrderType.BUY, value=None, qty=1)
+
+    # the pipeline and the submit share one token per order
+    provider.handle_order_element(element("AAPL"))
+    # calling the provider directly is limited as well
+    with pytest.raises(OrderError):
+        provider.buy_instrument("MSFT", Decimal(1))
+
+    # the order pipeline records it as a failed order
+    results = provider.purchase_order_plan(
+        OrderPlan(to_buy=[element("GOOG")], to_sell=[]), skip_errored_stocks=True
+    )
+    assert not results[0].success and "rate limit" in results[0].error
+    assert bought == ["AAPL"]
+
+
+def test_legacy_alpaca_prices_use_instance_cache(monkeypatch):
+    import gc
+    import sys
+    import weakref
+    from types import SimpleNamespace
+    from py_portfolio_index.portfolio_providers import common
+    from py_portfolio_index.portfolio_providers.alpaca import AlpacaProviderLegacy
+    from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+
+    clock = [1000.0]
+    monkeypatch.setattr(common.time, "monotonic", lambda: clock[0])
+    rest = SimpleNamespace(TimeFrame=None, TimeFrameUnit=None)
+    monkeypatch.setitem(sys.modules, "alpaca_trade_api", SimpleNamespace(rest=rest))
+    monkeypatch.setitem(sys.modules, "alpaca_trade_api.rest", rest)
+
+    class FakeApi:
+        price = 100
+
+        def get_latest_quote(self, ticker):
+            return SimpleNamespace(ap=self.price)
+
+    provider = AlpacaProviderLegacy.__new__(AlpacaProviderLegacy)
+    BaseProvider.__init__(provider)
+    provider.api = FakeApi()
+    assert provider.get_instrument_price("AAPL") == 100
+    provider.api.price = 101
+    assert provider.get_instrument_price("AAPL") == 100
+    clock[0] += provider._price_cache.default_timeout + 1
+    assert provider.get_instrument_price("AAPL") == 101
+
+    ref = weakref.ref(provider)
+    provider.shutdown()
+    del provider
+    gc.collect()
+    assert ref() is None
+
+
+def test_moomoo_prices_use_instance_cache(monkeypatch):
+    import gc
+    import sys
+    import weakref
+    from decimal import Decimal
+    from types import SimpleNamespace
+    from py_portfolio_index.portfolio_providers import common
+    from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+    from py_portfolio_index.portfolio_providers.moomoo import MooMooProvider
+
+    clock = [1000.0]
+    monkeypatch.setattr(common.time, "monotonic", lambda: clock[0])
+    monkeypatch.setitem(
+        sys.modules,
+        "moomoo",
+        SimpleNamespace(RET_OK=0, SubType=SimpleNamespace(TICKER="TICKER")),
+    )
+
+    class FakeQuoteContext:
+        price = 100
+
+        def subscribe(self, *args, **kwargs):
+            return 0, None
+
+        def get_stock_quote(self, tickers):
+            return 0, SimpleNamespace(itertuples=lambda: [Decimal(self.price)])
+
+    provider = MooMooProvider.__new__(MooMooProvider)
+    BaseProvider.__init__(provider)
+    provider._quote_context = FakeQuoteContext()
+    assert provider.get_instrument_price("AAPL") == 100
+    provider._quote_context.price = 101
+    assert provider.get_instrument_price("AAPL") == 100
+    clock[0] += provider._price_cache.default_timeout + 1
+    assert provider.get_instrument_price("AAPL") == 101
+
+    ref = weakref.ref(provider)
+    del provider
+    gc.collect()
+    assert ref() is None
+
+
+class _Status:
+    def __init__(self, status_code, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("no body")
+        return self.body
+
+    @property
+    def text(self):
+        import json
+
+        return json.dumps(self.body)
+
+
+def test_retry_policy_full_jitter(monkeypatch):
+    from py_portfolio_index.portfolio_providers import common
+    from py_portfolio_index.portfolio_providers.common import RetryPolicy
+
+    # the upper bound of the jitter window
+    monkeypatch.setattr(common.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(base_delay=1, max_delay=10)
+    assert [policy.backoff(n) for n in range(6)] == [1, 2, 4, 8, 10, 10]
+    monkeypatch.setattr(common.random, "uniform", lambda low, high: low)
+    assert policy.backoff(3) == 0
+
+
+def test_retry_after_hints():
+    from email.utils import formatdate
+    import time
+    from py_portfolio_index.portfolio_providers.common import retry_after
+
+    assert retry_after(_Status(429, {"Retry-After": "7"})) == 7
+    dated = retry_after(_Status(429, {"Retry-After": formatdate(time.time() + 60)}))
+    assert 55 <= dated <= 60
+    throttled = {"detail": "Request was throttled. Expected available in 12 seconds."}
+    assert retry_after(_Status(429, body=throttled)) == 12
+    assert retry_after(_Status(503)) is None
+
+
+def test_retrier_is_idempotency_aware(monkeypatch):
+    from py_portfolio_index.portfolio_providers import common
+    from py_portfolio_index.portfolio_providers.common import Retrier, RetryPolicy
+
+    monkeypatch.setattr(common.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=10)
+    retrier = Retrier()
+    waits = []
+
+    def replay(*outcomes):
+        remaining = list(outcomes)
+
+        def call():
+            outcome = remaining.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        return call
+
+    def run(name, call, idempotent):
+        return retrier.call(
+            name,
+            call,
+            policy,
+            idempotent=idempotent,
+            wait=lambda seconds, throttled: waits.append((seconds, throttled)),
+        )
+
+    # reads retry server errors with backoff
+    assert run("read", replay(_Status(503), _Status(200)), True).status_code == 200
+    assert waits == [(1, False)]
+    # orders only retry when the broker did not act on them
+    waits.clear()
+    assert run("order", replay(_Status(503), _Status(200)), False).status_code == 503
+    assert waits == []
+    throttled = _Status(429, {"Retry-After": "5"})
+    assert run("order", replay(throttled, _Status(200)), False).status_code == 200
+    assert waits == [(5, True)]
+    with pytest.raises(ConnectionError):
+        run("order", replay(ConnectionError("reset"), _Status(200)), False)
+
+    # attempts are bounded; the last answer is returned
+    waits.clear()
+    assert run("read", replay(*[_Status(502)] * 3), True).status_code == 502
+    assert waits == [(1, False), (2, False)]
+    assert retrier.stats == {
+        "read": {"calls": 2, "retries": 3, "waited": 4.0, "exhausted": 1},
+        "order": {"calls": 3, "retries": 1, "waited": 5.0, "exhausted": 0},
+    }
+
+
+def test_robinhood_throttled_order_retries(monkeypatch):
+    import sys
+    from types import SimpleNamespace
+    from py_portfolio_index.portfolio_providers import base_portfolio
+    from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+    from py_portfolio_index.portfolio_providers.common import Retrier
+    from py_portfolio_index.portfolio_providers.robinhood import RobinhoodProvider
+
+    stocks = SimpleNamespace(
+        orders_url=lambda: "https://api.robinhood.com/orders/",
+        update_session=lambda key, value: None,
+    )
+    orders = SimpleNamespace(
+        load_account_profile=lambda account_number=None, info=None: "account",
+        get_latest_price=lambda symbol, price_type, extended: ["10.00"],
+        round_price=float,
+    )
+    robinhood = SimpleNamespace(stocks=stocks, orders=orders)
+    monkeypatch.setitem(
+        sys.modules, "robin_stocks", SimpleNamespace(robinhood=robinhood)
+    )
+    monkeypatch.setitem(sys.modules, "robin_stocks.robinhood", robinhood)
+    monkeypatch.setitem(sys.modules, "robin_stocks.robinhood.stocks", stocks)
+    monkeypatch.setitem(sys.modules, "robin_stocks.robinhood.orders", orders)
+
+    answers = [
+        {"detail": "Request was throttled. Expected available in 3 seconds."},
+        {"detail": "Too many requests for fractional orders"},
+        {"id": "order-id"},
+    ]
+    posted = []
+
+    class FakeSession:
+        def post(self, url, json=None, data=None, timeout=None):
+            posted.append(json["ref_id"])
+            return _Status(200, body=answers.pop(0))
+
+    slept = []
+    monkeypatch.setattr(base_portfolio, "sleep", slept.append)
+    provider = RobinhoodProvider.__new__(RobinhoodProvider)
+    BaseProvider.__init__(provider)
+    provider.rate_limiter = None
+    provider.shared_cache = None
+    provider.retrier = Retrier()
+    provider._http_session = FakeSession()
+    provider._local_instrument_cache = [{"symbol": "AAPL", "url": "instrument"}]
+    assert provider.buy_instrument("AAPL", Decimal("0.5"))
+    assert slept == [3, 60]
+    # one retry layer, resubmitting the same deduplicated order
+    assert len(posted) == 3 and len(set(posted)) == 1
+    assert provider.retrier.stats["robinhood:orders"] == {
+        "calls": 1,
+        "retries": 2,
+        "waited": 63.0,
+        "exhausted": 0,
+    }
+
+
+def test_alpaca_legacy_calls_share_pooled_session():
+    from py_portfolio_index.portfolio_providers.alpaca_v2 import AlpacaProvider
+
+    provider = AlpacaProvider(key_id="key", secret_key="secret")
+    session = provider.http_session
+    assert provider.http_session is session
+    adapter = session.get_adapter(provider.LEGACY_BASE)
+    assert adapter._pool_maxsize == provider.HTTP_POOL.pool_maxsize
+    assert adapter.max_retries.total == 0
+
+    class RecordingSession:
+        def __init__(self):
+            self.calls = []
+            self.closed = False
+
+        def get(self, url, **kwargs):
+            self.calls.append((url, kwargs))
+            page = [] if "page_token" in kwargs["params"] else [{"id": "1"}]
+            return _Status(200, body=page)
+
+        def close(self):
+            self.closed = True
+
+    recording = RecordingSession()
+    provider._http_session = recording
+    assert provider._get_dividends() == [{"id": "1"}]
+    assert len(recording.calls) == 2
+    assert all(
+        kwargs["timeout"] == provider.HTTP_POOL.timeout for _, kwargs in recording.calls
+    )
+    provider.shutdown()
+    assert recording.closed and provider._http_session is None
+
+
+def test_robinhood_shutdown_leaves_shared_session_open(monkeypatch):
+    import sys
+    import requests
+    from types import SimpleNamespace
+    from py_portfolio_index.portfolio_providers.base_portfolio import BaseProvider
+    from py_portfolio_index.portfolio_providers.robinhood import RobinhoodProvider
+
+    class GlobalSession(requests.Session):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    stocks = SimpleNamespace(SESSION=GlobalSession())
+    monkeypatch.setitem(sys.modules, "robin_stocks.robinhood.stocks", stocks)
+    provider = RobinhoodProvider.__new__(RobinhoodProvider)
+    BaseProvider.__init__(provider)
+    # robin_stocks' own calls share the pool
+    assert provider.http_session is stocks.SESSION
+    provider.shutdown()
+    assert not stocks.SESSION.closed and provider._http_session is None
+
+
+def test_schwab_dividends_push_start_date():
+    from datetime import datetime, timedelta
+
+    provider = _fake_schwab_provider()
+    requested = []
+
+    def get_transactions(account_hash, start_date=None, transaction_types=None):
+        requested.append(start_date)
+        return _FakeResponse([])
+
+    provider._provider.get_transactions = get_transactions
+    provider._account_hash = "hash"
+    recent = datetime.now() - timedelta(days=5)
+    assert provider.get_dividend_details(start=recent) == []
+    assert requested[-1].date() == recent.date()
+    # older than the API reaches: use its default window
+    assert provider.get_dividend_details(start=recent - timedelta(days=365)) == []
+    assert requested[-1] is None
+
+
+def test_alpaca_transactions_stream_by_page():
+    from datetime import datetime, timedelta, timezone
+    from types import SimpleNamespace
+    from alpaca.trading.enums import OrderSide
+    from py_portfolio_index.io.csv_export import transactions_to_csv
+    from py_portfolio_index.portfolio_providers.alpaca_v2 import AlpacaProvider
+
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    orders = [
+        SimpleNamespace(
+            id=idx,
+            symbol="AAPL",
+            side=OrderSide.BUY,
+            filled_avg_price="10",
+            filled_qty="1",
+            filled_at=None,
+            submitted_at=base + timedelta(minutes=idx),
+        )
+        for idx in range(1200)
+    ]
+    requests = []
+
+    class TradingClient:
+        def get_orders(self, filter):
+            requests.append(filter)
+            rows = sorted(orders, key=lambda o: o.submitted_at, reverse=True)
+            rows = [
+                o
+                for o in rows
+                if (filter.until is None or o.submitted_at <= filter.until)
+                and (filter.after is None or o.submitted_at > filter.after)
+            ]
+            return rows[: filter.limit]
+
+    provider = AlpacaProvider(key_id="key", secret_key="secret")
+    provider.trading_client = TradingClient()
+
+    checkpoints = []
+    stream = provider.iter_transactions(on_checkpoint=checkpoints.append)
+    next(stream)
+    # the first transaction arrives after a single page
+    assert len(requests) == 1
+    assert len(list(stream)) == 1199
+    assert len(requests) == 3 and len(checkpoints) == 2
+
+    # resuming from a checkpoint only reads what is left
+    requests.clear()
+    resumed = list(provider.iter_transactions(checkpoint=checkpoints[-1]))
+    assert len(requests) == 1 and requests[0].until == checkpoints[-1]
+    # the 203 orders left plus the 3 at the checkpoint itself
+    assert len(resumed) == 206
+
+    since = base + timedelta(minutes=1099)
+    csv = transactions_to_csv(provider.iter_transactions(since=since))
+    assert requests[-1].after == since
+    assert len(csv.splitlines()) == 100 + 1